@@ -0,0 +1,148 @@
+"""Benchmark pipeline execution modes: end-to-end time and disk I/O.
+
+Every mode runs ``run_pipeline.main`` against a fresh warehouse in a scratch
+directory, so each run is a full nightly batch:
+
+    disk           bronze, silver and gold tables in the warehouse file
+    disk-lake      bronze as a Parquet lake, silver and gold in the file
+    memory         one in-memory database, only gold persisted
+    memory-silver  one in-memory database, silver and gold persisted
+
+I/O is read from ``/proc/self/io`` (Linux): ``storage`` bytes are what
+reached the block layer, ``syscall`` bytes everything read or written
+through the page cache. Arguments after ``--`` are passed to the pipeline.
+
+    python benchmark_modes.py --runs 3
+    python benchmark_modes.py --modes disk memory -- --exclude raw_tickets+
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import run_pipeline
+
+MODES = {
+    "disk": ([], {"BRONZE_MODE": "table"}),
+    "disk-lake": ([], {"BRONZE_MODE": "lake"}),
+    "memory": (["--in-memory"], {}),
+    "memory-silver": (["--in-memory", "--persist-silver"], {}),
+}
+
+
+def _io_counters() -> dict:
+    """Cumulative I/O of this process, or an empty dict off Linux."""
+    try:
+        with open("/proc/self/io", "r", encoding="utf-8") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f)}
+    except OSError:
+        return {}
+
+
+def _directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def run_mode(mode: str, scratch: str, pipeline_args: list, verbose: bool) -> dict:
+    """Run one fresh pipeline in ``mode`` and return its time and I/O."""
+    args, env = MODES[mode]
+    workdir = os.path.join(scratch, mode)
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    env = {
+        **env,
+        "DUCKDB_PATH": os.path.join(workdir, "warehouse.duckdb"),
+        "LAKE_DIR": os.path.join(workdir, "lake"),
+        "SNAPSHOT_DIR": os.path.join(workdir, "snapshots"),
+        "RUN_MANIFEST_PATH": os.path.join(workdir, "run_manifest.json"),
+    }
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    before = _io_counters()
+    start = time.perf_counter()
+    try:
+        with output:
+            status = run_pipeline.main([*args, *pipeline_args])
+    finally:
+        seconds = time.perf_counter() - start
+        after = _io_counters()
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    delta = {key: after[key] - before.get(key, 0) for key in after}
+    return {
+        "ok": status == 0,
+        "seconds": seconds,
+        "read": delta.get("read_bytes"),
+        "written": delta.get("write_bytes"),
+        "rchar": delta.get("rchar"),
+        "wchar": delta.get("wchar"),
+        "on_disk": _directory_size(workdir),
+    }
+
+
+def _mb(value) -> str:
+    return "n/a" if value is None else f"{value / 1e6:,.1f}"
+
+
+def main():
+    """Time every selected mode and print a comparison table."""
+    parser = argparse.ArgumentParser(description="Benchmark pipeline execution modes")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--runs", type=int, default=1, help="Runs per mode (median reported)")
+    parser.add_argument("--scratch", help="Scratch directory (default: a temporary one)")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    parser.add_argument("pipeline_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    pipeline_args = [a for a in args.pipeline_args if a != "--"]
+
+    scratch = args.scratch or tempfile.mkdtemp(prefix="elt_benchmark_")
+    results = {}
+    try:
+        for mode in args.modes:
+            runs = []
+            for run in range(args.runs):
+                result = run_mode(mode, scratch, pipeline_args, args.verbose)
+                if not result["ok"]:
+                    print(f"❌ {mode} run {run + 1} failed; rerun with --verbose")
+                    return 1
+                runs.append(result)
+                print(f"⏱️  {mode} run {run + 1}: {result['seconds']:.2f}s")
+            # The median run by wall time
+            results[mode] = sorted(runs, key=lambda r: r["seconds"])[len(runs) // 2]
+    finally:
+        if not args.scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    print("\n" + "=" * 84)
+    print(
+        f"{'mode':<15}{'time (s)':>10}{'storage R/W (MB)':>22}"
+        f"{'syscall R/W (MB)':>22}{'on disk (MB)':>15}"
+    )
+    print("=" * 84)
+    for mode, r in results.items():
+        print(
+            f"{mode:<15}{r['seconds']:>10.2f}"
+            f"{_mb(r['read']) + ' / ' + _mb(r['written']):>22}"
+            f"{_mb(r['rchar']) + ' / ' + _mb(r['wchar']):>22}"
+            f"{_mb(r['on_disk']):>15}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Query plan regression check for every silver and gold SQL model.
+
+Builds a fresh warehouse from the synthetic dataset (``--scale``, default
+0.1, generated offline from ``data/csv``), runs each model's statements in
+build order with DuckDB's JSON profiler, and compares every statement's plan
+with the golden file ``sql/plans/<layer>/<model>.json``:
+
+* the plan shape - operators, join types and scanned tables, hashed into a
+  fingerprint - must not change;
+* no operator's estimated or actual row count may grow more than
+  ``--threshold`` times (and by at least ``--min-rows``) over the golden one.
+
+    python check_plans.py                     # compare, exit 1 on regressions
+    python check_plans.py fact_orders metrics # only these models
+    python check_plans.py --update            # accept the current plans
+
+Rerun with ``--update`` and commit the golden files when a plan change is
+intended.
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import duckdb
+
+import generate_synthetic_data
+import run_pipeline
+
+PLAN_DIR = "sql/plans"
+MODELS = [
+    *(("silver", model) for model in run_pipeline.SILVER_MODELS),
+    *(("gold", model) for model in run_pipeline.GOLD_SQL_MODELS),
+]
+
+
+def _estimate(extra_info: dict) -> int:
+    digits = re.sub(r"\D", "", str(extra_info.get("Estimated Cardinality", "")))
+    return int(digits) if digits else 0
+
+
+def _label(node: dict) -> str:
+    """Operator name plus the details that make up the plan shape."""
+    label = (node.get("operator_type") or node.get("operator_name", "?")).strip()
+    extra = node.get("extra_info") or {}
+    if "Join Type" in extra:
+        label += f" {extra['Join Type']}"
+    if "Table" in extra:
+        label += f" {extra['Table']}"
+    return label
+
+
+def _operators(profile: dict) -> list:
+    """Depth-first ``[label, estimated rows, actual rows]`` of every operator."""
+    operators = []
+    stack = [(child, 0) for child in reversed(profile.get("children", []))]
+    while stack:
+        node, depth = stack.pop()
+        operators.append(
+            [
+                "  " * depth + _label(node),
+                _estimate(node.get("extra_info") or {}),
+                node.get("operator_cardinality", 0),
+            ]
+        )
+        stack.extend((child, depth + 1) for child in reversed(node.get("children", [])))
+    return operators
+
+
+def _fingerprint(operators: list) -> str:
+    shape = "\n".join(label for label, _, _ in operators)
+    return hashlib.sha256(shape.encode("utf-8")).hexdigest()[:16]
+
+
+def profile_model(conn, layer: str, model: str, profile_path: str) -> dict:
+    """Build ``layer.model`` statement by statement and return its plans."""
+    with open(f"sql/{layer}/{model}.sql", "r", encoding="utf-8") as f:
+        sql = f.read()
+    statements = []
+    conn.execute(f"CREATE SCHEMA IF NOT EXISTS {layer}")
+    for i, statement in enumerate(conn.extract_statements(sql)):
+        conn.execute("PRAGMA enable_profiling = 'json'")
+        conn.execute(f"PRAGMA profiling_output = '{profile_path}'")
+        try:
+            conn.execute(statement.query)
+        finally:
+            conn.execute("PRAGMA disable_profiling")
+        # Statements without a physical plan (CREATE SCHEMA, ...) write no profile
+        operators = []
+        if os.path.exists(profile_path):
+            with open(profile_path, "r", encoding="utf-8") as f:
+                operators = _operators(json.load(f))
+            os.remove(profile_path)
+        statements.append(
+            {
+                "statement": i,
+                "query": " ".join(statement.query.split())[:80],
+                "fingerprint": _fingerprint(operators),
+                "operators": operators,
+            }
+        )
+    return {"model": f"{layer}.{model}", "statements": statements}
+
+
+def _golden_path(layer: str, model: str) -> str:
+    return os.path.join(PLAN_DIR, layer, f"{model}.json")
+
+
+def write_golden(path: str, plans: dict, scale: float):
+    """Write ``plans`` with one operator per line, so diffs stay readable."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = ["{", f'  "model": {json.dumps(plans["model"])},', f'  "scale": {scale},']
+    lines.append('  "statements": [')
+    for n, statement in enumerate(plans["statements"]):
+        lines.append("    {")
+        for key in ("statement", "query", "fingerprint"):
+            lines.append(f"      {json.dumps(key)}: {json.dumps(statement[key])},")
+        operators = [f"        {json.dumps(op)}" for op in statement["operators"]]
+        lines.append('      "operators": [' + ("" if operators else "]"))
+        if operators:
+            lines.append(",\n".join(operators))
+            lines.append("      ]")
+        lines.append("    }" + ("," if n < len(plans["statements"]) - 1 else ""))
+    lines.extend(["  ]", "}"])
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def compare(golden: dict, plans: dict, threshold: float, min_rows: int) -> list:
+    """Regressions of ``plans`` against ``golden``, as printable messages."""
+    model = plans["model"]
+    if len(golden["statements"]) != len(plans["statements"]):
+        return [
+            f"{model}: {len(plans['statements'])} statements, "
+            f"golden has {len(golden['statements'])}"
+        ]
+
+    problems = []
+    for old, new in zip(golden["statements"], plans["statements"]):
+        where = f"{model} statement {new['statement']} ({new['query'][:50]}...)"
+        if old["fingerprint"] != new["fingerprint"]:
+            diff = difflib.unified_diff(
+                [label for label, _, _ in old["operators"]],
+                [label for label, _, _ in new["operators"]],
+                "golden",
+                "current",
+                lineterm="",
+            )
+            problems.append(f"{where}: plan shape changed\n" + "\n".join(diff))
+            continue
+        for (label, old_est, old_rows), (_, new_est, new_rows) in zip(
+            old["operators"], new["operators"]
+        ):
+            for kind, before, after in (
+                ("estimated", old_est, new_est),
+                ("actual", old_rows, new_rows),
+            ):
+                if after - before >= min_rows and after > before * threshold:
+                    problems.append(
+                        f"{where}: {label.strip()} {kind} rows {before:,} -> {after:,}"
+                    )
+    return problems
+
+
+def build_warehouse(scratch: str, scale: float) -> duckdb.DuckDBPyConnection:
+    """Generate the synthetic dataset into a fresh warehouse's bronze."""
+    data_dir = os.path.join(scratch, "data")
+    database_path = os.path.join(scratch, "warehouse.duckdb")
+    conn = duckdb.connect()
+    try:
+        generate_synthetic_data.generate(conn, scale, data_dir, ticket_files=2)
+        generate_synthetic_data.load_bronze(conn, data_dir, database_path)
+    finally:
+        conn.close()
+    return duckdb.connect(database_path)
+
+
+def main(argv=None):
+    """Profile the models and check (or update) their golden plans."""
+    parser = argparse.ArgumentParser(description="Query plan regression check")
+    parser.add_argument("models", nargs="*", help="Models to check (default: all)")
+    parser.add_argument("--update", action="store_true", help="Rewrite the golden files")
+    parser.add_argument("--scale", type=float, default=0.1, help="Synthetic dataset scale")
+    parser.add_argument(
+        "--threshold", type=float, default=2.0, help="Allowed growth factor of row counts"
+    )
+    parser.add_argument(
+        "--min-rows", type=int, default=1000, help="Ignore row count growth below this"
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - {model for _, model in MODELS}
+    if unknown:
+        parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+
+    print(f"🧪 Building the {args.scale}x synthetic warehouse")
+    start = time.perf_counter()
+    problems = []
+    with tempfile.TemporaryDirectory(prefix="plans-") as scratch:
+        conn = build_warehouse(scratch, args.scale)
+        try:
+            # Every model is built, so the checked ones see their real inputs
+            for layer, model in MODELS:
+                plans = profile_model(conn, layer, model, os.path.join(scratch, "profile.json"))
+                if args.models and model not in args.models:
+                    continue
+                path = _golden_path(layer, model)
+                if args.update:
+                    write_golden(path, plans, args.scale)
+                    print(f"📝 Wrote {path}")
+                    continue
+                if not os.path.exists(path):
+                    problems.append(f"{layer}.{model}: no golden file, run with --update")
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    golden = json.load(f)
+                if golden.get("scale") != args.scale:
+                    problems.append(
+                        f"{layer}.{model}: golden plans are for scale {golden.get('scale')}"
+                    )
+                    continue
+                found = compare(golden, plans, args.threshold, args.min_rows)
+                problems.extend(found)
+                print(f"{'❌' if found else '✅'} {layer}.{model}")
+        finally:
+            conn.close()
+
+    print(f"⏱️  Done in {time.perf_counter() - start:.1f}s")
+    if problems:
+        print(f"\n❌ {len(problems)} plan regressions:")
+        for problem in problems:
+            print(f"\n{problem}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""Generate a synthetic, scalable copy of the restaurant dataset.
+
+Orders, items and tickets are generated deterministically in DuckDB from the
+dimension CSVs in ``data/csv``. ``--scale 1`` matches the size of the real
+dataset (63,148 orders, ~90k items, 500,000 tickets); ``--scale 100`` is the
+100x dataset used for scaling benchmarks.
+
+    python generate_synthetic_data.py --scale 100 --out data/synthetic \\
+        --duckdb data/synthetic/warehouse.duckdb
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+import duckdb
+
+BASE_ORDERS = 63_148
+BASE_TICKETS = 500_000
+DIMENSIONS = ["raw_customers", "raw_products", "raw_stores", "raw_supplies"]
+
+
+def generate(conn, scale: float, out_dir: str, ticket_files: int):
+    """Write raw_orders.csv, raw_items.csv and tickets/*.jsonl to ``out_dir``."""
+    n_orders = int(BASE_ORDERS * scale)
+    n_tickets = int(BASE_TICKETS * scale)
+    os.makedirs(os.path.join(out_dir, "tickets"), exist_ok=True)
+
+    sizes = {}
+    for name in DIMENSIONS:
+        shutil.copy(os.path.join("data/csv", f"{name}.csv"), out_dir)
+        conn.execute(
+            f"CREATE OR REPLACE TEMP TABLE {name} AS "
+            f"SELECT *, ROW_NUMBER() OVER () - 1 AS n "
+            f"FROM read_csv_auto('{out_dir}/{name}.csv')"
+        )
+        sizes[name] = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE orders AS
+        WITH seeds AS (
+            SELECT
+                i,
+                md5(CAST(i AS VARCHAR)) AS m,
+                hash(i, 'customer') AS hc,
+                hash(i, 'store') AS hs,
+                hash(i, 'time') AS ht,
+                hash(i, 'amount') AS ha
+            FROM range({n_orders}) t(i)
+        )
+        SELECT
+            i,
+            substr(m, 1, 8) || '-' || substr(m, 9, 4) || '-' || substr(m, 13, 4)
+                || '-' || substr(m, 17, 4) || '-' || substr(m, 21, 12) AS id,
+            c.id AS customer,
+            TIMESTAMP '2016-09-01' + to_minutes(CAST(ht % 525600 AS BIGINT)) AS ordered_at,
+            s.id AS store_id,
+            CAST(500 + ha % 2500 AS BIGINT) AS subtotal,
+            s.tax_rate
+        FROM seeds
+        JOIN raw_customers c ON c.n = hc % {sizes["raw_customers"]}
+        JOIN raw_stores s ON s.n = hs % {sizes["raw_stores"]}
+        """
+    )
+    conn.execute(
+        f"""
+        COPY (
+            SELECT
+                id,
+                customer,
+                ordered_at,
+                store_id,
+                subtotal,
+                CAST(ROUND(subtotal * tax_rate) AS BIGINT) AS tax_paid,
+                subtotal + CAST(ROUND(subtotal * tax_rate) AS BIGINT) AS order_total
+            FROM orders
+            ORDER BY i
+        ) TO '{out_dir}/raw_orders.csv' (HEADER)
+        """
+    )
+    conn.execute(
+        f"""
+        COPY (
+            SELECT
+                md5(o.id || '-' || k) AS id,
+                o.id AS order_id,
+                p.sku
+            FROM orders o,
+                 range(CAST(1 + hash(o.i, 'items') % 2 AS BIGINT)) r(k)
+            JOIN raw_products p
+              ON p.n = hash(o.i, k) % {sizes["raw_products"]}
+            ORDER BY o.i, k
+        ) TO '{out_dir}/raw_items.csv' (HEADER)
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE tickets AS
+        SELECT
+            t,
+            'TCK-' || LPAD(CAST(t AS VARCHAR), 9, '0') AS ticket_id,
+            o.customer AS customer_external_id,
+            CASE WHEN hash(t, 'orphan') % 10 = 0 THEN NULL ELSE o.id END AS order_id,
+            ['email', 'chat', 'phone', 'web'][CAST(1 + hash(t, 'channel') % 4 AS BIGINT)] AS channel,
+            ['low', 'medium', 'high', 'urgent'][CAST(1 + hash(t, 'priority') % 4 AS BIGINT)] AS priority,
+            ['open', 'pending', 'resolved', 'closed'][CAST(1 + hash(t, 'status') % 4 AS BIGINT)] AS status,
+            ['food', 'delivery', 'billing', 'app'][CAST(1 + hash(t, 'category') % 4 AS BIGINT)] AS category,
+            ['Cold jaffle', 'Late delivery', 'Wrong order', 'Refund request',
+             'App crashed'][CAST(1 + hash(t, 'subject') % 5 AS BIGINT)] AS subject,
+            'Customer reports: ' || ['food arrived cold', 'order was late',
+             'missing item', 'charged twice', 'cannot log in'][CAST(1 + hash(t, 'body') % 5 AS BIGINT)]
+                AS body,
+            ['negative', 'neutral', 'positive'][CAST(1 + hash(t, 'sentiment') % 3 AS BIGINT)] AS sentiment,
+            o.ordered_at + INTERVAL 1 DAY AS sla_due_at,
+            o.ordered_at + to_minutes(CAST(hash(t, 'first') % 600 AS BIGINT)) AS first_response_at,
+            o.ordered_at + to_minutes(CAST(hash(t, 'resolved') % 4000 AS BIGINT)) AS resolved_at,
+            o.ordered_at + to_minutes(CAST(hash(t, 'updated') % 6000 AS BIGINT)) AS updated_at,
+            list_slice(['food', 'late', 'refund', 'vip', 'app'],
+                       1, CAST(hash(t, 'tags') % 4 AS BIGINT)) AS tags,
+            'AGENT-' || CAST(hash(t, 'agent') % 50 AS VARCHAR) AS agent_id
+        FROM range({n_tickets}) r(t)
+        JOIN orders o ON o.i = hash(t, 'order') % {n_orders}
+        """
+    )
+    for k in range(ticket_files):
+        conn.execute(
+            f"""
+            COPY (
+                SELECT * EXCLUDE (t) FROM tickets WHERE t % {ticket_files} = {k}
+            ) TO '{out_dir}/tickets/tickets_{k:03d}.jsonl' (FORMAT JSON)
+            """
+        )
+    return n_orders, n_tickets
+
+
+def load_bronze(conn, out_dir: str, database_path: str):
+    """Load the generated files into bronze tables of ``database_path``."""
+    conn.execute(f"ATTACH '{database_path}' AS target")
+    try:
+        conn.execute("CREATE SCHEMA IF NOT EXISTS target.bronze")
+        for name in [*DIMENSIONS, "raw_orders", "raw_items"]:
+            conn.execute(
+                f"CREATE OR REPLACE TABLE target.bronze.{name} AS "
+                f"SELECT *, CAST(now() AS TIMESTAMP) AS loaded_at "
+                f"FROM read_csv_auto('{out_dir}/{name}.csv')"
+            )
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE target.bronze.raw_tickets AS
+            SELECT
+                * EXCLUDE (filename),
+                parse_filename(filename) AS source_blob,
+                CAST(now() AS TIMESTAMP) AS loaded_at
+            FROM read_json_auto('{out_dir}/tickets/*.jsonl', filename = true)
+            """
+        )
+    finally:
+        conn.execute("DETACH target")
+
+
+def main():
+    """Generate the synthetic dataset."""
+    parser = argparse.ArgumentParser(description="Generate synthetic restaurant data")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--out", default="data/synthetic")
+    parser.add_argument("--ticket-files", type=int, default=10)
+    parser.add_argument("--duckdb", help="Also load the data into this warehouse's bronze")
+    args = parser.parse_args()
+
+    print(f"🧪 Generating synthetic dataset at {args.scale}x into {args.out}")
+    start = time.perf_counter()
+    conn = duckdb.connect()
+    try:
+        n_orders, n_tickets = generate(conn, args.scale, args.out, args.ticket_files)
+        print(f"✅ {n_orders:,} orders and {n_tickets:,} tickets written")
+        if args.duckdb:
+            load_bronze(conn, args.out, args.duckdb)
+            print(f"✅ Loaded bronze tables into {args.duckdb}")
+    finally:
+        conn.close()
+    print(f"⏱️  Done in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
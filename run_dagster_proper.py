@@ -20,6 +20,9 @@ from datetime import datetime
 from azure.storage.blob import ContainerClient
 import io
 
+from src.profiling import execute_sql
+from src.telemetry import traced
+
 
 # ============================================================================
 # BRONZE LAYER ASSETS - Return DataFrames
@@ -27,6 +30,7 @@ import io
 
 
 @asset(group_name="bronze")
+@traced
 def raw_customers(context: AssetExecutionContext) -> pd.DataFrame:
     """Load raw customers CSV."""
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
@@ -37,6 +41,7 @@ def raw_customers(context: AssetExecutionContext) -> pd.DataFrame:
 
 
 @asset(group_name="bronze")
+@traced
 def raw_orders(context: AssetExecutionContext) -> pd.DataFrame:
     """Load raw orders CSV."""
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
@@ -47,6 +52,7 @@ def raw_orders(context: AssetExecutionContext) -> pd.DataFrame:
 
 
 @asset(group_name="bronze")
+@traced
 def raw_items(context: AssetExecutionContext) -> pd.DataFrame:
     """Load raw items CSV."""
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
@@ -57,6 +63,7 @@ def raw_items(context: AssetExecutionContext) -> pd.DataFrame:
 
 
 @asset(group_name="bronze")
+@traced
 def raw_products(context: AssetExecutionContext) -> pd.DataFrame:
     """Load raw products CSV."""
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
@@ -67,6 +74,7 @@ def raw_products(context: AssetExecutionContext) -> pd.DataFrame:
 
 
 @asset(group_name="bronze")
+@traced
 def raw_stores(context: AssetExecutionContext) -> pd.DataFrame:
     """Load raw stores CSV."""
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
@@ -77,6 +85,7 @@ def raw_stores(context: AssetExecutionContext) -> pd.DataFrame:
 
 
 @asset(group_name="bronze")
+@traced
 def raw_supplies(context: AssetExecutionContext) -> pd.DataFrame:
     """Load raw supplies CSV."""
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
@@ -87,6 +96,7 @@ def raw_supplies(context: AssetExecutionContext) -> pd.DataFrame:
 
 
 @asset(group_name="bronze")
+@traced
 def raw_tickets(context: AssetExecutionContext) -> pd.DataFrame:
     """Load raw tickets from Azure Blob Storage."""
     context.log.info("Fetching JSONL blobs from Azure...")
@@ -116,6 +126,7 @@ def raw_tickets(context: AssetExecutionContext) -> pd.DataFrame:
 
 
 @asset(group_name="silver", ins={"raw_customers": AssetIn(key="raw_customers")})
+@traced
 def customers(
     context: AssetExecutionContext, raw_customers: pd.DataFrame
 ) -> pd.DataFrame:
@@ -126,7 +137,8 @@ def customers(
         conn.register("raw_customers_df", raw_customers)
 
         # Execute transformation
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT DISTINCT
                 id AS customer_id,
@@ -135,7 +147,8 @@ def customers(
             FROM raw_customers_df
             WHERE id IS NOT NULL
             ORDER BY id
-        """
+        """,
+            "silver.customers",
         ).df()
 
         context.log.info(f"Created silver.customers with {len(df)} rows")
@@ -145,13 +158,15 @@ def customers(
 
 
 @asset(group_name="silver", ins={"raw_orders": AssetIn(key="raw_orders")})
+@traced
 def orders(context: AssetExecutionContext, raw_orders: pd.DataFrame) -> pd.DataFrame:
     """Transform raw orders to silver layer."""
     conn = duckdb.connect(":memory:")
     try:
         conn.register("raw_orders_df", raw_orders)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT
                 id AS order_id,
@@ -165,7 +180,8 @@ def orders(context: AssetExecutionContext, raw_orders: pd.DataFrame) -> pd.DataF
             FROM raw_orders_df
             WHERE id IS NOT NULL AND customer IS NOT NULL
             ORDER BY id
-        """
+        """,
+            "silver.orders",
         ).df()
 
         context.log.info(f"Created silver.orders with {len(df)} rows")
@@ -175,13 +191,15 @@ def orders(context: AssetExecutionContext, raw_orders: pd.DataFrame) -> pd.DataF
 
 
 @asset(group_name="silver", ins={"raw_items": AssetIn(key="raw_items")})
+@traced
 def items(context: AssetExecutionContext, raw_items: pd.DataFrame) -> pd.DataFrame:
     """Transform raw items to silver layer."""
     conn = duckdb.connect(":memory:")
     try:
         conn.register("raw_items_df", raw_items)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT
                 id AS item_id,
@@ -193,7 +211,8 @@ def items(context: AssetExecutionContext, raw_items: pd.DataFrame) -> pd.DataFra
               AND order_id IS NOT NULL
               AND sku IS NOT NULL
             ORDER BY order_id, id
-        """
+        """,
+            "silver.items",
         ).df()
 
         context.log.info(f"Created silver.items with {len(df)} rows")
@@ -203,6 +222,7 @@ def items(context: AssetExecutionContext, raw_items: pd.DataFrame) -> pd.DataFra
 
 
 @asset(group_name="silver", ins={"raw_products": AssetIn(key="raw_products")})
+@traced
 def products(
     context: AssetExecutionContext, raw_products: pd.DataFrame
 ) -> pd.DataFrame:
@@ -211,7 +231,8 @@ def products(
     try:
         conn.register("raw_products_df", raw_products)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT DISTINCT
                 sku AS product_sku,
@@ -223,7 +244,8 @@ def products(
             FROM raw_products_df
             WHERE sku IS NOT NULL
             ORDER BY sku
-        """
+        """,
+            "silver.products",
         ).df()
 
         context.log.info(f"Created silver.products with {len(df)} rows")
@@ -232,14 +254,53 @@ def products(
         conn.close()
 
 
+@asset(group_name="silver", ins={"products": AssetIn(key="products")})
+@traced
+def products_snapshot(
+    context: AssetExecutionContext, products: pd.DataFrame
+) -> pd.DataFrame:
+    """Product versions with their validity, like silver.products_snapshot.
+
+    Nothing persists between runs here, so each product has one version,
+    valid from the beginning of time like a key's first version there.
+    """
+    conn = duckdb.connect(":memory:")
+    try:
+        conn.register("products_df", products)
+
+        df = execute_sql(
+            conn,
+            """
+            SELECT
+                product_sku,
+                product_name,
+                product_type,
+                product_price,
+                product_description,
+                TIMESTAMP '1900-01-01' AS valid_from,
+                CAST(NULL AS TIMESTAMP) AS valid_to
+            FROM products_df
+            ORDER BY product_sku
+        """,
+            "silver.products_snapshot",
+        ).df()
+
+        context.log.info(f"Created silver.products_snapshot with {len(df)} rows")
+        return df
+    finally:
+        conn.close()
+
+
 @asset(group_name="silver", ins={"raw_stores": AssetIn(key="raw_stores")})
+@traced
 def stores(context: AssetExecutionContext, raw_stores: pd.DataFrame) -> pd.DataFrame:
     """Transform raw stores to silver layer."""
     conn = duckdb.connect(":memory:")
     try:
         conn.register("raw_stores_df", raw_stores)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT DISTINCT
                 id AS store_id,
@@ -250,7 +311,8 @@ def stores(context: AssetExecutionContext, raw_stores: pd.DataFrame) -> pd.DataF
             FROM raw_stores_df
             WHERE id IS NOT NULL
             ORDER BY id
-        """
+        """,
+            "silver.stores",
         ).df()
 
         context.log.info(f"Created silver.stores with {len(df)} rows")
@@ -260,6 +322,7 @@ def stores(context: AssetExecutionContext, raw_stores: pd.DataFrame) -> pd.DataF
 
 
 @asset(group_name="silver", ins={"raw_supplies": AssetIn(key="raw_supplies")})
+@traced
 def supplies(
     context: AssetExecutionContext, raw_supplies: pd.DataFrame
 ) -> pd.DataFrame:
@@ -268,7 +331,8 @@ def supplies(
     try:
         conn.register("raw_supplies_df", raw_supplies)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT
                 id AS supply_id,
@@ -280,7 +344,8 @@ def supplies(
             FROM raw_supplies_df
             WHERE id IS NOT NULL AND sku IS NOT NULL
             ORDER BY id
-        """
+        """,
+            "silver.supplies",
         ).df()
 
         context.log.info(f"Created silver.supplies with {len(df)} rows")
@@ -290,13 +355,15 @@ def supplies(
 
 
 @asset(group_name="silver", ins={"raw_tickets": AssetIn(key="raw_tickets")})
+@traced
 def tickets(context: AssetExecutionContext, raw_tickets: pd.DataFrame) -> pd.DataFrame:
-    """Transform raw tickets to silver layer."""
+    """Deduplicate raw tickets to their latest version in silver layer."""
     conn = duckdb.connect(":memory:")
     try:
         conn.register("raw_tickets_df", raw_tickets)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT
                 ticket_id,
@@ -319,8 +386,13 @@ def tickets(context: AssetExecutionContext, raw_tickets: pd.DataFrame) -> pd.Dat
                 loaded_at
             FROM raw_tickets_df
             WHERE ticket_id IS NOT NULL
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY ticket_id
+                ORDER BY ticket_ts DESC, loaded_at DESC, source_blob DESC
+            ) = 1
             ORDER BY ticket_id
-        """
+        """,
+            "silver.tickets",
         ).df()
 
         context.log.info(f"Created silver.tickets with {len(df)} rows")
@@ -336,18 +408,28 @@ def tickets(context: AssetExecutionContext, raw_tickets: pd.DataFrame) -> pd.Dat
 
 @asset(
     group_name="gold",
-    ins={"orders": AssetIn(key="orders"), "items": AssetIn(key="items")},
+    ins={
+        "orders": AssetIn(key="orders"),
+        "items": AssetIn(key="items"),
+        "products_snapshot": AssetIn(key="products_snapshot"),
+    },
 )
+@traced
 def fact_orders(
-    context: AssetExecutionContext, orders: pd.DataFrame, items: pd.DataFrame
+    context: AssetExecutionContext,
+    orders: pd.DataFrame,
+    items: pd.DataFrame,
+    products_snapshot: pd.DataFrame,
 ) -> pd.DataFrame:
     """Create fact_orders mart with order totals."""
     conn = duckdb.connect(":memory:")
     try:
         conn.register("orders_df", orders)
         conn.register("items_df", items)
+        conn.register("products_snapshot_df", products_snapshot)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT
                 o.order_id,
@@ -358,13 +440,19 @@ def fact_orders(
                 o.subtotal,
                 o.tax_paid,
                 o.order_total,
-                COUNT(i.item_id) AS item_count
+                COUNT(i.item_id) AS item_count,
+                SUM(p.product_price) AS items_list_price
             FROM orders_df o
             LEFT JOIN items_df i ON i.order_id = o.order_id
+            LEFT JOIN products_snapshot_df p
+                ON p.product_sku = i.product_sku
+               AND o.order_ts >= p.valid_from
+               AND (p.valid_to IS NULL OR o.order_ts < p.valid_to)
             GROUP BY o.order_id, o.customer_id, o.store_id, o.order_ts, 
                      o.subtotal, o.tax_paid, o.order_total
             ORDER BY o.order_id
-        """
+        """,
+            "gold.fact_orders",
         ).df()
 
         context.log.info(f"Created gold.fact_orders with {len(df)} rows")
@@ -374,6 +462,7 @@ def fact_orders(
 
 
 @asset(group_name="gold", ins={"tickets": AssetIn(key="tickets")})
+@traced
 def tickets_per_order(
     context: AssetExecutionContext, tickets: pd.DataFrame
 ) -> pd.DataFrame:
@@ -382,7 +471,8 @@ def tickets_per_order(
     try:
         conn.register("tickets_df", tickets)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             SELECT
                 order_id,
@@ -391,7 +481,8 @@ def tickets_per_order(
             WHERE order_id IS NOT NULL
             GROUP BY order_id
             ORDER BY order_id
-        """
+        """,
+            "gold.tickets_per_order",
         ).df()
 
         context.log.info(f"Created gold.tickets_per_order with {len(df)} rows")
@@ -407,6 +498,7 @@ def tickets_per_order(
         "tickets_per_order": AssetIn(key="tickets_per_order"),
     },
 )
+@traced
 def metrics(
     context: AssetExecutionContext,
     fact_orders: pd.DataFrame,
@@ -418,7 +510,8 @@ def metrics(
         conn.register("fact_orders_df", fact_orders)
         conn.register("tickets_per_order_df", tickets_per_order)
 
-        df = conn.execute(
+        df = execute_sql(
+            conn,
             """
             WITH aov AS (
                 SELECT AVG(order_total) AS average_order_value
@@ -434,7 +527,8 @@ def metrics(
                 ROUND(COALESCE(tickets.avg_tickets_per_order, 0), 4) AS avg_tickets_per_order
             FROM aov
             LEFT JOIN tickets ON TRUE
-        """
+        """,
+            "gold.metrics",
         ).df()
 
         if len(df) > 0:
@@ -474,6 +568,7 @@ def main():
         orders,
         items,
         products,
+        products_snapshot,
         stores,
         supplies,
         tickets,
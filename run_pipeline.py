@@ -1,189 +1,694 @@
-"""Main pipeline runner for Restaurant ELT Pipeline."""
-
+"""Main pipeline runner for Restaurant ELT Pipeline.
+
+    python run_pipeline.py                              # everything
+    python run_pipeline.py --select fact_orders+        # a model and downstream
+    python run_pipeline.py --select +metrics --exclude layer:bronze
+    python run_pipeline.py --state modified             # only what changed
+    python run_pipeline.py --resume                     # finish a failed run
+    python run_pipeline.py --in-memory                  # persist only gold
+    python run_pipeline.py --sample 1%                  # fast run on a 1% sample
+    python run_pipeline.py --materializations           # view/table recommendations
+    python run_pipeline.py --maintenance                # retention and compaction
+"""
+
+import argparse
+import hashlib
 import sys
-import io
 import os
 import traceback
-from datetime import datetime
+from contextlib import contextmanager
+from functools import partial
 
-import pandas as pd
 import duckdb
 from dotenv import load_dotenv
 from azure.storage.blob import ContainerClient
 
+from src import selection
+from src.materialization import build_model, prepare_relation, report
+from src.profiling import profile_block
+from src.resources.sources import (
+    CSV_SOURCES,
+    TICKET_BLOB_PATTERN,
+    IngestOptions,
+    ingest_files,
+    list_blobs,
+    list_csv_files,
+    read_csv_file,
+    read_jsonl_blob,
+)
+from src.resources.lake import discard_on_rollback
+from src.resources.maintenance import run_maintenance
+from src.resources.metrics import metrics_verify_enabled, verify_metrics
+from src.resources.sampling import parse_sample, sample_rate_from_env, sampled_environment
+from src.resources.schema_registry import prepare_ticket_projection
+from src.resources.snapshots import copy_macros, publish_snapshot
+from src.telemetry import span
+
 # Load environment variables
 load_dotenv()
 
 
-def run_bronze_layer():
-    """Run Bronze layer ingestion."""
+@contextmanager
+def _warehouse(conn=None):
+    """Yield ``conn``, or a connection to DUCKDB_PATH that is closed afterwards."""
+    if conn is not None:
+        yield conn
+        return
+    conn = duckdb.connect(os.getenv("DUCKDB_PATH", "data/warehouse.duckdb"))
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _transaction(conn):
+    """Commit everything written in the block at once, or none of it.
+
+    Lake files written in the block are removed again if it rolls back.
+    """
+    with discard_on_rollback():
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def run_bronze_layer(tables=None, conn=None, bronze_mode=None, completed=None):
+    """Run Bronze layer ingestion (all tables unless given).
+
+    Only source files that are new or changed since their last load are read.
+    ``bronze_mode`` defaults to BRONZE_MODE. Each table is loaded in its own
+    transaction and then passed to ``completed``, if given. With SAMPLE set,
+    only that sample of the sources is loaded.
+    """
     print("=" * 60)
     print("🔵 BRONZE LAYER - Loading Raw Data")
     print("=" * 60)
 
-    db_path = os.getenv("DUCKDB_PATH", "data/warehouse.duckdb")
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
-    conn = duckdb.connect(db_path)
+    bronze_mode = bronze_mode or os.getenv("BRONZE_MODE", "table")
+    options = IngestOptions(
+        bronze_mode,
+        os.getenv("LAKE_DIR", "data/lake"),
+        int(os.getenv("INGEST_WORKERS", "4")),
+        sample_rate_from_env(),
+    )
+    tables = tables or [*CSV_SOURCES, "raw_tickets"]
+    if options.sample < 1:
+        print(f"🎲 Sampling {options.sample:.2%} of orders, items and tickets")
 
-    try:
+    with _warehouse(conn) as db, span(
+        "bronze", "layer", bronze_mode=bronze_mode, sample=options.sample
+    ):
         # Create bronze schema
-        conn.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+        db.execute("CREATE SCHEMA IF NOT EXISTS bronze")
 
         # Load CSV files
-        csv_files = {
-            "raw_customers": "raw_customers.csv",
-            "raw_orders": "raw_orders.csv",
-            "raw_items": "raw_items.csv",
-            "raw_products": "raw_products.csv",
-            "raw_stores": "raw_stores.csv",
-            "raw_supplies": "raw_supplies.csv",
-        }
-
-        for table_name, filename in csv_files.items():
-            df = pd.read_csv(f"{csv_dir}/{filename}")
-            df["loaded_at"] = datetime.now()
-            conn.execute(
-                f"CREATE OR REPLACE TABLE bronze.{table_name} AS SELECT * FROM df"
-            )
-            print(f"✅ Loaded {len(df):,} rows into bronze.{table_name}")
+        for table_name, pattern in CSV_SOURCES.items():
+            if table_name not in tables:
+                continue
+            with span(f"bronze.{table_name}", "model") as model_span, _transaction(db):
+                files = list_csv_files(csv_dir, pattern)
+                loaded = ingest_files(
+                    db,
+                    table_name,
+                    files,
+                    lambda name: read_csv_file(csv_dir, name),
+                    "source_file",
+                    options,
+                )
+                model_span.set("files_loaded", len(loaded))
+            _print_loaded(table_name, files, loaded)
+            if completed:
+                completed(table_name)
 
         # Load tickets from Azure
-        _load_tickets_from_azure(conn)
+        if "raw_tickets" in tables:
+            with span("bronze.raw_tickets", "model"), _transaction(db):
+                _load_tickets_from_azure(db, options)
+            if completed:
+                completed("raw_tickets")
 
-    finally:
-        conn.close()
+
+def _print_loaded(table_name, files, loaded):
+    if loaded:
+        print(
+            f"✅ Loaded {sum(loaded.values()):,} rows from {len(loaded)} of "
+            f"{len(files)} files into bronze.{table_name}"
+        )
+    else:
+        print(f"⏭️  bronze.{table_name} is up to date ({len(files)} files already loaded)")
 
 
-def _load_tickets_from_azure(conn):
-    """Load tickets from Azure Blob Storage."""
+def _load_tickets_from_azure(conn, options):
+    """Load new ticket blobs from Azure Blob Storage."""
     print("\n📦 Loading tickets from Azure Blob Storage...")
     sas_url = os.getenv("CONTAINER_SAS_URL", "")
+    pattern = os.getenv("TICKETS_BLOB_PATTERN", TICKET_BLOB_PATTERN)
     cc = ContainerClient.from_container_url(sas_url)
 
-    blob_names = [b.name for b in cc.list_blobs() if b.name.endswith(".jsonl")]
-    print(f"   Found {len(blob_names)} JSONL files: {blob_names}")
-
-    dfs = []
-    for blob_name in blob_names:
-        bc = cc.get_blob_client(blob_name)
-        text = bc.download_blob().readall().decode("utf-8")
-        df = pd.read_json(io.StringIO(text), lines=True)
-        df["source_blob"] = blob_name
-        dfs.append(df)
-
-    df_tickets = pd.concat(dfs, ignore_index=True)
-    df_tickets["loaded_at"] = datetime.now()
-    conn.execute(
-        "CREATE OR REPLACE TABLE bronze.raw_tickets AS SELECT * FROM df_tickets"
+    blobs = list_blobs(cc, pattern)
+    print(f"   Found {len(blobs)} JSONL files: {list(blobs)}")
+
+    loaded = ingest_files(
+        conn,
+        "raw_tickets",
+        blobs,
+        lambda name: read_jsonl_blob(cc, name),
+        "source_blob",
+        options,
     )
-    print(f"✅ Loaded {len(df_tickets):,} rows into bronze.raw_tickets")
+    _print_loaded("raw_tickets", blobs, loaded)
+
+
+SILVER_MODELS = selection.LAYERS["silver"]
+
 
+def run_silver_layer(sql_files=None, conn=None, completed=None):
+    """Run Silver layer transformations (all models unless given).
 
-def run_silver_layer():
-    """Run Silver layer transformations."""
+    Each model is built in its own transaction and then passed to
+    ``completed``, if given.
+    """
     print("\n" + "=" * 60)
     print("🥈 SILVER LAYER - Cleaning & Transforming Data")
     print("=" * 60)
 
-    db_path = os.getenv("DUCKDB_PATH", "data/warehouse.duckdb")
-    conn = duckdb.connect(db_path)
-
-    sql_files = [
-        "customers",
-        "orders",
-        "items",
-        "products",
-        "stores",
-        "supplies",
-        "tickets",
-    ]
+    sql_files = sql_files or SILVER_MODELS
 
-    try:
-        conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
+    with _warehouse(conn) as db, span("silver", "layer"):
+        db.execute("CREATE SCHEMA IF NOT EXISTS silver")
 
         for sql_file in sql_files:
             with open(f"sql/silver/{sql_file}.sql", "r", encoding="utf-8") as f:
                 sql = f.read()
-            conn.execute(sql)
-            count = conn.execute(f"SELECT COUNT(*) FROM silver.{sql_file}").fetchone()[
-                0
-            ]
-            print(f"✅ Created silver.{sql_file} with {count:,} rows")
-    finally:
-        conn.close()
-
-
-def run_gold_layer():
-    """Run Gold layer marts."""
+            with span(f"silver.{sql_file}", "model") as model_span, _transaction(db):
+                if sql_file == "tickets":
+                    prepare_ticket_projection(db)
+                decision = build_model(db, sql, f"silver.{sql_file}")
+                count = db.execute(f"SELECT COUNT(*) FROM silver.{sql_file}").fetchone()[
+                    0
+                ]
+                model_span.set("rows", count)
+                model_span.set("materialization", decision.materialization)
+            print(
+                f"✅ Created silver.{sql_file} ({decision.materialization}) with {count:,} rows"
+            )
+            if decision.note:
+                print(f"   {decision.note}")
+            if completed:
+                completed(sql_file)
+
+
+# The last gold model publishes a snapshot; the others are built from sql/gold
+SNAPSHOT_MODEL = "warehouse_snapshot"
+GOLD_SQL_MODELS = [model for model in selection.LAYERS["gold"] if model != SNAPSHOT_MODEL]
+
+# Query and message reporting a gold model, if any
+GOLD_MODELS = {
+    "fact_orders": (
+        "SELECT COUNT(*) FROM gold.fact_orders",
+        "✅ Created gold.fact_orders with {count:,} rows",
+    ),
+    "order_sketches": (
+        "SELECT COUNT(*) FROM sketch_dates",
+        "✅ Updated gold order sketches for {count:,} days",
+    ),
+    "ticket_attribution": (
+        "SELECT COUNT(*) FILTER (WHERE attribution = 'asof') FROM gold.ticket_attribution",
+        "✅ Attributed {count:,} tickets without an order to the customer's last order",
+    ),
+    "tickets_per_order": (
+        "SELECT COUNT(*) FROM gold.tickets_per_order",
+        "✅ Created gold.tickets_per_order with {count:,} rows",
+    ),
+    "metrics": None,
+    "distribution_metrics": None,
+    "ticket_search": (
+        "SELECT COUNT(*) FROM changed_tickets",
+        "✅ Indexed {count:,} changed tickets for full-text search",
+    ),
+    "customer_summary": (
+        "SELECT COUNT(*) FROM summary_customers",
+        "✅ Updated gold.customer_summary for {count:,} customers",
+    ),
+}
+
+
+def run_gold_layer(models=None, conn=None, completed=None):
+    """Run Gold layer marts (all models unless given).
+
+    Each model is built in its own transaction and then passed to
+    ``completed``, if given.
+    """
     print("\n" + "=" * 60)
     print("🥇 GOLD LAYER - Creating Business Marts")
     print("=" * 60)
 
-    db_path = os.getenv("DUCKDB_PATH", "data/warehouse.duckdb")
-    conn = duckdb.connect(db_path)
+    models = models or GOLD_SQL_MODELS
 
-    try:
-        conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
-
-        # Create fact_orders
-        with open("sql/gold/fact_orders.sql", "r", encoding="utf-8") as f:
-            sql = f.read()
-        conn.execute(sql)
-        count = conn.execute("SELECT COUNT(*) FROM gold.fact_orders").fetchone()[0]
-        print(f"✅ Created gold.fact_orders with {count:,} rows")
-
-        # Create tickets_per_order
-        with open("sql/gold/tickets_per_order.sql", "r", encoding="utf-8") as f:
-            sql = f.read()
-        conn.execute(sql)
-        count = conn.execute("SELECT COUNT(*) FROM gold.tickets_per_order").fetchone()[
-            0
-        ]
-        print(f"✅ Created gold.tickets_per_order with {count:,} rows")
-
-        # Create metrics
-        with open("sql/gold/metrics.sql", "r", encoding="utf-8") as f:
-            sql = f.read()
-        conn.execute(sql)
+    with _warehouse(conn) as db, span("gold", "layer"):
+        db.execute("CREATE SCHEMA IF NOT EXISTS gold")
+
+        for model in models:
+            with open(f"sql/gold/{model}.sql", "r", encoding="utf-8") as f:
+                sql = f.read()
+            with span(f"gold.{model}", "model") as model_span, _transaction(db):
+                decision = build_model(db, sql, f"gold.{model}")
+                if GOLD_MODELS.get(model):
+                    count_sql, message = GOLD_MODELS[model]
+                    count = db.execute(count_sql).fetchone()[0]
+                    model_span.set("rows", count)
+                    print(message.format(count=count))
+                # Drift rolls the metrics state back with the rest of the model
+                if model == "metrics" and metrics_verify_enabled():
+                    for metric, incremental, full in verify_metrics(db):
+                        print(
+                            f"🔎 Verified {metric}: {incremental} matches full recompute {full}"
+                        )
+            if decision.note:
+                print(f"   {decision.note}")
+            if completed:
+                completed(model)
 
         # Fetch and display metrics
-        _display_metrics(conn)
-    finally:
-        conn.close()
+        if "metrics" in models or "distribution_metrics" in models:
+            _display_metrics(db)
+
+
+def _fetch_one(conn, sql):
+    """First row of ``sql``, or None if a table it reads was not built."""
+    try:
+        return conn.execute(sql).fetchone()
+    except duckdb.CatalogException:
+        return None
 
 
 def _display_metrics(conn):
     """Display KPI metrics."""
-    result = conn.execute("SELECT * FROM gold.metrics").fetchone()
+    result = _fetch_one(
+        conn,
+        """
+        SELECT average_order_value, avg_tickets_per_order, direct_tickets, attributed_tickets
+        FROM gold.metrics
+        """,
+    )
     if result:
-        aov, avg_tickets = result
+        aov, avg_tickets, direct, attributed = result
         print("✅ Created gold.metrics")
         print("\n" + "=" * 60)
         print("📊 KEY PERFORMANCE INDICATORS")
         print("=" * 60)
         print(f"💰 Average Order Value (AOV): ${aov:,.2f}")
         print(f"🎫 Avg Tickets per Order: {avg_tickets:.2f}")
-        print("=" * 60)
+        print(f"🔗 Tickets with / attributed to an order: {direct:,} / {attributed:,}")
 
+    result = _fetch_one(conn, "SELECT * FROM gold.distribution_metrics WHERE store_id IS NULL")
+    if result:
+        _, _, distinct_customers, median, p95 = result
+        print(f"👥 Distinct Customers (HLL): {distinct_customers:,}")
+        print(f"📈 Median / P95 Order Value: ${median:,.2f} / ${p95:,.2f}")
+    print("=" * 60)
 
-def main():
-    """Run the complete ELT pipeline."""
-    print("\n🚀 Starting Restaurant ELT Pipeline")
+
+def run_publish_step(conn=None):
+    """Publish gold tables as a read-only snapshot for readers."""
+    snapshot_dir = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+
+    with _warehouse(conn) as db, span("publish", "layer"):
+        path = publish_snapshot(db, snapshot_dir)
+        print(f"\n📸 Published read-only snapshot: {path}")
+
+
+def _schema_tables(conn, database: str, schema: str) -> list:
+    return [
+        table
+        for (table,) in conn.execute(
+            """
+            SELECT table_name
+            FROM duckdb_tables()
+            WHERE database_name = ? AND schema_name = ? AND NOT temporary
+            ORDER BY table_name
+            """,
+            [database, schema],
+        ).fetchall()
+    ]
+
+
+def _copy_primary_keys(conn, source: str, target: str, schema: str):
+    """Add the primary keys of ``source``'s tables in ``schema`` to their copies in ``target``.
+
+    ``CREATE TABLE ... AS`` drops constraints, and upserting models need theirs.
+    """
+    keys = conn.execute(
+        """
+        SELECT table_name, constraint_column_names
+        FROM duckdb_constraints()
+        WHERE database_name = ? AND schema_name = ? AND constraint_type = 'PRIMARY KEY'
+        """,
+        [source, schema],
+    ).fetchall()
+    for table, columns in keys:
+        conn.execute(
+            f"ALTER TABLE {target}.{schema}.{table} ADD PRIMARY KEY ({', '.join(columns)})"
+        )
+
+
+def open_in_memory(db_path: str, persist_schemas) -> duckdb.DuckDBPyConnection:
+    """Open an in-memory database seeded with the persisted schemas of ``db_path``.
+
+    The warehouse file is attached as ``warehouse``. Bronze and any schema
+    not persisted live only in memory; persisted schemas are copied in first
+    so incremental models see their state from previous runs.
+    """
+    conn = duckdb.connect(":memory:")
+    conn.execute(f"ATTACH '{db_path}' AS warehouse")
+    for schema in persist_schemas:
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        for table in _schema_tables(conn, "warehouse", schema):
+            conn.execute(
+                f"CREATE TABLE {schema}.{table} AS SELECT * FROM warehouse.{schema}.{table}"
+            )
+        _copy_primary_keys(conn, "warehouse", "memory", schema)
+    return conn
+
+
+def checkpoint_in_memory(conn, persist_schemas):
+    """Write the persisted schemas' tables and macros back to the warehouse file."""
+    print("\n" + "=" * 60)
+    print(f"💾 CHECKPOINT - Persisting {', '.join(persist_schemas)} to the warehouse")
     print("=" * 60)
 
+    # A commit larger than the threshold is checkpointed straight into the
+    # file; a low one keeps the copy from also being written to the WAL
+    conn.execute("SET checkpoint_threshold = '1MB'")
+    conn.execute("BEGIN TRANSACTION")
     try:
-        run_bronze_layer()
-        run_silver_layer()
-        run_gold_layer()
-
-        print("\n✅ Pipeline completed successfully!")
-        print("\nDatabase location: data/warehouse.duckdb")
-        print("\nTo query the database:")
-        print("  import duckdb")
-        print("  conn = duckdb.connect('data/warehouse.duckdb')")
-        print("  print(conn.execute('SELECT * FROM gold.metrics').df())")
-        print("  conn.close()")
+        for schema in persist_schemas:
+            conn.execute(f"CREATE SCHEMA IF NOT EXISTS warehouse.{schema}")
+            tables = _schema_tables(conn, "memory", schema)
+            for table in tables:
+                prepare_relation(conn, f"warehouse.{schema}.{table}", "table")
+                conn.execute(
+                    f"CREATE OR REPLACE TABLE warehouse.{schema}.{table} AS "
+                    f"SELECT * FROM {schema}.{table}"
+                )
+            _copy_primary_keys(conn, "memory", "warehouse", schema)
+            macros = copy_macros(conn, "memory", "warehouse", schema)
+            print(f"✅ Persisted {len(tables)} {schema} tables and {macros} macros")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("RESET checkpoint_threshold")
+
+
+# File whose contents define each non-bronze model
+MODEL_FILES = {
+    **{model: f"sql/silver/{model}.sql" for model in selection.LAYERS["silver"]},
+    **{model: f"sql/gold/{model}.sql" for model in GOLD_SQL_MODELS},
+    SNAPSHOT_MODEL: "src/resources/snapshots.py",
+}
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _hash_listing(files: dict) -> str:
+    """Hash of a ``{file name: fingerprint}`` source listing."""
+    listing = sorted(f"{name}:{fingerprint}" for name, fingerprint in files.items())
+    return hashlib.sha256("\n".join(listing).encode("utf-8")).hexdigest()
+
+
+def model_fingerprints(models) -> dict:
+    """Fingerprint each model's inputs: source file stats, blob etags or SQL."""
+    csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
+    fingerprints = {}
+    for model in models:
+        if model in CSV_SOURCES:
+            fingerprints[model] = _hash_listing(list_csv_files(csv_dir, CSV_SOURCES[model]))
+        elif model == "raw_tickets":
+            cc = ContainerClient.from_container_url(os.getenv("CONTAINER_SAS_URL", ""))
+            pattern = os.getenv("TICKETS_BLOB_PATTERN", TICKET_BLOB_PATTERN)
+            fingerprints[model] = _hash_listing(list_blobs(cc, pattern))
+        else:
+            fingerprints[model] = _hash_file(MODEL_FILES[model])
+    return fingerprints
+
+
+def print_materializations():
+    """Print how each model is materialized and what the policy recommends."""
+    with _warehouse() as conn:
+        rows = report(conn)
+    if not rows:
+        print("No model usage recorded yet; run the pipeline first")
+    for model, current, recommended, reason in rows:
+        marker = "✅" if current == recommended else "💡"
+        print(f"{marker} {model:28} {current:12} -> {recommended:12} {reason}")
+
+
+def run_maintenance_step():
+    """Apply bronze retention, compact the warehouse and print the sizes."""
+    print("\n" + "=" * 60)
+    print("🧹 MAINTENANCE - Bronze retention and warehouse compaction")
+    print("=" * 60)
+    database_path = os.getenv("DUCKDB_PATH", "data/warehouse.duckdb")
+    retention_days = int(os.getenv("BRONZE_RETENTION_DAYS", "30"))
+    with span("maintenance", "run"):
+        result = run_maintenance(
+            database_path, os.getenv("LAKE_DIR", "data/lake"), retention_days
+        )
+    mib = 2**20
+    print(
+        f"🗑️  Removed {result['lake_files_removed']} lake files "
+        f"({result['lake_bytes_removed'] / mib:.1f} MiB) older than {retention_days} days"
+    )
+    print(
+        f"📦 {database_path}: {result['file_bytes_before'] / mib:.1f} MiB "
+        f"({result['live_bytes_before'] / mib:.1f} MiB live) -> "
+        f"{result['file_bytes_after'] / mib:.1f} MiB in {result['seconds']:.1f}s"
+    )
+
 
+def parse_args(argv=None):
+    """Parse model selection arguments."""
+    parser = argparse.ArgumentParser(description="Restaurant ELT Pipeline")
+    parser.add_argument(
+        "-s",
+        "--select",
+        nargs="+",
+        action="extend",
+        help="Models to run: model, model+, +model, +model+ or layer:<name>",
+    )
+    parser.add_argument(
+        "--exclude", nargs="+", action="extend", help="Models to skip (same syntax)"
+    )
+    parser.add_argument(
+        "--state",
+        choices=["modified"],
+        help="Only run models whose inputs changed since their last run, plus descendants",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Finish the last failed run, skipping models it completed with unchanged inputs",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the selected models and exit"
+    )
+    parser.add_argument(
+        "--materializations",
+        action="store_true",
+        help="Print each model's materialization and the policy's recommendation and exit",
+    )
+    parser.add_argument(
+        "--maintenance",
+        action="store_true",
+        help="Apply bronze retention, compact the warehouse file and exit",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="Run in one in-memory database and persist only gold at the end",
+    )
+    parser.add_argument(
+        "--persist-silver",
+        action="store_true",
+        help="With --in-memory, also persist the silver layer",
+    )
+    parser.add_argument(
+        "--sample",
+        type=parse_sample,
+        help="Load a deterministic sample of orders (e.g. 1%%) into a separate warehouse",
+    )
+    args = parser.parse_args(argv)
+    if args.in_memory and (args.state or args.resume):
+        parser.error("--state and --resume need a persistent warehouse; drop --in-memory")
+    if args.resume and (args.select or args.exclude or args.state):
+        parser.error("--resume reruns the failed run's own selection; drop the selectors")
+    if args.in_memory:
+        # Layers not persisted start empty, so every model read from them must run
+        transient = ["bronze"] if args.persist_silver else ["bronze", "silver"]
+        try:
+            selected = selection.select(args.select, args.exclude)
+        except ValueError as error:
+            parser.error(str(error))
+        missing = {
+            parent
+            for model in selected
+            for parent in selection.DEPENDENCIES.get(model, [])
+            if parent not in selected
+            and any(parent in selection.LAYERS[layer] for layer in transient)
+        }
+        if missing:
+            parser.error(
+                f"--in-memory starts without {' or '.join(transient)}: also select "
+                f"{', '.join(sorted(missing))}, exclude their descendants, or drop --in-memory"
+            )
+    return args
+
+
+def _plan_run(args, manifest: dict, manifest_path: str):
+    """``(selected, skipped, fingerprints)`` of this run, or ``None`` if nothing is due."""
+    selected = selection.select(args.select, args.exclude)
+    skipped = set()
+    if args.resume:
+        run = selection.interrupted_run(manifest)
+        if run is None:
+            print("\n✅ Nothing to resume - the last run completed")
+            return None
+        selected = set(run["models"])
+        fingerprints = model_fingerprints(selected)
+        skipped = selection.resumable(manifest, fingerprints)
+        selected -= skipped
+        print(
+            f"♻️  Resuming the {run['status']} run started {run['started_at']}: "
+            f"{len(skipped)} of {len(run['models'])} models already completed"
+        )
+    elif args.state == "modified":
+        # Upstream changes propagate, so fingerprint everything not excluded
+        fingerprints = model_fingerprints(selection.select(None, args.exclude))
+        selected &= selection.modified(fingerprints, manifest)
+    else:
+        fingerprints = model_fingerprints(selected)
+
+    print(f"🎯 Selected {len(selected)} of {len(selection.ALL_MODELS)} models")
+    for layer in selection.LAYERS:
+        models = selection.ordered(selected, layer)
+        if models:
+            print(f"   {layer}: {', '.join(models)}")
+    if not selected:
+        if args.resume:
+            selection.finish_run(manifest_path, manifest, "succeeded")
+        print("\n✅ Nothing to run - every selected model is up to date")
+        return None
+    return selected, skipped, fingerprints
+
+
+def _execute_run(args, selected: set, completed):
+    """Run the selected models layer by layer, then checkpoint and publish."""
+    plan = {layer: selection.ordered(selected, layer) for layer in selection.LAYERS}
+    conn = None
+    if args.in_memory:
+        persist = ["silver", "gold"] if args.persist_silver else ["gold"]
+        conn = open_in_memory(os.getenv("DUCKDB_PATH", "data/warehouse.duckdb"), persist)
+        print(f"🧠 Running in memory; persisting {', '.join(persist)} at the end")
+
+    try:
+        with span("pipeline", "run", models=len(selected), in_memory=args.in_memory):
+            gold = [model for model in plan["gold"] if model != SNAPSHOT_MODEL]
+            steps = [
+                (
+                    "run_bronze_layer",
+                    # In memory, bronze is plain tables: a lake would only grow
+                    partial(run_bronze_layer, bronze_mode="table" if args.in_memory else None),
+                    plan["bronze"],
+                ),
+                ("run_silver_layer", run_silver_layer, plan["silver"]),
+                ("run_gold_layer", run_gold_layer, gold),
+            ]
+            for name, step, models in steps:
+                if models:
+                    with profile_block(name):
+                        step(models, conn, completed=completed)
+            if args.in_memory:
+                with profile_block("checkpoint_in_memory"), span("checkpoint", "layer"):
+                    checkpoint_in_memory(conn, persist)
+            if SNAPSHOT_MODEL in selected:
+                with profile_block("run_publish_step"):
+                    run_publish_step(conn)
+                if completed:
+                    completed(SNAPSHOT_MODEL)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _print_finished():
+    print("\n✅ Pipeline completed successfully!")
+    print(f"\nDatabase location: {os.getenv('DUCKDB_PATH', 'data/warehouse.duckdb')}")
+    print("\nTo query the latest published snapshot (never blocks the pipeline):")
+    print("  import duckdb")
+    print("  from src.resources.snapshots import latest_snapshot_path")
+    snapshot_dir = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+    print(f"  path = latest_snapshot_path({snapshot_dir!r})")
+    print("  conn = duckdb.connect(path, read_only=True)")
+    print("  print(conn.execute('SELECT * FROM gold.metrics').df())")
+    print("  conn.close()")
+
+
+def main(argv=None):
+    """Run the ELT pipeline, or the selected part of it."""
+    args = parse_args(argv)
+    if args.sample is not None:
+        os.environ["SAMPLE"] = str(args.sample)
+    sample = sample_rate_from_env()
+    if sample < 1:
+        # A sample gets its own warehouse, manifest, lake and snapshots
+        os.environ.update(sampled_environment(sample))
+    manifest_path = os.getenv("RUN_MANIFEST_PATH", "data/run_manifest.json")
+    if args.materializations:
+        print_materializations()
+        return 0
+    if args.maintenance:
+        run_maintenance_step()
+        return 0
+
+    print("\n🚀 Starting Restaurant ELT Pipeline")
+    print("=" * 60)
+
+    try:
+        manifest = selection.load_manifest(manifest_path)
+        planned = _plan_run(args, manifest, manifest_path)
+        if planned is None or args.dry_run:
+            return 0
+        selected, skipped, fingerprints = planned
+
+        def completed(model):
+            selection.record_completed(manifest_path, manifest, [model], fingerprints)
+
+        if args.in_memory:
+            # Nothing is durable before the checkpoint, so nothing is recorded
+            completed = None
+        else:
+            selection.start_run(manifest_path, manifest, selected | skipped, skipped)
+
+        try:
+            _execute_run(args, selected, completed)
+        except Exception:
+            if completed:
+                selection.finish_run(manifest_path, manifest, "failed")
+            raise
+        if completed:
+            selection.finish_run(manifest_path, manifest, "succeeded")
+        _print_finished()
         return 0
     except Exception as error:
         print(f"\n❌ Pipeline failed: {error}")
@@ -0,0 +1,252 @@
+"""Store-sharded parallel pipeline runner.
+
+The order, item and ticket lineage is split into ``--workers`` DuckDB shard
+files (by ``store_id`` or by a hash of ``order_id``; tickets always by a hash
+of ``ticket_id`` so every version of a ticket lands in the same shard). Each
+shard is built by its own process from the warehouse's bronze tables,
+attached read-only. The gold stage then ATTACHes every shard, unions the
+silver and fact tables, and runs the remaining gold models (including the
+ticket attribution and per-order counts, which need every shard) as usual.
+
+    python run_sharded.py --workers 4 --shard-by store_id
+    python run_sharded.py --skip-bronze --benchmark 1,2,4,8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import duckdb
+from dotenv import load_dotenv
+
+import run_pipeline
+from src import selection
+from src.materialization import build_model, prepare_relation
+from src.profiling import execute_sql
+from src.resources.schema_registry import prepare_ticket_projection
+
+load_dotenv()
+
+# Shard of an order row ``o``. Stores are dealt round-robin (``s.shard``)
+# so a handful of stores still spreads evenly over the shards.
+ORDER_SHARD_KEYS = {
+    "store_id": "COALESCE(s.shard, md5_number_lower(o.store_id) % {n})",
+    "order_id": "md5_number_lower(o.id) % {n}",
+}
+SHARD_SILVER_MODELS = ["orders", "items", "tickets"]
+SHARD_GOLD_MODELS = ["fact_orders"]
+# Every other silver model is a dimension built once in the warehouse
+DIMENSION_MODELS = [
+    model for model in selection.LAYERS["silver"] if model not in SHARD_SILVER_MODELS
+]
+# Ticket attribution matches a customer's tickets and orders, which live in
+# different shards, so it and every later gold model run on the merged tables
+MERGED_GOLD_MODELS = [
+    model for model in run_pipeline.GOLD_SQL_MODELS if model not in SHARD_GOLD_MODELS
+]
+
+# How each sharded table is combined in the warehouse
+UNION_TABLES = {
+    "silver.orders": "order_id",
+    "silver.items": "order_id, item_id",
+    "silver.tickets": "ticket_id",
+    "silver.tickets_history": "ticket_id",
+    "silver.ticket_tags": "tag, ticket_id",
+    "gold.fact_orders": "order_id",
+}
+
+
+def _read_sql(layer: str, name: str) -> str:
+    with open(f"sql/{layer}/{name}.sql", "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _shard_path(shard_dir: str, shard: int) -> str:
+    return os.path.join(shard_dir, f"shard_{shard:03d}.duckdb")
+
+
+def _reset_shards_if_layout_changed(shard_dir: str, n_shards: int, shard_by: str):
+    """Shard files hold incremental ticket history; drop them on relayout."""
+    layout = {"shards": n_shards, "shard_by": shard_by}
+    marker = os.path.join(shard_dir, "layout.json")
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == layout:
+                return
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.makedirs(shard_dir)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(layout, f)
+
+
+def build_shard(shard: int, n_shards: int, shard_by: str, warehouse_path: str, shard_dir: str):
+    """Build silver and gold fact tables for one shard (runs in a worker)."""
+    start = time.perf_counter()
+    conn = duckdb.connect(_shard_path(shard_dir, shard))
+    try:
+        conn.execute(f"SET threads = {max(1, (os.cpu_count() or 1) // n_shards)}")
+        conn.execute(f"ATTACH '{warehouse_path}' AS wh (READ_ONLY)")
+        for schema in ("bronze", "silver", "gold"):
+            conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE order_shards AS
+            WITH store_shards AS (
+                SELECT id AS store_id, (ROW_NUMBER() OVER (ORDER BY id) - 1) % {n_shards} AS shard
+                FROM wh.bronze.raw_stores
+            )
+            SELECT DISTINCT
+                o.id AS order_id,
+                {ORDER_SHARD_KEYS[shard_by].format(n=n_shards)} AS shard
+            FROM wh.bronze.raw_orders o
+            LEFT JOIN store_shards s ON s.store_id = o.store_id
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE bronze.raw_orders AS
+            SELECT * FROM wh.bronze.raw_orders
+            WHERE id IN (SELECT order_id FROM order_shards WHERE shard = {shard})
+            """
+        )
+        # Items follow their order; items without one fall back to a hash
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE bronze.raw_items AS
+            SELECT i.*
+            FROM wh.bronze.raw_items i
+            LEFT JOIN order_shards os ON os.order_id = i.order_id
+            WHERE COALESCE(
+                os.shard,
+                md5_number_lower(COALESCE(i.order_id, '')) % {n_shards}
+            ) = {shard}
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE bronze.raw_tickets AS
+            SELECT * FROM wh.bronze.raw_tickets
+            WHERE md5_number_lower(ticket_id) % {n_shards} = {shard}
+            """
+        )
+        conn.execute(
+            "CREATE OR REPLACE TABLE silver.products_snapshot AS "
+            "SELECT * FROM wh.silver.products_snapshot"
+        )
+        conn.execute("DETACH wh")
+
+        prepare_ticket_projection(conn)
+        for model in SHARD_SILVER_MODELS:
+            execute_sql(conn, _read_sql("silver", model), f"shard{shard}.silver.{model}")
+        for model in SHARD_GOLD_MODELS:
+            execute_sql(conn, _read_sql("gold", model), f"shard{shard}.gold.{model}")
+
+        orders = conn.execute("SELECT COUNT(*) FROM gold.fact_orders").fetchone()[0]
+        return {"shard": shard, "orders": orders, "seconds": time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def run_shards(n_shards: int, shard_by: str, warehouse_path: str, shard_dir: str) -> list:
+    """Build every shard in its own process."""
+    _reset_shards_if_layout_changed(shard_dir, n_shards, shard_by)
+    with ProcessPoolExecutor(max_workers=n_shards) as pool:
+        futures = [
+            pool.submit(build_shard, shard, n_shards, shard_by, warehouse_path, shard_dir)
+            for shard in range(n_shards)
+        ]
+        return [future.result() for future in futures]
+
+
+def merge_shards(conn, n_shards: int, shard_dir: str):
+    """ATTACH the shards and combine their tables into the warehouse."""
+    aliases = [f"shard_{shard}" for shard in range(n_shards)]
+    for alias, shard in zip(aliases, range(n_shards)):
+        conn.execute(f"ATTACH '{_shard_path(shard_dir, shard)}' AS {alias} (READ_ONLY)")
+    try:
+        conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
+        conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
+        for table, order_by in UNION_TABLES.items():
+            prepare_relation(conn, table, "table")
+            union = " UNION ALL ".join(f"SELECT * FROM {alias}.{table}" for alias in aliases)
+            conn.execute(f"CREATE OR REPLACE TABLE {table} AS {union} ORDER BY {order_by}")
+    finally:
+        for alias in aliases:
+            conn.execute(f"DETACH {alias}")
+
+
+def run_sharded_layers(n_shards: int, shard_by: str) -> float:
+    """Run the sharded silver/gold build and return its wall time."""
+    db_path = os.getenv("DUCKDB_PATH", "data/warehouse.duckdb")
+    shard_dir = os.getenv("SHARD_DIR", "data/shards")
+
+    print("\n" + "=" * 60)
+    print(f"🧩 SHARDED BUILD - {n_shards} shards by {shard_by}")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    for result in run_shards(n_shards, shard_by, db_path, shard_dir):
+        print(
+            f"✅ Shard {result['shard']}: {result['orders']:,} orders "
+            f"in {result['seconds']:.2f}s"
+        )
+
+    conn = duckdb.connect(db_path)
+    try:
+        merge_shards(conn, n_shards, shard_dir)
+        for model in MERGED_GOLD_MODELS:
+            build_model(conn, _read_sql("gold", model), f"gold.{model}")
+        count = conn.execute("SELECT COUNT(*) FROM gold.fact_orders").fetchone()[0]
+        print(f"✅ Merged gold.fact_orders with {count:,} rows")
+        run_pipeline._display_metrics(conn)  # pylint: disable=protected-access
+    finally:
+        conn.close()
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the pipeline with a sharded order/item/ticket lineage."""
+    parser = argparse.ArgumentParser(description="Store-sharded parallel pipeline")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-by", choices=sorted(ORDER_SHARD_KEYS), default="store_id")
+    parser.add_argument("--skip-bronze", action="store_true", help="Reuse existing bronze")
+    parser.add_argument(
+        "--benchmark", help="Comma-separated worker counts to time, e.g. 1,2,4,8"
+    )
+    args = parser.parse_args()
+
+    print("\n🚀 Starting Restaurant ELT Pipeline (sharded)")
+    try:
+        if not args.skip_bronze:
+            run_pipeline.run_bronze_layer()
+        run_pipeline.run_silver_layer(DIMENSION_MODELS)
+
+        if args.benchmark:
+            timings = {
+                n: run_sharded_layers(n, args.shard_by)
+                for n in (int(x) for x in args.benchmark.split(","))
+            }
+            print("\n⏱️  Sharded build wall time")
+            for n, seconds in timings.items():
+                speedup = timings[min(timings)] / seconds
+                print(f"   {n:>3} workers: {seconds:8.2f}s  ({speedup:.2f}x)")
+        else:
+            run_sharded_layers(args.workers, args.shard_by)
+            run_pipeline.run_publish_step()
+
+        print("\n✅ Pipeline completed successfully!")
+        return 0
+    except Exception as error:
+        print(f"\n❌ Pipeline failed: {error}")
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
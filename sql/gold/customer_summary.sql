@@ -0,0 +1,141 @@
+-- Customer-grain lifetime mart keyed on customer_id, recomputed only for the
+-- customers touched since the last run and upserted into the primary key:
+--   customer_summary_orders: the customer and loaded_at of each order folded
+--                            in; silver orders that differ are new, reloaded
+--                            from a changed file, moved or removed
+--   customer_summary_blobs:  the ticket blob loads (source_blob, loaded_at)
+--                            folded in; every version of a ticket in a new
+--                            load names its old customer too
+-- Customers that are new or renamed in silver.customers are touched as well.
+-- Ticket customer ids may be typed as UUID, so they are compared as VARCHAR.
+-- gold.customer_rfm(as_of) scores recency, frequency and monetary value in
+-- quintiles at query time, since a customer's scores move with everyone else's.
+CREATE TABLE IF NOT EXISTS gold.customer_summary (
+    customer_id VARCHAR PRIMARY KEY,
+    customer_name VARCHAR,
+    order_count BIGINT,
+    lifetime_value DECIMAL(38, 2),
+    average_order_value DOUBLE,
+    first_order_ts TIMESTAMP,
+    last_order_ts TIMESTAMP,
+    ticket_count BIGINT,
+    open_ticket_count BIGINT,       -- open or pending
+    last_ticket_ts TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS gold.customer_summary_orders AS
+SELECT order_id, customer_id, loaded_at FROM silver.orders LIMIT 0;
+
+CREATE TABLE IF NOT EXISTS gold.customer_summary_blobs AS
+SELECT DISTINCT source_blob, loaded_at FROM silver.tickets_history LIMIT 0;
+
+-- Upgrades a ledger keyed by name only, as for gold.metrics_ticket_blobs
+ALTER TABLE gold.customer_summary_blobs ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMP;
+
+-- Orders whose customer or load differs from the one folded in
+CREATE OR REPLACE TEMP TABLE summary_changed_orders AS
+SELECT
+    COALESCE(o.order_id, f.order_id) AS order_id,
+    o.customer_id,
+    f.customer_id AS old_customer_id
+FROM silver.orders o
+FULL JOIN gold.customer_summary_orders f ON f.order_id = o.order_id
+WHERE o.order_id IS NULL
+   OR f.order_id IS NULL
+   OR o.loaded_at IS DISTINCT FROM f.loaded_at
+   OR o.customer_id IS DISTINCT FROM f.customer_id;
+
+CREATE OR REPLACE TEMP TABLE summary_new_blobs AS
+SELECT DISTINCT source_blob, loaded_at
+FROM silver.tickets_history h
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM gold.customer_summary_blobs b
+    WHERE b.source_blob = h.source_blob AND b.loaded_at = h.loaded_at
+);
+
+CREATE OR REPLACE TEMP TABLE summary_customers AS
+SELECT customer_id FROM summary_changed_orders WHERE customer_id IS NOT NULL
+UNION
+SELECT old_customer_id FROM summary_changed_orders WHERE old_customer_id IS NOT NULL
+UNION
+SELECT CAST(customer_id AS VARCHAR)
+FROM silver.tickets_history
+WHERE ticket_id IN (
+    SELECT h.ticket_id
+    FROM silver.tickets_history h
+    JOIN summary_new_blobs n ON n.source_blob = h.source_blob AND n.loaded_at = h.loaded_at
+)
+  AND customer_id IS NOT NULL
+UNION
+SELECT c.customer_id
+FROM silver.customers c
+LEFT JOIN gold.customer_summary s ON s.customer_id = c.customer_id
+WHERE s.customer_id IS NULL OR s.customer_name IS DISTINCT FROM c.customer_name;
+
+INSERT OR REPLACE INTO gold.customer_summary
+WITH orders AS (
+    SELECT
+        customer_id,
+        COUNT(*) AS order_count,
+        SUM(order_total) AS lifetime_value,
+        MIN(order_ts) AS first_order_ts,
+        MAX(order_ts) AS last_order_ts
+    FROM silver.orders
+    WHERE customer_id IN (SELECT customer_id FROM summary_customers)
+    GROUP BY customer_id
+),
+tickets AS (
+    SELECT
+        CAST(customer_id AS VARCHAR) AS customer_id,
+        COUNT(*) AS ticket_count,
+        COUNT(*) FILTER (WHERE status IN ('open', 'pending')) AS open_ticket_count,
+        MAX(ticket_ts) AS last_ticket_ts
+    FROM silver.tickets
+    WHERE CAST(customer_id AS VARCHAR) IN (SELECT customer_id FROM summary_customers)
+    GROUP BY 1
+)
+SELECT
+    s.customer_id,
+    c.customer_name,
+    COALESCE(o.order_count, 0) AS order_count,
+    COALESCE(o.lifetime_value, 0) AS lifetime_value,
+    CAST(o.lifetime_value AS DOUBLE) / o.order_count AS average_order_value,
+    o.first_order_ts,
+    o.last_order_ts,
+    COALESCE(t.ticket_count, 0) AS ticket_count,
+    COALESCE(t.open_ticket_count, 0) AS open_ticket_count,
+    t.last_ticket_ts,
+    now() AS updated_at
+FROM summary_customers s
+LEFT JOIN silver.customers c ON c.customer_id = s.customer_id
+LEFT JOIN orders o ON o.customer_id = s.customer_id
+LEFT JOIN tickets t ON t.customer_id = s.customer_id;
+
+DELETE FROM gold.customer_summary_orders
+WHERE order_id IN (SELECT order_id FROM summary_changed_orders);
+
+INSERT INTO gold.customer_summary_orders
+SELECT order_id, customer_id, loaded_at
+FROM silver.orders
+WHERE order_id IN (SELECT order_id FROM summary_changed_orders);
+
+DELETE FROM gold.customer_summary_blobs WHERE loaded_at IS NULL;
+
+INSERT INTO gold.customer_summary_blobs BY NAME
+SELECT source_blob, loaded_at FROM summary_new_blobs;
+
+-- Scores of 5 are the most recent, most frequent and highest-spending fifth
+CREATE OR REPLACE MACRO gold.customer_rfm(as_of) AS TABLE
+SELECT
+    customer_id,
+    customer_name,
+    date_diff('day', last_order_ts, CAST(as_of AS TIMESTAMP)) AS recency_days,
+    order_count AS frequency,
+    lifetime_value AS monetary,
+    NTILE(5) OVER (ORDER BY last_order_ts) AS recency_score,
+    NTILE(5) OVER (ORDER BY order_count) AS frequency_score,
+    NTILE(5) OVER (ORDER BY lifetime_value) AS monetary_score
+FROM gold.customer_summary
+WHERE order_count > 0;
@@ -0,0 +1,11 @@
+CREATE OR REPLACE TABLE gold.distribution_metrics AS
+SELECT
+    q.store_id,
+    q.order_count,
+    c.distinct_customers,
+    q.median_order_value,
+    q.p95_order_value
+FROM gold.order_value_quantiles(TIMESTAMP '1900-01-01', TIMESTAMP '9999-12-31') q
+LEFT JOIN gold.distinct_customers(TIMESTAMP '1900-01-01', TIMESTAMP '9999-12-31') c
+    ON c.store_id IS NOT DISTINCT FROM q.store_id
+ORDER BY q.store_id NULLS FIRST;
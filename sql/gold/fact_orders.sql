@@ -8,8 +8,14 @@ SELECT
     o.subtotal,
     o.tax_paid,
     o.order_total,
-    COUNT(i.item_id) AS item_count
+    COUNT(i.item_id) AS item_count,
+    -- Catalogue price of the items as it was when the order was placed
+    SUM(p.product_price) AS items_list_price
 FROM silver.orders o
 LEFT JOIN silver.items i ON i.order_id = o.order_id
+LEFT JOIN silver.products_snapshot p
+    ON p.product_sku = i.product_sku
+   AND o.order_ts >= p.valid_from
+   AND (p.valid_to IS NULL OR o.order_ts < p.valid_to)
 GROUP BY o.order_id, o.customer_id, o.store_id, o.order_ts, o.subtotal, o.tax_paid, o.order_total
 ORDER BY o.order_id;
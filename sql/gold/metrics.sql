@@ -1,15 +1,225 @@
-CREATE OR REPLACE TABLE gold.metrics AS
-WITH aov AS (
-    SELECT AVG(order_total) AS average_order_value
+-- KPIs derived from additive state that is only updated from the delta:
+--   metrics_orders:        the day, store and total of every order folded in;
+--                          fact_orders rows that differ are new, restated or
+--                          removed, and their old and new days are
+--                          re-aggregated
+--   metrics_ticket_state:  per-order ticket counts, adjusted only for tickets
+--                          that appeared in ticket blobs not folded in yet
+--   metrics_ticket_orders / metrics_ticket_blobs: the order each counted
+--                          ticket is attributed to, and the blob loads
+--                          (source_blob, loaded_at) folded in; a changed
+--                          blob is loaded again and its new load is folded in
+--   metrics_daily:         the KPI time series per order date and store,
+--                          upserted for the old and new days of changed
+--                          orders and the days of orders whose ticket
+--                          counts changed. Tickets of
+--                          orders missing from fact_orders are kept in an
+--                          undated row.
+-- gold.metrics sums metrics_daily, which counts direct tickets only, and adds
+-- the counts of gold.ticket_attribution; sql/gold/metrics_verify.sql checks
+-- it against a full recompute. Ticket order ids may be typed as UUID, so they
+-- are compared with fact_orders as VARCHAR.
+-- Superseded by gold.metrics_daily
+DROP TABLE IF EXISTS gold.metrics_order_state;
+
+CREATE TABLE IF NOT EXISTS gold.metrics_ticket_blobs AS
+SELECT DISTINCT source_blob, loaded_at FROM silver.tickets_history LIMIT 0;
+
+-- Blob ledgers keyed by name only (before loaded_at was recorded) get the
+-- column; their rows match no load, so every load is folded in once more and
+-- the legacy rows are dropped. gold.customer_summary_blobs is upgraded alike.
+ALTER TABLE gold.metrics_ticket_blobs ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMP;
+
+CREATE TABLE IF NOT EXISTS gold.metrics_ticket_orders AS
+SELECT ticket_id, order_id FROM silver.tickets LIMIT 0;
+
+CREATE TABLE IF NOT EXISTS gold.metrics_ticket_state AS
+SELECT order_id, COUNT(*) AS ticket_count
+FROM silver.tickets
+GROUP BY order_id
+LIMIT 0;
+
+CREATE OR REPLACE TEMP TABLE metrics_new_blobs AS
+SELECT DISTINCT source_blob, loaded_at
+FROM silver.tickets_history h
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM gold.metrics_ticket_blobs b
+    WHERE b.source_blob = h.source_blob AND b.loaded_at = h.loaded_at
+);
+
+CREATE OR REPLACE TEMP TABLE metrics_touched_tickets AS
+SELECT DISTINCT h.ticket_id
+FROM silver.tickets_history h
+JOIN metrics_new_blobs n ON n.source_blob = h.source_blob AND n.loaded_at = h.loaded_at;
+
+-- +1 for the order each touched ticket now belongs to, -1 for the old one
+CREATE OR REPLACE TEMP TABLE metrics_ticket_deltas AS
+SELECT order_id, SUM(delta) AS delta
+FROM (
+    SELECT order_id, 1 AS delta
+    FROM silver.tickets
+    WHERE ticket_id IN (SELECT ticket_id FROM metrics_touched_tickets)
+      AND order_id IS NOT NULL
+    UNION ALL
+    SELECT order_id, -1 AS delta
+    FROM gold.metrics_ticket_orders
+    WHERE ticket_id IN (SELECT ticket_id FROM metrics_touched_tickets)
+)
+GROUP BY order_id
+HAVING SUM(delta) <> 0;
+
+CREATE OR REPLACE TEMP TABLE metrics_ticket_counts AS
+SELECT
+    d.order_id,
+    COALESCE(s.ticket_count, 0) + d.delta AS ticket_count
+FROM metrics_ticket_deltas d
+LEFT JOIN gold.metrics_ticket_state s ON s.order_id = d.order_id;
+
+DELETE FROM gold.metrics_ticket_state
+WHERE order_id IN (SELECT order_id FROM metrics_ticket_deltas);
+
+INSERT INTO gold.metrics_ticket_state
+SELECT order_id, ticket_count
+FROM metrics_ticket_counts
+WHERE ticket_count > 0;
+
+DELETE FROM gold.metrics_ticket_orders
+WHERE ticket_id IN (SELECT ticket_id FROM metrics_touched_tickets);
+
+INSERT INTO gold.metrics_ticket_orders
+SELECT ticket_id, order_id
+FROM silver.tickets
+WHERE ticket_id IN (SELECT ticket_id FROM metrics_touched_tickets)
+  AND order_id IS NOT NULL;
+
+DELETE FROM gold.metrics_ticket_blobs WHERE loaded_at IS NULL;
+
+INSERT INTO gold.metrics_ticket_blobs BY NAME
+SELECT source_blob, loaded_at FROM metrics_new_blobs;
+
+CREATE TABLE IF NOT EXISTS gold.metrics_orders AS
+SELECT order_id, order_date, store_id, order_total FROM gold.fact_orders LIMIT 0;
+
+-- Orders whose day, store or total differs from the one folded in
+CREATE OR REPLACE TEMP TABLE metrics_changed_orders AS
+SELECT
+    COALESCE(f.order_id, s.order_id) AS order_id,
+    f.order_date,
+    s.order_date AS old_order_date
+FROM gold.fact_orders f
+FULL JOIN gold.metrics_orders s ON s.order_id = f.order_id
+WHERE f.order_id IS NULL
+   OR s.order_id IS NULL
+   OR f.order_date IS DISTINCT FROM s.order_date
+   OR f.store_id IS DISTINCT FROM s.store_id
+   OR f.order_total IS DISTINCT FROM s.order_total;
+
+CREATE TABLE IF NOT EXISTS gold.metrics_daily (
+    order_date TIMESTAMP,
+    store_id VARCHAR,
+    order_count BIGINT,             -- orders with a positive total
+    order_total_sum DECIMAL(38, 2),
+    average_order_value DOUBLE,
+    ticketed_orders BIGINT,         -- orders with at least one ticket
+    ticket_count BIGINT,
+    avg_tickets_per_order DOUBLE,
+    updated_at TIMESTAMP
+);
+
+-- An order that moved days, or is gone, also rewrites the day it left
+CREATE OR REPLACE TEMP TABLE metrics_dates AS
+SELECT order_date
+FROM metrics_changed_orders
+WHERE order_date IS NOT NULL
+UNION
+SELECT old_order_date
+FROM metrics_changed_orders
+WHERE old_order_date IS NOT NULL
+UNION
+SELECT DISTINCT f.order_date
+FROM gold.fact_orders f
+WHERE f.order_id IN (SELECT CAST(order_id AS VARCHAR) FROM metrics_ticket_deltas);
+
+DELETE FROM gold.metrics_daily
+WHERE order_date IN (SELECT order_date FROM metrics_dates)
+   OR order_date IS NULL;
+
+INSERT INTO gold.metrics_daily
+WITH orders AS (
+    SELECT
+        order_date,
+        store_id,
+        COUNT(*) FILTER (WHERE order_total > 0) AS order_count,
+        COALESCE(SUM(order_total) FILTER (WHERE order_total > 0), 0) AS order_total_sum
     FROM gold.fact_orders
-    WHERE order_total > 0
+    WHERE order_date IN (SELECT order_date FROM metrics_dates)
+    GROUP BY order_date, store_id
 ),
 tickets AS (
-    SELECT AVG(ticket_count) AS avg_tickets_per_order
-    FROM gold.tickets_per_order
+    SELECT
+        f.order_date,
+        f.store_id,
+        COUNT(*) AS ticketed_orders,
+        SUM(s.ticket_count) AS ticket_count
+    FROM gold.metrics_ticket_state s
+    JOIN gold.fact_orders f ON f.order_id = CAST(s.order_id AS VARCHAR)
+    WHERE f.order_date IN (SELECT order_date FROM metrics_dates)
+    GROUP BY f.order_date, f.store_id
 )
 SELECT
-    ROUND(aov.average_order_value, 2) AS average_order_value,
-    ROUND(COALESCE(tickets.avg_tickets_per_order, 0), 4) AS avg_tickets_per_order
-FROM aov
-LEFT JOIN tickets ON TRUE;
+    o.order_date,
+    o.store_id,
+    o.order_count,
+    o.order_total_sum,
+    CAST(o.order_total_sum AS DOUBLE) / NULLIF(o.order_count, 0) AS average_order_value,
+    COALESCE(t.ticketed_orders, 0) AS ticketed_orders,
+    COALESCE(t.ticket_count, 0) AS ticket_count,
+    CAST(t.ticket_count AS DOUBLE) / t.ticketed_orders AS avg_tickets_per_order,
+    now() AS updated_at
+FROM orders o
+LEFT JOIN tickets t ON t.order_date = o.order_date AND t.store_id = o.store_id
+ORDER BY o.order_date, o.store_id;
+
+INSERT INTO gold.metrics_daily
+SELECT
+    NULL AS order_date,
+    NULL AS store_id,
+    0 AS order_count,
+    0 AS order_total_sum,
+    NULL AS average_order_value,
+    COUNT(*) AS ticketed_orders,
+    SUM(ticket_count) AS ticket_count,
+    CAST(SUM(ticket_count) AS DOUBLE) / COUNT(*) AS avg_tickets_per_order,
+    now() AS updated_at
+FROM gold.metrics_ticket_state
+WHERE CAST(order_id AS VARCHAR) NOT IN (SELECT order_id FROM gold.fact_orders)
+HAVING COUNT(*) > 0;
+
+DELETE FROM gold.metrics_orders
+WHERE order_id IN (SELECT order_id FROM metrics_changed_orders);
+
+INSERT INTO gold.metrics_orders
+SELECT order_id, order_date, store_id, order_total
+FROM gold.fact_orders
+WHERE order_id IN (SELECT order_id FROM metrics_changed_orders);
+
+-- Ticket counts by how gold.ticket_attribution matched them to an order
+CREATE OR REPLACE TABLE gold.metrics AS
+WITH kpis AS (
+    SELECT
+        ROUND(CAST(SUM(order_total_sum) AS DOUBLE) / SUM(order_count), 2)
+            AS average_order_value,
+        ROUND(
+            COALESCE(CAST(SUM(ticket_count) AS DOUBLE) / NULLIF(SUM(ticketed_orders), 0), 0), 4
+        ) AS avg_tickets_per_order
+    FROM gold.metrics_daily
+),
+attribution AS (
+    SELECT
+        COUNT(*) FILTER (WHERE attribution = 'direct') AS direct_tickets,
+        COUNT(*) FILTER (WHERE attribution = 'asof') AS attributed_tickets,
+        COUNT(*) FILTER (WHERE attribution = 'unattributed') AS unattributed_tickets
+    FROM gold.ticket_attribution
+)
+SELECT * FROM kpis, attribution;
@@ -0,0 +1,27 @@
+-- The KPIs summed from gold.metrics_daily next to a full recompute over the
+-- gold marts
+WITH incremental AS (
+    SELECT
+        CAST(SUM(order_total_sum) AS DOUBLE) / SUM(order_count) AS average_order_value,
+        COALESCE(CAST(SUM(ticket_count) AS DOUBLE) / NULLIF(SUM(ticketed_orders), 0), 0)
+            AS avg_tickets_per_order
+    FROM gold.metrics_daily
+),
+full_recompute AS (
+    SELECT
+        (
+            SELECT AVG(order_total)
+            FROM gold.fact_orders
+            WHERE order_total > 0
+        ) AS average_order_value,
+        (
+            SELECT COALESCE(AVG(ticket_count), 0)
+            FROM gold.tickets_per_order
+            WHERE ticket_count > 0
+        ) AS avg_tickets_per_order
+)
+SELECT 'average_order_value' AS metric, i.average_order_value, f.average_order_value
+FROM incremental i, full_recompute f
+UNION ALL
+SELECT 'avg_tickets_per_order', i.avg_tickets_per_order, f.avg_tickets_per_order
+FROM incremental i, full_recompute f;
@@ -0,0 +1,155 @@
+-- Mergeable per-day, per-store sketches over gold.fact_orders:
+--   customer_hll:       sparse HyperLogLog registers (p = 12, 4096 registers)
+--                       over customer_id, merged with MAX(rho)
+--   order_value_sketch: DDSketch log buckets (1% relative error) over
+--                       order_total, merged with SUM(order_count)
+--   sketch_orders:      the day, store, customer and total of every order
+--                       sketched; fact_orders rows that differ are new,
+--                       restated or removed, and their old and new days are
+--                       sketched again
+CREATE TABLE IF NOT EXISTS gold.customer_hll (
+    order_date TIMESTAMP,
+    store_id VARCHAR,
+    register SMALLINT,
+    rho TINYINT
+);
+
+CREATE TABLE IF NOT EXISTS gold.order_value_sketch (
+    order_date TIMESTAMP,
+    store_id VARCHAR,
+    bucket INTEGER,
+    order_count BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS gold.sketch_orders AS
+SELECT order_id, order_date, store_id, customer_id, order_total FROM gold.fact_orders LIMIT 0;
+
+-- Orders whose day, store, customer or total differs from the one sketched
+CREATE OR REPLACE TEMP TABLE sketch_changed_orders AS
+SELECT
+    COALESCE(f.order_id, s.order_id) AS order_id,
+    f.order_date,
+    s.order_date AS old_order_date
+FROM gold.fact_orders f
+FULL JOIN gold.sketch_orders s ON s.order_id = f.order_id
+WHERE f.order_id IS NULL
+   OR s.order_id IS NULL
+   OR f.order_date IS DISTINCT FROM s.order_date
+   OR f.store_id IS DISTINCT FROM s.store_id
+   OR f.customer_id IS DISTINCT FROM s.customer_id
+   OR f.order_total IS DISTINCT FROM s.order_total;
+
+CREATE OR REPLACE TEMP TABLE sketch_dates AS
+SELECT order_date FROM sketch_changed_orders WHERE order_date IS NOT NULL
+UNION
+SELECT old_order_date FROM sketch_changed_orders WHERE old_order_date IS NOT NULL;
+
+DELETE FROM gold.customer_hll
+WHERE order_date IN (SELECT order_date FROM sketch_dates);
+
+DELETE FROM gold.order_value_sketch
+WHERE order_date IN (SELECT order_date FROM sketch_dates);
+
+INSERT INTO gold.customer_hll
+WITH hashed AS (
+    SELECT
+        order_date,
+        store_id,
+        md5_number_lower(customer_id) AS h
+    FROM gold.fact_orders
+    WHERE order_date IN (SELECT order_date FROM sketch_dates)
+),
+split AS (
+    SELECT
+        order_date,
+        store_id,
+        CAST(h % 4096 AS SMALLINT) AS register,
+        CAST(h >> 12 AS BIGINT) AS w
+    FROM hashed
+)
+SELECT
+    order_date,
+    store_id,
+    register,
+    -- rho = 1 + number of trailing zero bits in the remaining 52 bits
+    MAX(CASE
+        WHEN w = 0 THEN 53
+        ELSE CAST(LOG2(GREATEST(w & -w, 1)) AS TINYINT) + 1
+    END) AS rho
+FROM split
+GROUP BY order_date, store_id, register;
+
+INSERT INTO gold.order_value_sketch
+SELECT
+    order_date,
+    store_id,
+    CAST(CEIL(LN(order_total) / LN(1.01 / 0.99)) AS INTEGER) AS bucket,
+    COUNT(*) AS order_count
+FROM gold.fact_orders
+WHERE order_date IN (SELECT order_date FROM sketch_dates)
+  AND order_total > 0
+GROUP BY ALL;
+
+DELETE FROM gold.sketch_orders
+WHERE order_id IN (SELECT order_id FROM sketch_changed_orders);
+
+INSERT INTO gold.sketch_orders
+SELECT order_id, order_date, store_id, customer_id, order_total
+FROM gold.fact_orders
+WHERE order_id IN (SELECT order_id FROM sketch_changed_orders);
+
+-- Distinct customers per store (store_id NULL = all stores) between two dates
+CREATE OR REPLACE MACRO gold.distinct_customers(date_from, date_to) AS TABLE
+WITH registers AS (
+    SELECT store_id, register, MAX(rho) AS rho
+    FROM gold.customer_hll
+    WHERE order_date BETWEEN date_from AND date_to
+    GROUP BY GROUPING SETS ((store_id, register), (register))
+),
+sums AS (
+    SELECT
+        store_id,
+        4096 - COUNT(*) AS zero_registers,
+        (4096 - COUNT(*)) + SUM(POW(2, -rho)) AS harmonic_sum
+    FROM registers
+    GROUP BY store_id
+)
+SELECT
+    store_id,
+    CAST(ROUND(CASE
+        WHEN 0.7213 / (1 + 1.079 / 4096) * 4096 * 4096 / harmonic_sum <= 2.5 * 4096
+             AND zero_registers > 0
+            THEN 4096 * LN(4096 / zero_registers)
+        ELSE 0.7213 / (1 + 1.079 / 4096) * 4096 * 4096 / harmonic_sum
+    END) AS BIGINT) AS distinct_customers
+FROM sums;
+
+-- Order value quantiles per store (store_id NULL = all stores) between two dates
+CREATE OR REPLACE MACRO gold.order_value_quantiles(date_from, date_to) AS TABLE
+WITH buckets AS (
+    SELECT store_id, bucket, SUM(order_count) AS order_count
+    FROM gold.order_value_sketch
+    WHERE order_date BETWEEN date_from AND date_to
+    GROUP BY GROUPING SETS ((store_id, bucket), (bucket))
+),
+ranked AS (
+    SELECT
+        store_id,
+        bucket,
+        SUM(order_count) OVER (
+            PARTITION BY store_id ORDER BY bucket
+            ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+        ) AS cumulative,
+        SUM(order_count) OVER (PARTITION BY store_id) AS total
+    FROM buckets
+)
+SELECT
+    store_id,
+    MAX(total) AS order_count,
+    -- Representative value of a bucket k is 2 * gamma^k / (gamma + 1)
+    ROUND(2 * POW(1.01 / 0.99, MIN(bucket) FILTER (WHERE cumulative > 0.50 * (total - 1)))
+          / (1.01 / 0.99 + 1), 2) AS median_order_value,
+    ROUND(2 * POW(1.01 / 0.99, MIN(bucket) FILTER (WHERE cumulative > 0.95 * (total - 1)))
+          / (1.01 / 0.99 + 1), 2) AS p95_order_value
+FROM ranked
+GROUP BY store_id;
@@ -0,0 +1,40 @@
+-- Every ticket with the order it is counted against:
+--   direct:       the ticket's own order_id
+--   asof:         no order_id, so the customer's most recent order placed at
+--                 or before the ticket
+--   unattributed: no order_id and no earlier order of the customer
+-- The ASOF JOIN sorts tickets and orders by (customer_id, timestamp) and
+-- merges them, O(n log n) instead of scanning a customer's orders per ticket.
+-- The tickets are read inline: a fresh temp table has no statistics, and an
+-- ASOF side estimated as tiny is planned as a nested loop join instead.
+-- Ticket ids may be typed as UUID, so they are kept as VARCHAR like orders.
+CREATE OR REPLACE TABLE gold.ticket_attribution AS
+SELECT
+    ticket_id,
+    CAST(customer_id AS VARCHAR) AS customer_id,
+    ticket_ts,
+    CAST(order_id AS VARCHAR) AS order_id,
+    'direct' AS attribution
+FROM silver.tickets
+WHERE order_id IS NOT NULL
+UNION ALL
+SELECT
+    t.ticket_id,
+    t.customer_id,
+    t.ticket_ts,
+    o.order_id,
+    CASE WHEN o.order_id IS NULL THEN 'unattributed' ELSE 'asof' END AS attribution
+FROM (
+    SELECT ticket_id, CAST(customer_id AS VARCHAR) AS customer_id, ticket_ts
+    FROM silver.tickets
+    WHERE order_id IS NULL
+) t
+ASOF LEFT JOIN (
+    -- Orders placed at the same instant go to the highest order_id
+    SELECT customer_id, order_ts, MAX(order_id) AS order_id
+    FROM silver.orders
+    GROUP BY customer_id, order_ts
+) o
+    ON o.customer_id = t.customer_id
+   AND o.order_ts <= t.ticket_ts
+ORDER BY ticket_id;
@@ -0,0 +1,104 @@
+-- BM25 inverted index over ticket subject and description.
+--
+-- gold.ticket_search_docs holds one row per ticket with the columns search
+-- results are joined to and its length in terms; gold.ticket_search_terms
+-- holds (term, ticket_id, tf, doc_len), repeating the document length so
+-- scoring never joins back to the docs. Only tickets whose indexed columns
+-- changed since the last refresh are re-tokenized. The tokenizer (lowercase,
+-- strip accents, split on anything but [a-z0-9]) must match the
+-- search_tickets query in src/service/gold_api.py.
+CREATE OR REPLACE TEMP VIEW ticket_search_source AS
+SELECT
+    t.ticket_id,
+    t.order_id,
+    t.customer_id,
+    c.customer_name,
+    t.subject,
+    t.status,
+    t.ticket_ts,
+    t.description,
+    MD5(concat_ws(
+        '|',
+        COALESCE(CAST(t.order_id AS VARCHAR), '\N'),
+        COALESCE(CAST(t.customer_id AS VARCHAR), '\N'),
+        COALESCE(CAST(c.customer_name AS VARCHAR), '\N'),
+        COALESCE(CAST(t.subject AS VARCHAR), '\N'),
+        COALESCE(CAST(t.status AS VARCHAR), '\N'),
+        COALESCE(CAST(t.ticket_ts AS VARCHAR), '\N'),
+        COALESCE(CAST(t.description AS VARCHAR), '\N')
+    )) AS row_hash
+FROM silver.tickets t
+LEFT JOIN silver.customers c ON c.customer_id = t.customer_id;
+
+CREATE TABLE IF NOT EXISTS gold.ticket_search_docs AS
+SELECT * EXCLUDE (description), CAST(0 AS BIGINT) AS doc_len
+FROM ticket_search_source
+LIMIT 0;
+
+CREATE TABLE IF NOT EXISTS gold.ticket_search_terms (
+    term VARCHAR,
+    ticket_id VARCHAR,
+    tf BIGINT,
+    doc_len BIGINT
+);
+
+CREATE OR REPLACE TEMP TABLE changed_tickets AS
+SELECT src.*
+FROM ticket_search_source src
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM gold.ticket_search_docs d
+    WHERE d.ticket_id = src.ticket_id
+      AND d.row_hash = src.row_hash
+);
+
+-- Tickets to drop from the index: changed ones and ones no longer in silver
+CREATE OR REPLACE TEMP TABLE stale_tickets AS
+SELECT ticket_id FROM changed_tickets
+UNION
+SELECT d.ticket_id
+FROM gold.ticket_search_docs d
+WHERE NOT EXISTS (
+    SELECT 1 FROM silver.tickets t WHERE t.ticket_id = d.ticket_id
+);
+
+DELETE FROM gold.ticket_search_terms
+WHERE ticket_id IN (SELECT ticket_id FROM stale_tickets);
+
+DELETE FROM gold.ticket_search_docs
+WHERE ticket_id IN (SELECT ticket_id FROM stale_tickets);
+
+CREATE OR REPLACE TEMP TABLE new_ticket_terms AS
+SELECT
+    term,
+    ticket_id,
+    COUNT(*) AS tf,
+    SUM(COUNT(*)) OVER (PARTITION BY ticket_id) AS doc_len
+FROM (
+    SELECT
+        ticket_id,
+        UNNEST(regexp_split_to_array(
+            lower(strip_accents(concat_ws(' ', subject, description))),
+            '[^a-z0-9]+'
+        )) AS term
+    FROM changed_tickets
+)
+WHERE term <> ''
+GROUP BY term, ticket_id;
+
+-- Kept roughly term-ordered so lookups by term skip most row groups
+INSERT INTO gold.ticket_search_terms
+SELECT term, ticket_id, tf, CAST(doc_len AS BIGINT)
+FROM new_ticket_terms
+ORDER BY term, ticket_id;
+
+INSERT INTO gold.ticket_search_docs
+SELECT
+    c.* EXCLUDE (description),
+    CAST(COALESCE(l.doc_len, 0) AS BIGINT) AS doc_len
+FROM changed_tickets c
+LEFT JOIN (
+    SELECT DISTINCT ticket_id, doc_len
+    FROM new_ticket_terms
+) l ON l.ticket_id = c.ticket_id
+ORDER BY c.ticket_id;
@@ -1,8 +1,12 @@
+-- ticket_count counts tickets carrying the order's id; tickets attributed
+-- to it by gold.ticket_attribution are counted separately
 CREATE OR REPLACE TABLE gold.tickets_per_order AS
 SELECT
     order_id,
-    COUNT(*) AS ticket_count
-FROM silver.tickets
+    COUNT(*) FILTER (WHERE attribution = 'direct') AS ticket_count,
+    COUNT(*) FILTER (WHERE attribution = 'asof') AS attributed_ticket_count,
+    COUNT(*) AS total_ticket_count
+FROM gold.ticket_attribution
 WHERE order_id IS NOT NULL
 GROUP BY order_id
 ORDER BY order_id;
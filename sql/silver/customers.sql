@@ -1,8 +1,65 @@
-CREATE OR REPLACE TABLE silver.customers AS
-SELECT DISTINCT
+-- Current source rows with a hash of their business columns.
+CREATE OR REPLACE TEMP VIEW customer_source AS
+SELECT
     id AS customer_id,
     name AS customer_name,
+    MD5(COALESCE(CAST(name AS VARCHAR), '\N')) AS row_hash,
     loaded_at
 FROM bronze.raw_customers
 WHERE id IS NOT NULL
-ORDER BY id;
+QUALIFY ROW_NUMBER() OVER (PARTITION BY id ORDER BY loaded_at DESC) = 1;
+
+-- SCD Type 2 history: one row per customer version.
+CREATE TABLE IF NOT EXISTS silver.customers_snapshot AS
+SELECT
+    customer_id,
+    customer_name,
+    row_hash,
+    loaded_at AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM customer_source
+LIMIT 0;
+
+-- Close current versions whose hash changed or whose key left the source.
+UPDATE silver.customers_snapshot AS s
+SET valid_to = (SELECT MAX(loaded_at) FROM customer_source)
+WHERE s.valid_to IS NULL
+  AND EXISTS (SELECT 1 FROM customer_source)
+  AND NOT EXISTS (
+      SELECT 1
+      FROM customer_source src
+      WHERE src.customer_id = s.customer_id
+        AND src.row_hash = s.row_hash
+  );
+
+-- Open a version for new keys and for keys closed above. A key's first
+-- version is valid from the beginning of time so history joins resolve.
+INSERT INTO silver.customers_snapshot
+SELECT
+    src.customer_id,
+    src.customer_name,
+    src.row_hash,
+    CASE
+        WHEN EXISTS (
+            SELECT 1 FROM silver.customers_snapshot p
+            WHERE p.customer_id = src.customer_id
+        ) THEN src.loaded_at
+        ELSE TIMESTAMP '1900-01-01'
+    END AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM customer_source src
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM silver.customers_snapshot s
+    WHERE s.customer_id = src.customer_id
+      AND s.valid_to IS NULL
+);
+
+CREATE OR REPLACE TABLE silver.customers AS
+SELECT
+    customer_id,
+    customer_name,
+    valid_from
+FROM silver.customers_snapshot
+WHERE valid_to IS NULL
+ORDER BY customer_id;
@@ -1,11 +1,82 @@
-CREATE OR REPLACE TABLE silver.products AS
-SELECT DISTINCT
+-- Current source rows with a hash of their business columns.
+CREATE OR REPLACE TEMP VIEW product_source AS
+SELECT
     sku AS product_sku,
     name AS product_name,
     type AS product_type,
     CAST(price AS DECIMAL(10,2)) AS product_price,
     description AS product_description,
+    MD5(CONCAT_WS('|',
+        COALESCE(CAST(name AS VARCHAR), '\N'),
+        COALESCE(CAST(type AS VARCHAR), '\N'),
+        COALESCE(CAST(CAST(price AS DECIMAL(10,2)) AS VARCHAR), '\N'),
+        COALESCE(CAST(description AS VARCHAR), '\N')
+    )) AS row_hash,
     loaded_at
 FROM bronze.raw_products
 WHERE sku IS NOT NULL
-ORDER BY sku;
+QUALIFY ROW_NUMBER() OVER (PARTITION BY sku ORDER BY loaded_at DESC) = 1;
+
+-- SCD Type 2 history: one row per product version.
+CREATE TABLE IF NOT EXISTS silver.products_snapshot AS
+SELECT
+    product_sku,
+    product_name,
+    product_type,
+    product_price,
+    product_description,
+    row_hash,
+    loaded_at AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM product_source
+LIMIT 0;
+
+-- Close current versions whose hash changed or whose key left the source.
+UPDATE silver.products_snapshot AS s
+SET valid_to = (SELECT MAX(loaded_at) FROM product_source)
+WHERE s.valid_to IS NULL
+  AND EXISTS (SELECT 1 FROM product_source)
+  AND NOT EXISTS (
+      SELECT 1
+      FROM product_source src
+      WHERE src.product_sku = s.product_sku
+        AND src.row_hash = s.row_hash
+  );
+
+-- Open a version for new keys and for keys closed above. A key's first
+-- version is valid from the beginning of time so history joins resolve.
+INSERT INTO silver.products_snapshot
+SELECT
+    src.product_sku,
+    src.product_name,
+    src.product_type,
+    src.product_price,
+    src.product_description,
+    src.row_hash,
+    CASE
+        WHEN EXISTS (
+            SELECT 1 FROM silver.products_snapshot p
+            WHERE p.product_sku = src.product_sku
+        ) THEN src.loaded_at
+        ELSE TIMESTAMP '1900-01-01'
+    END AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM product_source src
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM silver.products_snapshot s
+    WHERE s.product_sku = src.product_sku
+      AND s.valid_to IS NULL
+);
+
+CREATE OR REPLACE TABLE silver.products AS
+SELECT
+    product_sku,
+    product_name,
+    product_type,
+    product_price,
+    product_description,
+    valid_from
+FROM silver.products_snapshot
+WHERE valid_to IS NULL
+ORDER BY product_sku;
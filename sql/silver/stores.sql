@@ -1,10 +1,77 @@
-CREATE OR REPLACE TABLE silver.stores AS
-SELECT DISTINCT
+-- Current source rows with a hash of their business columns.
+CREATE OR REPLACE TEMP VIEW store_source AS
+SELECT
     id AS store_id,
     name AS store_name,
     CAST(opened_at AS TIMESTAMP) AS opened_at,
     CAST(tax_rate AS DECIMAL(5,4)) AS tax_rate,
+    MD5(CONCAT_WS('|',
+        COALESCE(CAST(name AS VARCHAR), '\N'),
+        COALESCE(CAST(CAST(opened_at AS TIMESTAMP) AS VARCHAR), '\N'),
+        COALESCE(CAST(CAST(tax_rate AS DECIMAL(5,4)) AS VARCHAR), '\N')
+    )) AS row_hash,
     loaded_at
 FROM bronze.raw_stores
 WHERE id IS NOT NULL
-ORDER BY id;
+QUALIFY ROW_NUMBER() OVER (PARTITION BY id ORDER BY loaded_at DESC) = 1;
+
+-- SCD Type 2 history: one row per store version.
+CREATE TABLE IF NOT EXISTS silver.stores_snapshot AS
+SELECT
+    store_id,
+    store_name,
+    opened_at,
+    tax_rate,
+    row_hash,
+    loaded_at AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM store_source
+LIMIT 0;
+
+-- Close current versions whose hash changed or whose key left the source.
+UPDATE silver.stores_snapshot AS s
+SET valid_to = (SELECT MAX(loaded_at) FROM store_source)
+WHERE s.valid_to IS NULL
+  AND EXISTS (SELECT 1 FROM store_source)
+  AND NOT EXISTS (
+      SELECT 1
+      FROM store_source src
+      WHERE src.store_id = s.store_id
+        AND src.row_hash = s.row_hash
+  );
+
+-- Open a version for new keys and for keys closed above. A key's first
+-- version is valid from the beginning of time so history joins resolve.
+INSERT INTO silver.stores_snapshot
+SELECT
+    src.store_id,
+    src.store_name,
+    src.opened_at,
+    src.tax_rate,
+    src.row_hash,
+    CASE
+        WHEN EXISTS (
+            SELECT 1 FROM silver.stores_snapshot p
+            WHERE p.store_id = src.store_id
+        ) THEN src.loaded_at
+        ELSE TIMESTAMP '1900-01-01'
+    END AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM store_source src
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM silver.stores_snapshot s
+    WHERE s.store_id = src.store_id
+      AND s.valid_to IS NULL
+);
+
+CREATE OR REPLACE TABLE silver.stores AS
+SELECT
+    store_id,
+    store_name,
+    opened_at,
+    tax_rate,
+    valid_from
+FROM silver.stores_snapshot
+WHERE valid_to IS NULL
+ORDER BY store_id;
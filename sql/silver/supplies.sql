@@ -1,12 +1,85 @@
-CREATE OR REPLACE TABLE silver.supplies AS
+-- Current source rows with a hash of their business columns.
+CREATE OR REPLACE TEMP VIEW supply_source AS
 SELECT
     id AS supply_id,
     name AS supply_name,
     CAST(cost AS DECIMAL(10,2)) AS supply_cost,
     perishable,
     sku AS product_sku,
+    MD5(CONCAT_WS('|',
+        COALESCE(CAST(name AS VARCHAR), '\N'),
+        COALESCE(CAST(CAST(cost AS DECIMAL(10,2)) AS VARCHAR), '\N'),
+        COALESCE(CAST(perishable AS VARCHAR), '\N')
+    )) AS row_hash,
     loaded_at
 FROM bronze.raw_supplies
 WHERE id IS NOT NULL
   AND sku IS NOT NULL
-ORDER BY id;
+QUALIFY ROW_NUMBER() OVER (PARTITION BY id, sku ORDER BY loaded_at DESC) = 1;
+
+-- SCD Type 2 history: one row per supply version, keyed on (supply, product).
+CREATE TABLE IF NOT EXISTS silver.supplies_snapshot AS
+SELECT
+    supply_id,
+    supply_name,
+    supply_cost,
+    perishable,
+    product_sku,
+    row_hash,
+    loaded_at AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM supply_source
+LIMIT 0;
+
+-- Close current versions whose hash changed or whose key left the source.
+UPDATE silver.supplies_snapshot AS s
+SET valid_to = (SELECT MAX(loaded_at) FROM supply_source)
+WHERE s.valid_to IS NULL
+  AND EXISTS (SELECT 1 FROM supply_source)
+  AND NOT EXISTS (
+      SELECT 1
+      FROM supply_source src
+      WHERE src.supply_id = s.supply_id
+        AND src.product_sku = s.product_sku
+        AND src.row_hash = s.row_hash
+  );
+
+-- Open a version for new keys and for keys closed above. A key's first
+-- version is valid from the beginning of time so history joins resolve.
+INSERT INTO silver.supplies_snapshot
+SELECT
+    src.supply_id,
+    src.supply_name,
+    src.supply_cost,
+    src.perishable,
+    src.product_sku,
+    src.row_hash,
+    CASE
+        WHEN EXISTS (
+            SELECT 1 FROM silver.supplies_snapshot p
+            WHERE p.supply_id = src.supply_id
+              AND p.product_sku = src.product_sku
+        ) THEN src.loaded_at
+        ELSE TIMESTAMP '1900-01-01'
+    END AS valid_from,
+    CAST(NULL AS TIMESTAMP) AS valid_to
+FROM supply_source src
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM silver.supplies_snapshot s
+    WHERE s.supply_id = src.supply_id
+      AND s.product_sku = src.product_sku
+      AND s.valid_to IS NULL
+);
+
+CREATE OR REPLACE TABLE silver.supplies AS
+SELECT
+    supply_id,
+    supply_name,
+    supply_cost,
+    perishable,
+    product_sku,
+    valid_from
+FROM silver.supplies_snapshot
+WHERE valid_to IS NULL
+ORDER BY supply_id, product_sku;
@@ -1,4 +1,12 @@
-CREATE OR REPLACE TABLE silver.tickets AS
+-- Every ticket version seen so far, appended once per load of a source blob:
+-- a blob whose etag changed is loaded again with a new loaded_at, and its
+-- versions are appended as newer ones. Tags are kept as a native VARCHAR[]
+-- (older bronze loads may hold them as text).
+-- Bronze columns named in the ticket_extra_columns variable (TICKET_EXTRA_COLUMNS,
+-- set by src/resources/schema_registry.py) are carried through unchanged, so
+-- fields added upstream reach silver without editing this projection; the
+-- incremental tables below are evolved to hold them and filled BY NAME.
+CREATE OR REPLACE TEMP VIEW ticket_versions AS
 SELECT
     ticket_id,
     customer_external_id AS customer_id,
@@ -14,10 +22,78 @@ SELECT
     CAST(first_response_at AS TIMESTAMP) AS first_response_at,
     CAST(resolved_at AS TIMESTAMP) AS resolved_at,
     CAST(updated_at AS TIMESTAMP) AS ticket_ts,
-    tags,
+    CAST(tags AS VARCHAR[]) AS tags,
     agent_id,
-    source_blob,
-    loaded_at
+    COLUMNS(
+        c -> c IN ('source_blob', 'loaded_at')
+        OR list_contains(COALESCE(getvariable('ticket_extra_columns'), []::VARCHAR[]), c)
+    )
 FROM bronze.raw_tickets
-WHERE ticket_id IS NOT NULL
+WHERE ticket_id IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS silver.tickets_history AS
+SELECT * FROM ticket_versions LIMIT 0;
+
+CREATE OR REPLACE TEMP TABLE new_ticket_versions AS
+SELECT *
+FROM ticket_versions v
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM (SELECT DISTINCT source_blob, loaded_at FROM silver.tickets_history) h
+    WHERE h.source_blob = v.source_blob AND h.loaded_at = v.loaded_at
+);
+
+INSERT INTO silver.tickets_history BY NAME
+SELECT * FROM new_ticket_versions;
+
+-- Latest version per ticket, re-ranked only for tickets touched by new loads.
+CREATE TABLE IF NOT EXISTS silver.tickets AS
+SELECT * FROM silver.tickets_history LIMIT 0;
+
+DELETE FROM silver.tickets
+WHERE ticket_id IN (SELECT ticket_id FROM new_ticket_versions);
+
+INSERT INTO silver.tickets BY NAME
+SELECT *
+FROM silver.tickets_history
+WHERE ticket_id IN (SELECT ticket_id FROM new_ticket_versions)
+QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY ticket_id
+    ORDER BY ticket_ts DESC, loaded_at DESC, source_blob DESC
+) = 1
 ORDER BY ticket_id;
+
+-- Ticket/tag bridge, exploded once: tag filters and counts are joins and
+-- GROUP BYs on this table instead of list functions over every ticket.
+-- Refreshed for tickets touched by new blobs, or for all of them when the
+-- bridge does not exist yet.
+CREATE OR REPLACE TEMP TABLE tag_tickets AS
+SELECT DISTINCT ticket_id FROM new_ticket_versions
+UNION
+SELECT ticket_id
+FROM silver.tickets
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM duckdb_tables()
+    WHERE database_name = current_database()
+      AND schema_name = 'silver'
+      AND table_name = 'ticket_tags'
+);
+
+CREATE TABLE IF NOT EXISTS silver.ticket_tags (
+    ticket_id VARCHAR,
+    tag VARCHAR
+);
+
+DELETE FROM silver.ticket_tags
+WHERE ticket_id IN (SELECT ticket_id FROM tag_tickets);
+
+INSERT INTO silver.ticket_tags
+SELECT DISTINCT ticket_id, tag
+FROM (
+    SELECT ticket_id, UNNEST(tags) AS tag
+    FROM silver.tickets
+    WHERE ticket_id IN (SELECT ticket_id FROM tag_tickets)
+)
+WHERE tag IS NOT NULL AND tag <> ''
+ORDER BY tag, ticket_id;
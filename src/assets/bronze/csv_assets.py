@@ -1,69 +1,89 @@
 """Bronze layer assets for CSV files."""
 
 import os
-from datetime import datetime
 
-import pandas as pd
 from dagster import asset, AssetExecutionContext
 
-from src.resources.warehouse import DuckDBResource
+from src.profiling import profiled
+from src.resources.sources import CSV_SOURCES, list_csv_files, read_csv_file
+from src.resources.warehouse import DuckDBResource, WRITER_OP_TAGS
+from src.telemetry import traced
 
 
-@asset(group_name="bronze")
-def raw_customers(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
-    """Load raw customers CSV."""
+def ingest_csv(duckdb: DuckDBResource, table: str) -> dict:
+    """Load new or changed CSV files matching the table's source pattern."""
     csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
-    df = pd.read_csv(f"{csv_dir}/raw_customers.csv")
-    df["loaded_at"] = datetime.now()
-    duckdb.write_dataframe(df, "bronze", "raw_customers")
-    context.log.info(f"Loaded {len(df)} customers to bronze.raw_customers")
+    files = list_csv_files(csv_dir, CSV_SOURCES[table])
+    return duckdb.ingest_files(table, files, lambda name: read_csv_file(csv_dir, name))
+
 
+@asset(group_name="bronze", op_tags=WRITER_OP_TAGS)
+@profiled
+@traced
+def raw_customers(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
+    """Load new raw customers CSV files."""
+    loaded = ingest_csv(duckdb, "raw_customers")
+    context.log.info(
+        f"Loaded {sum(loaded.values())} customers from {len(loaded)} new files "
+        "to bronze.raw_customers"
+    )
 
-@asset(group_name="bronze")
+
+@asset(group_name="bronze", op_tags=WRITER_OP_TAGS)
+@profiled
+@traced
 def raw_orders(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
-    """Load raw orders CSV."""
-    csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
-    df = pd.read_csv(f"{csv_dir}/raw_orders.csv")
-    df["loaded_at"] = datetime.now()
-    duckdb.write_dataframe(df, "bronze", "raw_orders")
-    context.log.info(f"Loaded {len(df)} orders to bronze.raw_orders")
+    """Load new raw orders CSV files."""
+    loaded = ingest_csv(duckdb, "raw_orders")
+    context.log.info(
+        f"Loaded {sum(loaded.values())} orders from {len(loaded)} new files "
+        "to bronze.raw_orders"
+    )
 
 
-@asset(group_name="bronze")
+@asset(group_name="bronze", op_tags=WRITER_OP_TAGS)
+@profiled
+@traced
 def raw_items(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
-    """Load raw items CSV."""
-    csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
-    df = pd.read_csv(f"{csv_dir}/raw_items.csv")
-    df["loaded_at"] = datetime.now()
-    duckdb.write_dataframe(df, "bronze", "raw_items")
-    context.log.info(f"Loaded {len(df)} items to bronze.raw_items")
+    """Load new raw items CSV files."""
+    loaded = ingest_csv(duckdb, "raw_items")
+    context.log.info(
+        f"Loaded {sum(loaded.values())} items from {len(loaded)} new files "
+        "to bronze.raw_items"
+    )
 
 
-@asset(group_name="bronze")
+@asset(group_name="bronze", op_tags=WRITER_OP_TAGS)
+@profiled
+@traced
 def raw_products(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
-    """Load raw products CSV."""
-    csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
-    df = pd.read_csv(f"{csv_dir}/raw_products.csv")
-    df["loaded_at"] = datetime.now()
-    duckdb.write_dataframe(df, "bronze", "raw_products")
-    context.log.info(f"Loaded {len(df)} products to bronze.raw_products")
+    """Load new raw products CSV files."""
+    loaded = ingest_csv(duckdb, "raw_products")
+    context.log.info(
+        f"Loaded {sum(loaded.values())} products from {len(loaded)} new files "
+        "to bronze.raw_products"
+    )
 
 
-@asset(group_name="bronze")
+@asset(group_name="bronze", op_tags=WRITER_OP_TAGS)
+@profiled
+@traced
 def raw_stores(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
-    """Load raw stores CSV."""
-    csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
-    df = pd.read_csv(f"{csv_dir}/raw_stores.csv")
-    df["loaded_at"] = datetime.now()
-    duckdb.write_dataframe(df, "bronze", "raw_stores")
-    context.log.info(f"Loaded {len(df)} stores to bronze.raw_stores")
+    """Load new raw stores CSV files."""
+    loaded = ingest_csv(duckdb, "raw_stores")
+    context.log.info(
+        f"Loaded {sum(loaded.values())} stores from {len(loaded)} new files "
+        "to bronze.raw_stores"
+    )
 
 
-@asset(group_name="bronze")
+@asset(group_name="bronze", op_tags=WRITER_OP_TAGS)
+@profiled
+@traced
 def raw_supplies(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
-    """Load raw supplies CSV."""
-    csv_dir = os.getenv("CSV_DATA_DIR", "data/csv")
-    df = pd.read_csv(f"{csv_dir}/raw_supplies.csv")
-    df["loaded_at"] = datetime.now()
-    duckdb.write_dataframe(df, "bronze", "raw_supplies")
-    context.log.info(f"Loaded {len(df)} supplies to bronze.raw_supplies")
+    """Load new raw supplies CSV files."""
+    loaded = ingest_csv(duckdb, "raw_supplies")
+    context.log.info(
+        f"Loaded {sum(loaded.values())} supplies from {len(loaded)} new files "
+        "to bronze.raw_supplies"
+    )
@@ -1,28 +1,45 @@
-"""Bronze layer asset for tickets JSONL from Azure Blob Storage."""
-
-from datetime import datetime
+"""Bronze layer assets for tickets JSONL from Azure Blob Storage."""
 
 from dagster import asset, AssetExecutionContext
 
-from src.resources.azure import AzureBlobResource
-from src.resources.warehouse import DuckDBResource
+from src.profiling import profiled
+from src.resources.azure import AzureBlobResource, DOWNLOAD_OP_TAGS
+from src.resources.warehouse import DuckDBResource, WRITER_OP_TAGS
+from src.telemetry import traced
+
 
+@asset(group_name="bronze", op_tags=DOWNLOAD_OP_TAGS)
+@profiled
+@traced
+def ticket_blobs(context: AssetExecutionContext, azure_blob: AzureBlobResource) -> None:
+    """Download new ticket blobs into the local blob cache, without the warehouse."""
+    blobs = azure_blob.list_blob_etags()
+    downloaded = azure_blob.cache_new_blobs(blobs)
+    context.log.info(
+        f"Cached {sum(downloaded.values())} tickets from {len(downloaded)} of "
+        f"{len(blobs)} JSONL files"
+    )
 
-@asset(group_name="bronze")
+
+@asset(group_name="bronze", op_tags=WRITER_OP_TAGS, deps=[ticket_blobs])
+@profiled
+@traced
 def raw_tickets(
     context: AssetExecutionContext,
     azure_blob: AzureBlobResource,
     duckdb: DuckDBResource,
 ) -> None:
-    """Load raw tickets from Azure Blob Storage JSONL files."""
-    context.log.info("Fetching JSONL blobs from Azure...")
-    blob_names = azure_blob.list_jsonl_blobs()
-    context.log.info(f"Found {len(blob_names)} JSONL files: {blob_names}")
-
-    df = azure_blob.read_all_jsonl_blobs()
-    df["loaded_at"] = datetime.now()
+    """Load new raw ticket JSONL blobs (optionally gzip/zstd) from the blob cache."""
+    blobs = azure_blob.list_blob_etags()
+    context.log.info(f"Found {len(blobs)} JSONL files: {list(blobs)}")
 
-    duckdb.write_dataframe(df, "bronze", "raw_tickets")
+    loaded = duckdb.ingest_files(
+        "raw_tickets",
+        blobs,
+        lambda name: azure_blob.read_cached_jsonl_blob(name, blobs[name]),
+        provenance_column="source_blob",
+    )
     context.log.info(
-        f"Loaded {len(df)} tickets from {len(blob_names)} files to bronze.raw_tickets"
+        f"Loaded {sum(loaded.values())} tickets from {len(loaded)} new files "
+        "to bronze.raw_tickets"
     )
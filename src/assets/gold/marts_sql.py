@@ -1,7 +1,11 @@
 """Gold layer SQL mart assets."""
 
 from dagster import asset, AssetExecutionContext, AssetIn
-from src.resources.warehouse import DuckDBResource
+from src.materialization import build_model
+from src.profiling import profiled
+from src.resources.metrics import metrics_verify_enabled, verify_metrics
+from src.resources.warehouse import DuckDBResource, WRITER_OP_TAGS
+from src.telemetry import traced
 
 
 def read_sql_file(filename: str) -> str:
@@ -12,21 +16,31 @@ def read_sql_file(filename: str) -> str:
 
 @asset(
     group_name="gold",
-    ins={"orders": AssetIn(key="orders"), "items": AssetIn(key="items")},
+    op_tags=WRITER_OP_TAGS,
+    ins={
+        "orders": AssetIn(key="orders"),
+        "items": AssetIn(key="items"),
+        "products": AssetIn(key="products"),
+    },
     metadata={"schema": "gold"},
 )
+@profiled
+@traced
 def fact_orders(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
     orders,  # pylint: disable=unused-argument,redefined-outer-name
     items,  # pylint: disable=unused-argument
+    products,  # pylint: disable=unused-argument
 ) -> None:
-    """Create fact_orders mart with order totals."""
+    """Create fact_orders mart with order totals and point-in-time item prices."""
     sql = read_sql_file("fact_orders.sql")
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "gold.fact_orders")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM gold.fact_orders").fetchone()[0]
         context.log.info(f"Created gold.fact_orders with {count} rows")
     finally:
@@ -35,20 +49,123 @@ def fact_orders(
 
 @asset(
     group_name="gold",
-    ins={"tickets": AssetIn(key="tickets")},
+    op_tags=WRITER_OP_TAGS,
+    ins={"fact_orders": AssetIn(key="fact_orders")},
     metadata={"schema": "gold"},
 )
-def tickets_per_order(
+@profiled
+@traced
+def order_sketches(
+    context: AssetExecutionContext,
+    duckdb: DuckDBResource,
+    fact_orders,  # pylint: disable=unused-argument,redefined-outer-name
+) -> None:
+    """Update per-day, per-store HyperLogLog and order value sketches."""
+    sql = read_sql_file("order_sketches.sql")
+    conn = duckdb.get_connection()
+    try:
+        conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
+        decision = build_model(conn, sql, "gold.order_sketches")
+        if decision.note:
+            context.log.info(decision.note)
+        days = conn.execute(
+            "SELECT COUNT(*) FROM sketch_dates"
+        ).fetchone()[0]
+        context.log.info(f"Updated gold order sketches for {days} days")
+    finally:
+        conn.close()
+
+
+@asset(
+    group_name="gold",
+    op_tags=WRITER_OP_TAGS,
+    ins={"order_sketches": AssetIn(key="order_sketches")},
+    metadata={"schema": "gold"},
+)
+@profiled
+@traced
+def distribution_metrics(
+    context: AssetExecutionContext,
+    duckdb: DuckDBResource,
+    order_sketches,  # pylint: disable=unused-argument,redefined-outer-name
+) -> None:
+    """Create per-store distinct customer and order value quantile metrics."""
+    sql = read_sql_file("distribution_metrics.sql")
+    conn = duckdb.get_connection()
+    try:
+        decision = build_model(conn, sql, "gold.distribution_metrics")
+        if decision.note:
+            context.log.info(decision.note)
+        count = conn.execute(
+            "SELECT COUNT(*) FROM gold.distribution_metrics"
+        ).fetchone()[0]
+        context.log.info(f"Created gold.distribution_metrics with {count} rows")
+    finally:
+        conn.close()
+
+
+@asset(
+    group_name="gold",
+    op_tags=WRITER_OP_TAGS,
+    ins={
+        "tickets": AssetIn(key="tickets"),
+        "orders": AssetIn(key="orders"),
+    },
+    metadata={"schema": "gold"},
+)
+@profiled
+@traced
+def ticket_attribution(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
     tickets,  # pylint: disable=unused-argument,redefined-outer-name
+    orders,  # pylint: disable=unused-argument,redefined-outer-name
+) -> None:
+    """Attribute tickets without an order to the customer's last prior order."""
+    sql = read_sql_file("ticket_attribution.sql")
+    conn = duckdb.get_connection()
+    try:
+        conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
+        decision = build_model(conn, sql, "gold.ticket_attribution")
+        if decision.note:
+            context.log.info(decision.note)
+        counts = conn.execute(
+            """
+            SELECT attribution, COUNT(*)
+            FROM gold.ticket_attribution
+            GROUP BY attribution
+            ORDER BY attribution
+            """
+        ).fetchall()
+        context.log.info(
+            "Created gold.ticket_attribution: "
+            + ", ".join(f"{count} {attribution}" for attribution, count in counts)
+        )
+    finally:
+        conn.close()
+
+
+@asset(
+    group_name="gold",
+    op_tags=WRITER_OP_TAGS,
+    ins={"ticket_attribution": AssetIn(key="ticket_attribution")},
+    metadata={"schema": "gold"},
+)
+@profiled
+@traced
+def tickets_per_order(
+    context: AssetExecutionContext,
+    duckdb: DuckDBResource,
+    ticket_attribution,  # pylint: disable=unused-argument,redefined-outer-name
 ) -> None:
     """Create tickets_per_order mart."""
     sql = read_sql_file("tickets_per_order.sql")
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "gold.tickets_per_order")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM gold.tickets_per_order").fetchone()[
             0
         ]
@@ -59,31 +176,114 @@ def tickets_per_order(
 
 @asset(
     group_name="gold",
+    op_tags=WRITER_OP_TAGS,
+    ins={
+        "tickets": AssetIn(key="tickets"),
+        "customers": AssetIn(key="customers"),
+    },
+    metadata={"schema": "gold"},
+)
+@profiled
+@traced
+def ticket_search(
+    context: AssetExecutionContext,
+    duckdb: DuckDBResource,
+    tickets,  # pylint: disable=unused-argument,redefined-outer-name
+    customers,  # pylint: disable=unused-argument
+) -> None:
+    """Refresh the BM25 full-text index over ticket subjects and descriptions."""
+    sql = read_sql_file("ticket_search.sql")
+    conn = duckdb.get_connection()
+    try:
+        conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
+        decision = build_model(conn, sql, "gold.ticket_search")
+        if decision.note:
+            context.log.info(decision.note)
+        changed = conn.execute("SELECT COUNT(*) FROM changed_tickets").fetchone()[0]
+        count = conn.execute("SELECT COUNT(*) FROM gold.ticket_search_docs").fetchone()[0]
+        context.log.info(f"Indexed {changed} changed tickets; {count} tickets searchable")
+    finally:
+        conn.close()
+
+
+@asset(
+    group_name="gold",
+    op_tags=WRITER_OP_TAGS,
+    ins={
+        "orders": AssetIn(key="orders"),
+        "tickets": AssetIn(key="tickets"),
+        "customers": AssetIn(key="customers"),
+    },
+    metadata={"schema": "gold"},
+)
+@profiled
+@traced
+def customer_summary(
+    context: AssetExecutionContext,
+    duckdb: DuckDBResource,
+    orders,  # pylint: disable=unused-argument,redefined-outer-name
+    tickets,  # pylint: disable=unused-argument,redefined-outer-name
+    customers,  # pylint: disable=unused-argument
+) -> None:
+    """Recompute the lifetime summary of customers with new orders or tickets."""
+    sql = read_sql_file("customer_summary.sql")
+    conn = duckdb.get_connection()
+    try:
+        conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
+        decision = build_model(conn, sql, "gold.customer_summary")
+        if decision.note:
+            context.log.info(decision.note)
+        touched = conn.execute("SELECT COUNT(*) FROM summary_customers").fetchone()[0]
+        count = conn.execute("SELECT COUNT(*) FROM gold.customer_summary").fetchone()[0]
+        context.log.info(f"Updated {touched} customers; {count} customers summarized")
+    finally:
+        conn.close()
+
+
+@asset(
+    group_name="gold",
+    op_tags=WRITER_OP_TAGS,
     ins={
         "fact_orders": AssetIn(key="fact_orders"),
         "tickets_per_order": AssetIn(key="tickets_per_order"),
+        "ticket_attribution": AssetIn(key="ticket_attribution"),
     },
     metadata={"schema": "gold"},
 )
+@profiled
+@traced
 def metrics(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
     fact_orders,  # pylint: disable=unused-argument,redefined-outer-name
     tickets_per_order,  # pylint: disable=unused-argument,redefined-outer-name
+    ticket_attribution,  # pylint: disable=unused-argument,redefined-outer-name
 ) -> None:
-    """Create metrics mart with AOV and ticket metrics."""
+    """Update metrics state from the delta and derive AOV and ticket metrics."""
     sql = read_sql_file("metrics.sql")
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS gold")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "gold.metrics")
+        if decision.note:
+            context.log.info(decision.note)
 
         # Fetch and log the metrics
-        result = conn.execute("SELECT * FROM gold.metrics").fetchone()
+        result = conn.execute(
+            """
+            SELECT average_order_value, avg_tickets_per_order, direct_tickets, attributed_tickets
+            FROM gold.metrics
+            """
+        ).fetchone()
         if result:
-            aov, avg_tickets = result
+            aov, avg_tickets, direct, attributed = result
             context.log.info("📊 KPIs:")
             context.log.info(f"   Average Order Value (AOV): ${aov:.2f}")
             context.log.info(f"   Avg Tickets per Order: {avg_tickets:.2f}")
+            context.log.info(f"   Tickets with / attributed to an order: {direct} / {attributed}")
+
+        if metrics_verify_enabled():
+            for metric, incremental, full in verify_metrics(conn):
+                context.log.info(f"Verified {metric}: {incremental} matches full recompute {full}")
     finally:
         conn.close()
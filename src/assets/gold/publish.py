@@ -0,0 +1,35 @@
+"""Gold layer asset publishing a read-only warehouse snapshot."""
+
+from dagster import asset, AssetExecutionContext
+from src.profiling import profiled
+from src.resources.snapshots import publish_snapshot
+from src.resources.warehouse import DuckDBResource, WRITER_OP_TAGS
+from src.telemetry import traced
+
+
+@asset(
+    group_name="gold",
+    op_tags=WRITER_OP_TAGS,
+    deps=[
+        "fact_orders",
+        "tickets_per_order",
+        "metrics",
+        "distribution_metrics",
+        "ticket_search",
+        "customer_summary",
+    ],
+    metadata={"schema": "gold"},
+)
+@profiled
+@traced
+def warehouse_snapshot(
+    context: AssetExecutionContext,
+    duckdb: DuckDBResource,
+) -> None:
+    """Publish gold tables as the current read-only snapshot."""
+    conn = duckdb.get_connection()
+    try:
+        path = publish_snapshot(conn, duckdb.snapshot_dir)
+        context.log.info(f"Published read-only snapshot {path}")
+    finally:
+        conn.close()
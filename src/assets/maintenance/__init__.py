@@ -0,0 +1 @@
+"""Warehouse maintenance assets."""
@@ -0,0 +1,37 @@
+"""Maintenance asset compacting the warehouse file."""
+
+from functools import partial
+
+from dagster import asset, AssetExecutionContext
+from src.profiling import profiled
+from src.resources.maintenance import run_maintenance
+from src.resources.warehouse import DuckDBResource, WRITER_OP_TAGS, connect_waiting_for_lock
+from src.telemetry import traced
+
+
+@asset(
+    group_name="maintenance",
+    op_tags=WRITER_OP_TAGS,
+    metadata={"schema": "meta"},
+)
+@profiled
+@traced
+def warehouse_compaction(context: AssetExecutionContext, duckdb: DuckDBResource) -> None:
+    """Apply bronze retention and rewrite the warehouse into a compact file."""
+    result = run_maintenance(
+        duckdb.database_path,
+        duckdb.lake_dir,
+        duckdb.bronze_retention_days,
+        connect=partial(connect_waiting_for_lock, timeout_seconds=duckdb.lock_timeout_seconds),
+    )
+    context.log.info(
+        f"Removed {result['lake_files_removed']} lake files "
+        f"({result['lake_bytes_removed'] / 2**20:.1f} MiB) older than "
+        f"{duckdb.bronze_retention_days} days"
+    )
+    context.log.info(
+        f"Compacted {duckdb.database_path}: "
+        f"{result['file_bytes_before'] / 2**20:.1f} MiB "
+        f"({result['live_bytes_before'] / 2**20:.1f} MiB live) -> "
+        f"{result['file_bytes_after'] / 2**20:.1f} MiB"
+    )
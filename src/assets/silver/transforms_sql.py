@@ -1,7 +1,11 @@
 """Silver layer SQL transformation assets."""
 
 from dagster import asset, AssetExecutionContext, AssetIn
-from src.resources.warehouse import DuckDBResource
+from src.materialization import build_model
+from src.profiling import profiled
+from src.resources.schema_registry import prepare_ticket_projection
+from src.resources.warehouse import DuckDBResource, WRITER_OP_TAGS
+from src.telemetry import traced
 
 
 def read_sql_file(filename: str) -> str:
@@ -12,9 +16,12 @@ def read_sql_file(filename: str) -> str:
 
 @asset(
     group_name="silver",
+    op_tags=WRITER_OP_TAGS,
     ins={"raw_customers": AssetIn(key="raw_customers")},
     metadata={"schema": "silver"},
 )
+@profiled
+@traced
 def customers(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
@@ -25,18 +32,25 @@ def customers(
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "silver.customers")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM silver.customers").fetchone()[0]
-        context.log.info(f"Created silver.customers with {count} rows")
+        context.log.info(
+            f"Created silver.customers ({decision.materialization}) with {count} rows"
+        )
     finally:
         conn.close()
 
 
 @asset(
     group_name="silver",
+    op_tags=WRITER_OP_TAGS,
     ins={"raw_orders": AssetIn(key="raw_orders")},
     metadata={"schema": "silver"},
 )
+@profiled
+@traced
 def orders(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
@@ -47,18 +61,25 @@ def orders(
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "silver.orders")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM silver.orders").fetchone()[0]
-        context.log.info(f"Created silver.orders with {count} rows")
+        context.log.info(
+            f"Created silver.orders ({decision.materialization}) with {count} rows"
+        )
     finally:
         conn.close()
 
 
 @asset(
     group_name="silver",
+    op_tags=WRITER_OP_TAGS,
     ins={"raw_items": AssetIn(key="raw_items")},
     metadata={"schema": "silver"},
 )
+@profiled
+@traced
 def items(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
@@ -69,18 +90,25 @@ def items(
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "silver.items")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM silver.items").fetchone()[0]
-        context.log.info(f"Created silver.items with {count} rows")
+        context.log.info(
+            f"Created silver.items ({decision.materialization}) with {count} rows"
+        )
     finally:
         conn.close()
 
 
 @asset(
     group_name="silver",
+    op_tags=WRITER_OP_TAGS,
     ins={"raw_products": AssetIn(key="raw_products")},
     metadata={"schema": "silver"},
 )
+@profiled
+@traced
 def products(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
@@ -91,18 +119,25 @@ def products(
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "silver.products")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM silver.products").fetchone()[0]
-        context.log.info(f"Created silver.products with {count} rows")
+        context.log.info(
+            f"Created silver.products ({decision.materialization}) with {count} rows"
+        )
     finally:
         conn.close()
 
 
 @asset(
     group_name="silver",
+    op_tags=WRITER_OP_TAGS,
     ins={"raw_stores": AssetIn(key="raw_stores")},
     metadata={"schema": "silver"},
 )
+@profiled
+@traced
 def stores(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
@@ -113,18 +148,25 @@ def stores(
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "silver.stores")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM silver.stores").fetchone()[0]
-        context.log.info(f"Created silver.stores with {count} rows")
+        context.log.info(
+            f"Created silver.stores ({decision.materialization}) with {count} rows"
+        )
     finally:
         conn.close()
 
 
 @asset(
     group_name="silver",
+    op_tags=WRITER_OP_TAGS,
     ins={"raw_supplies": AssetIn(key="raw_supplies")},
     metadata={"schema": "silver"},
 )
+@profiled
+@traced
 def supplies(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
@@ -135,30 +177,50 @@ def supplies(
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
-        conn.execute(sql)
+        decision = build_model(conn, sql, "silver.supplies")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM silver.supplies").fetchone()[0]
-        context.log.info(f"Created silver.supplies with {count} rows")
+        context.log.info(
+            f"Created silver.supplies ({decision.materialization}) with {count} rows"
+        )
     finally:
         conn.close()
 
 
 @asset(
     group_name="silver",
+    op_tags=WRITER_OP_TAGS,
     ins={"raw_tickets": AssetIn(key="raw_tickets")},
     metadata={"schema": "silver"},
 )
+@profiled
+@traced
 def tickets(
     context: AssetExecutionContext,
     duckdb: DuckDBResource,
     raw_tickets,  # pylint: disable=unused-argument
 ) -> None:
-    """Transform raw tickets to silver layer."""
+    """Deduplicate raw tickets to their latest version in silver layer."""
     sql = read_sql_file("tickets.sql")
     conn = duckdb.get_connection()
     try:
         conn.execute("CREATE SCHEMA IF NOT EXISTS silver")
-        conn.execute(sql)
+        extra_columns = prepare_ticket_projection(conn)
+        if extra_columns:
+            context.log.info(f"Carrying extra ticket columns: {', '.join(extra_columns)}")
+        decision = build_model(conn, sql, "silver.tickets")
+        if decision.note:
+            context.log.info(decision.note)
         count = conn.execute("SELECT COUNT(*) FROM silver.tickets").fetchone()[0]
-        context.log.info(f"Created silver.tickets with {count} rows")
+        versions = conn.execute(
+            "SELECT COUNT(*) FROM silver.tickets_history"
+        ).fetchone()[0]
+        tags = conn.execute("SELECT COUNT(*) FROM silver.ticket_tags").fetchone()[0]
+        context.log.info(
+            f"Created silver.tickets with {count} rows "
+            f"({versions} versions in silver.tickets_history, "
+            f"{tags} rows in silver.ticket_tags)"
+        )
     finally:
         conn.close()
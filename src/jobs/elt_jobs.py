@@ -1,13 +1,44 @@
-"""Dagster jobs for ELT pipeline."""
+"""Dagster jobs for ELT pipeline.
 
-from dagster import define_asset_job, AssetSelection
+Every job runs one warehouse writer step at a time (see
+``src.resources.warehouse.WRITER_OP_TAGS``) and up to DOWNLOAD_CONCURRENCY
+download-only steps (``src.resources.azure.DOWNLOAD_OP_TAGS``) beside it, and
+tags its runs with the warehouse file, so the QueuedRunCoordinator in
+``dagster.yaml`` queues a run while another run writes the same file.
+"""
+
+import os
+
+from dagster import define_asset_job, AssetSelection, multiprocess_executor
+
+from src.resources.azure import DOWNLOAD_POOL
+from src.resources.warehouse import WRITER_POOL
+
+# Runs writing the same warehouse file share this tag value
+WAREHOUSE_RUN_TAGS = {"elt/warehouse": os.getenv("DUCKDB_PATH", "data/warehouse.duckdb")}
+
+writer_executor = multiprocess_executor.configured(
+    {
+        "tag_concurrency_limits": [
+            {"key": "elt/pool", "value": WRITER_POOL, "limit": 1},
+            {
+                "key": "elt/pool",
+                "value": DOWNLOAD_POOL,
+                "limit": int(os.getenv("DOWNLOAD_CONCURRENCY", "4")),
+            },
+        ]
+    },
+    name="writer_executor",
+)
 
 
 # Full ELT pipeline job
 full_elt_job = define_asset_job(
     name="full_elt_pipeline",
     description="Run complete Bronze → Silver → Gold ELT pipeline",
-    selection=AssetSelection.all(),
+    selection=AssetSelection.all() - AssetSelection.groups("maintenance"),
+    executor_def=writer_executor,
+    tags=WAREHOUSE_RUN_TAGS,
 )
 
 # Bronze only job
@@ -15,6 +46,8 @@ bronze_job = define_asset_job(
     name="bronze_ingestion",
     description="Load raw data into Bronze layer",
     selection=AssetSelection.groups("bronze"),
+    executor_def=writer_executor,
+    tags=WAREHOUSE_RUN_TAGS,
 )
 
 # Silver only job
@@ -22,6 +55,8 @@ silver_job = define_asset_job(
     name="silver_transformation",
     description="Transform Bronze to Silver layer",
     selection=AssetSelection.groups("silver"),
+    executor_def=writer_executor,
+    tags=WAREHOUSE_RUN_TAGS,
 )
 
 # Gold only job
@@ -29,4 +64,15 @@ gold_job = define_asset_job(
     name="gold_marts",
     description="Create Gold layer marts and metrics",
     selection=AssetSelection.groups("gold"),
+    executor_def=writer_executor,
+    tags=WAREHOUSE_RUN_TAGS,
+)
+
+# Maintenance job: bronze retention and warehouse compaction
+maintenance_job = define_asset_job(
+    name="warehouse_maintenance",
+    description="Apply bronze retention and compact the warehouse file",
+    selection=AssetSelection.groups("maintenance"),
+    executor_def=writer_executor,
+    tags=WAREHOUSE_RUN_TAGS,
 )
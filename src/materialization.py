@@ -0,0 +1,292 @@
+"""Adaptive materialization of the silver and gold SQL models.
+
+Every model build goes through ``build_model``, which records usage in
+``meta.model_stats``:
+
+* ``builds`` and ``relation_seconds`` - how often the model is rebuilt and
+  what its final ``CREATE OR REPLACE TABLE <layer>.<model> AS ...`` costs
+  (smoothed, measured while it is a table);
+* ``reads`` - how often downstream models read the relation: every build of
+  a model whose SQL references it outside comments and string literals
+  counts one read per reference.
+
+A model is ``incremental`` when its SQL keeps state with ``CREATE TABLE IF
+NOT EXISTS`` and deltas; that is fixed. Gold models are otherwise ``table``
+(snapshots copy tables only). A silver model whose last statement builds it
+from scratch, even from such state, can be a ``table`` or a ``view``. A view
+reruns its query on every read while a table reruns it on every build, so
+per day
+
+    table = builds x relation_seconds      view = reads x relation_seconds
+
+and the policy picks the cheaper one once ``MIN_BUILDS`` builds are known,
+preferring the view on a tie (it also saves writing the table). A table
+whose rebuild takes ``INCREMENTAL_SECONDS`` or more is flagged as worth an
+incremental rewrite.
+
+``MATERIALIZATION_POLICY=recommend`` (the default) builds tables and only
+reports what the policy would choose; ``auto`` applies it. A model overrides
+the policy with a ``-- materialization: view|table`` line in its SQL file.
+In-memory runs always build tables, since their checkpoint copies tables.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass
+
+from src import selection
+from src.profiling import execute_sql
+
+MATERIALIZATIONS = ("view", "table", "incremental")
+MIN_BUILDS = 3
+INCREMENTAL_SECONDS = 5.0
+# Weight of the latest build in the smoothed relation cost
+SMOOTHING = 0.3
+
+_OVERRIDE = re.compile(r"^--\s*materialization:\s*(\w+)\s*$", re.MULTILINE | re.IGNORECASE)
+# String literals and comments, which name relations without reading them
+_NOT_CODE = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+@dataclass
+class Decision:
+    """How a model is materialized and why."""
+
+    model: str
+    materialization: str
+    recommended: str
+    reason: str
+
+    @property
+    def note(self) -> str:
+        """A recommendation the current build does not follow, if any."""
+        if self.recommended == self.materialization:
+            return ""
+        return f"💡 {self.model}: {self.recommended} recommended ({self.reason})"
+
+
+def policy() -> str:
+    """``auto`` or ``recommend``, from MATERIALIZATION_POLICY."""
+    value = os.getenv("MATERIALIZATION_POLICY", "recommend").lower()
+    if value not in ("auto", "recommend"):
+        raise ValueError(f"MATERIALIZATION_POLICY must be auto or recommend, got {value!r}")
+    return value
+
+
+def ensure_stats(conn):
+    """Create ``meta.model_stats`` if it does not exist."""
+    conn.execute("CREATE SCHEMA IF NOT EXISTS meta")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta.model_stats (
+            model VARCHAR PRIMARY KEY,
+            materialization VARCHAR,
+            builds BIGINT,
+            reads BIGINT,
+            relation_seconds DOUBLE,
+            build_seconds DOUBLE,
+            first_seen TIMESTAMP,
+            last_built TIMESTAMP
+        )
+        """
+    )
+
+
+def _final_statement(conn, sql: str, relation: str):
+    """The SQL's statements if the last one builds ``relation`` from scratch."""
+    statements = conn.extract_statements(sql)
+    pattern = rf"^\s*CREATE\s+OR\s+REPLACE\s+TABLE\s+{re.escape(relation)}\s+AS\b"
+    if statements and re.match(pattern, statements[-1].query, re.IGNORECASE):
+        return statements
+    return None
+
+
+def supported(conn, sql: str, relation: str) -> tuple:
+    """Materializations the SQL of ``relation`` can be built as."""
+    incremental = r"CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+"
+    if re.search(rf"{incremental}{re.escape(relation)}\b", sql, re.IGNORECASE):
+        return ("incremental",)
+    if relation.startswith("silver.") and _final_statement(conn, sql, relation):
+        return ("view", "table")
+    # Derived from state the model keeps up to date from deltas
+    if re.search(incremental, sql, re.IGNORECASE):
+        return ("incremental",)
+    return ("table",)
+
+
+def _stats(conn, model: str):
+    row = conn.execute(
+        """
+        SELECT builds, reads, relation_seconds,
+               GREATEST(date_diff('second', first_seen, now()::TIMESTAMP) / 86400.0, 1.0)
+        FROM meta.model_stats
+        WHERE model = ?
+        """,
+        [model],
+    ).fetchone()
+    return row or (0, 0, None, 1.0)
+
+
+def recommend(conn, model: str, options: tuple) -> tuple:
+    """``(materialization, reason)`` minimizing the model's compute per day."""
+    if len(options) == 1:
+        materialization = options[0]
+        reason = "maintained from deltas" if materialization == "incremental" else "only option"
+        _, _, seconds, _ = _stats(conn, model)
+        if materialization == "table" and seconds and seconds >= INCREMENTAL_SECONDS:
+            return "incremental", f"rebuilding it takes {seconds:.1f}s"
+        return materialization, reason
+
+    builds, reads, seconds, days = _stats(conn, model)
+    if builds < MIN_BUILDS or seconds is None:
+        return "table", f"collecting usage ({builds} of {MIN_BUILDS} builds)"
+    table_cost = builds / days * seconds
+    view_cost = reads / days * seconds
+    costs = f"table {table_cost:.3f}s/day, view {view_cost:.3f}s/day"
+    if view_cost <= table_cost:
+        return "view", f"{reads} reads per {builds} builds: {costs}"
+    if seconds >= INCREMENTAL_SECONDS:
+        return "incremental", f"read more than built and rebuilding takes {seconds:.1f}s"
+    return "table", f"{reads} reads per {builds} builds: {costs}"
+
+
+def decide(conn, sql: str, model_name: str, options: tuple) -> Decision:
+    """Pick the materialization of ``model_name`` (``layer.model``) for this build."""
+    ensure_stats(conn)
+    recommended, reason = recommend(conn, model_name, options)
+    override = _OVERRIDE.search(sql)
+    in_memory = conn.execute("SELECT current_database()").fetchone()[0] == "memory"
+
+    if override:
+        materialization = override.group(1).lower()
+        if materialization not in options:
+            raise ValueError(
+                f"{model_name} can be materialized as {' or '.join(options)}, "
+                f"not {materialization}"
+            )
+    elif "view" not in options:
+        materialization = options[0]
+    elif policy() == "recommend":
+        materialization = "table"
+    else:
+        materialization = recommended if recommended in options else "table"
+    if in_memory and materialization == "view":
+        materialization = "table"
+    return Decision(model_name, materialization, recommended, reason)
+
+
+def prepare_relation(conn, relation: str, kind: str):
+    """Drop ``relation`` if it exists as a view while a table is wanted, or vice versa.
+
+    DuckDB cannot ``CREATE OR REPLACE`` a view with a table or the reverse.
+    ``relation`` is ``schema.name`` or ``database.schema.name``.
+    """
+    *database, schema, name = relation.split(".")
+    database = database[0] if database else conn.execute("SELECT current_database()").fetchone()[0]
+    existing = conn.execute(
+        """
+        SELECT 'view'
+        FROM duckdb_views()
+        WHERE database_name = ? AND schema_name = ? AND view_name = ?
+        UNION ALL
+        SELECT 'table'
+        FROM duckdb_tables()
+        WHERE database_name = ? AND schema_name = ? AND table_name = ?
+        """,
+        [database, schema, name, database, schema, name],
+    ).fetchone()
+    if existing and existing[0] != kind:
+        conn.execute(f"DROP {existing[0].upper()} {relation}")
+
+
+def _record(conn, sql: str, decision: Decision, seconds, relation_seconds):
+    """Count this build, its relation cost and the reads it made of other models."""
+    conn.execute(
+        """
+        INSERT INTO meta.model_stats VALUES (?, ?, 1, 0, ?, ?, now(), now())
+        ON CONFLICT (model) DO UPDATE SET
+            materialization = excluded.materialization,
+            builds = builds + 1,
+            relation_seconds = COALESCE(
+                ? * excluded.relation_seconds + (1 - ?) * relation_seconds,
+                excluded.relation_seconds,
+                relation_seconds
+            ),
+            build_seconds = ? * excluded.build_seconds + (1 - ?) * build_seconds,
+            last_built = now()
+        """,
+        [
+            decision.model,
+            decision.materialization,
+            relation_seconds,
+            seconds,
+            SMOOTHING,
+            SMOOTHING,
+            SMOOTHING,
+            SMOOTHING,
+        ],
+    )
+    code = _NOT_CODE.sub(" ", sql)
+    for layer in ("silver", "gold"):
+        for model in selection.LAYERS[layer]:
+            relation = f"{layer}.{model}"
+            if relation == decision.model:
+                continue
+            reads = len(re.findall(rf"\b{re.escape(relation)}\b", code, re.IGNORECASE))
+            if reads:
+                conn.execute(
+                    """
+                    INSERT INTO meta.model_stats VALUES (?, NULL, 0, ?, NULL, NULL, now(), NULL)
+                    ON CONFLICT (model) DO UPDATE SET reads = reads + excluded.reads
+                    """,
+                    [relation, reads],
+                )
+
+
+def build_model(conn, sql: str, model_name: str) -> Decision:
+    """Run a model's SQL as its chosen materialization and record its usage.
+
+    A drop-in for ``execute_sql(conn, sql, model_name)``; returns the decision.
+    """
+    options = supported(conn, sql, model_name)
+    decision = decide(conn, sql, model_name, options)
+    start = time.perf_counter()
+    relation_seconds = None
+    if "view" in options:
+        statements = _final_statement(conn, sql, model_name)
+        body = ";\n".join(statement.query for statement in statements[:-1])
+        final = statements[-1].query
+        if body:
+            execute_sql(conn, body, model_name)
+        prepare_relation(conn, model_name, decision.materialization)
+        relation_start = time.perf_counter()
+        if decision.materialization == "view":
+            final = re.sub(r"\bTABLE\b", "VIEW", final, count=1, flags=re.IGNORECASE)
+        execute_sql(conn, final, f"{model_name}.relation")
+        if decision.materialization == "table":
+            relation_seconds = time.perf_counter() - relation_start
+    else:
+        execute_sql(conn, sql, model_name)
+    _record(conn, sql, decision, time.perf_counter() - start, relation_seconds)
+    return decision
+
+
+def report(conn) -> list:
+    """``(model, current, recommended, reason)`` for every model with usage stats."""
+    ensure_stats(conn)
+    rows = []
+    for layer in ("silver", "gold"):
+        for model in selection.LAYERS[layer]:
+            model_name = f"{layer}.{model}"
+            row = conn.execute(
+                "SELECT materialization FROM meta.model_stats WHERE model = ?", [model_name]
+            ).fetchone()
+            path = f"sql/{layer}/{model}.sql"
+            if row is None or row[0] is None or not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                options = supported(conn, f.read(), model_name)
+            recommended, reason = recommend(conn, model_name, options)
+            rows.append((model_name, row[0], recommended, reason))
+    return rows
@@ -0,0 +1,179 @@
+"""On-demand profiling for the pipeline runners and Dagster assets.
+
+Set ``PROFILE_DIR`` to turn profiling on. Each run then writes, under
+``PROFILE_DIR/<run_id>/`` (stacks are sampled every ``PROFILE_INTERVAL_MS``,
+default 5):
+
+* ``<step>.folded`` - sampled Python stacks in collapsed format, ready for
+  ``flamegraph.pl`` or speedscope;
+* ``sql/<model>.<n>.json`` - DuckDB's JSON query profile per statement;
+* ``sql/<model>.operators.tsv`` - per-operator timings and cardinalities.
+
+With ``PROFILE_DIR`` unset, ``profiled`` returns the function unchanged.
+``execute_sql`` also opens a span per statement while telemetry is enabled
+(see ``src.telemetry``); with both off it is a plain ``conn.execute``.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+from src.telemetry import sample_duckdb_memory, span, telemetry_enabled
+
+_DEFAULT_RUN_ID = datetime.now().strftime("%Y%m%dT%H%M%S")
+_run_dir = contextvars.ContextVar("profile_run_dir", default=None)
+# Statements whose result is the number of rows they changed
+_DML_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+def _profile_dir() -> str:
+    return os.getenv("PROFILE_DIR", "")
+
+
+def profiling_enabled() -> bool:
+    """Whether profiling output is being collected."""
+    return bool(_profile_dir())
+
+
+def _current_run_dir() -> str:
+    """Directory for the active profile block, or the process default."""
+    return _run_dir.get() or os.path.join(_profile_dir(), _DEFAULT_RUN_ID)
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a background thread."""
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.target = threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                self.target
+            )
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = os.path.basename(code.co_filename)
+                stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path: str):
+        """Write samples in collapsed-stack format."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextlib.contextmanager
+def _profile_block(name: str, run_id: str = None):
+    run_dir = os.path.join(_profile_dir(), run_id or _DEFAULT_RUN_ID)
+    os.makedirs(os.path.join(run_dir, "sql"), exist_ok=True)
+    sampler = _StackSampler(float(os.getenv("PROFILE_INTERVAL_MS", "5")))
+    token = _run_dir.set(run_dir)
+    try:
+        with sampler:
+            yield
+    finally:
+        _run_dir.reset(token)
+        sampler.write_folded(os.path.join(run_dir, f"{name}.folded"))
+
+
+def profile_block(name: str, run_id: str = None):
+    """Context manager sampling the enclosed block as step ``name``."""
+    if not profiling_enabled():
+        return contextlib.nullcontext()
+    return _profile_block(name, run_id)
+
+
+def profiled(fn):
+    """Profile a Dagster asset function under its own name and run id."""
+    if not profiling_enabled():
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(context, *args, **kwargs):
+        with profile_block(fn.__name__, context.run_id):
+            return fn(context, *args, **kwargs)
+
+    return wrapper
+
+
+def execute_sql(conn, sql: str, name: str):
+    """Execute a SQL file, recording a DuckDB query profile and spans when enabled."""
+    profiling = profiling_enabled()
+    if not profiling and not telemetry_enabled():
+        return conn.execute(sql)
+
+    sql_dir = os.path.join(_current_run_dir(), "sql")
+    profiles = []
+    result = None
+    # Memory is sampled on its own cursor so the profile and result stay intact
+    monitor = conn.cursor() if telemetry_enabled() else None
+    if profiling:
+        os.makedirs(sql_dir, exist_ok=True)
+        conn.execute("PRAGMA enable_profiling = 'json'")
+    try:
+        for i, statement in enumerate(conn.extract_statements(sql)):
+            if profiling:
+                path = os.path.join(sql_dir, f"{name}.{i:02d}.json")
+                conn.execute(f"PRAGMA profiling_output = '{path}'")
+                profiles.append(path)
+            with span(
+                f"{name}.{i:02d}",
+                "sql",
+                **{"db.operation": statement.type.name, "db.statement": statement.query[:500]},
+            ) as statement_span:
+                result = conn.execute(statement.query)
+                if statement.type.name in _DML_STATEMENTS:
+                    statement_span.add("rows_affected", result.fetchone()[0])
+                if monitor is not None:
+                    sample_duckdb_memory(monitor)
+    finally:
+        if profiling:
+            conn.execute("PRAGMA disable_profiling")
+        if monitor is not None:
+            monitor.close()
+
+    if profiling:
+        _write_operator_timings(profiles, os.path.join(sql_dir, f"{name}.operators.tsv"))
+    return result
+
+
+def _write_operator_timings(profiles: list[str], path: str):
+    """Flatten DuckDB JSON profiles into one operator timing table."""
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("statement\tdepth\toperator\tseconds\tcardinality\n")
+        for i, profile in enumerate(profiles):
+            if not os.path.exists(profile):
+                continue
+            with open(profile, "r", encoding="utf-8") as f:
+                root = json.load(f)
+            stack = [(child, 0) for child in reversed(root.get("children", []))]
+            while stack:
+                node, depth = stack.pop()
+                operator = node.get("operator_name") or node.get("name", "?")
+                seconds = node.get("operator_timing", node.get("timing", 0))
+                rows = node.get("operator_cardinality", node.get("cardinality", 0))
+                out.write(f"{i}\t{depth}\t{operator.strip()}\t{seconds:.6f}\t{rows}\n")
+                stack.extend((c, depth + 1) for c in reversed(node.get("children", [])))
@@ -7,6 +7,13 @@ from dagster import Definitions, load_assets_from_modules
 # Load environment variables
 load_dotenv()
 
+from src.resources.sampling import sample_rate_from_env, sampled_environment
+
+# SAMPLE=1% runs every job on a deterministic sample, in its own warehouse
+SAMPLE_RATE = sample_rate_from_env()
+if SAMPLE_RATE < 1:
+    os.environ.update(sampled_environment(SAMPLE_RATE))
+
 # Import resources
 from src.resources.warehouse import DuckDBResource
 from src.resources.azure import AzureBlobResource
@@ -14,33 +21,45 @@ from src.resources.azure import AzureBlobResource
 # Import assets
 from src.assets.bronze import csv_assets, tickets_assets
 from src.assets.silver import transforms_sql
-from src.assets.gold import marts_sql
+from src.assets.gold import marts_sql, publish
+from src.assets.maintenance import compaction
 
 # Import jobs and schedules
-from src.jobs.elt_jobs import full_elt_job, bronze_job, silver_job, gold_job
-from src.schedules.schedules import daily_elt_schedule
+from src.jobs.elt_jobs import full_elt_job, bronze_job, silver_job, gold_job, maintenance_job
+from src.schedules.schedules import daily_elt_schedule, weekly_maintenance_schedule
 
 # Load all assets
 bronze_assets = load_assets_from_modules([csv_assets, tickets_assets])
 silver_assets = load_assets_from_modules([transforms_sql])
-gold_assets = load_assets_from_modules([marts_sql])
+gold_assets = load_assets_from_modules([marts_sql, publish])
+maintenance_assets = load_assets_from_modules([compaction])
 
-all_assets = [*bronze_assets, *silver_assets, *gold_assets]
+all_assets = [*bronze_assets, *silver_assets, *gold_assets, *maintenance_assets]
 
 # Define resources
 resources = {
     "duckdb": DuckDBResource(
-        database_path=os.getenv("DUCKDB_PATH", "data/warehouse.duckdb")
+        database_path=os.getenv("DUCKDB_PATH", "data/warehouse.duckdb"),
+        snapshot_dir=os.getenv("SNAPSHOT_DIR", "data/snapshots"),
+        bronze_mode=os.getenv("BRONZE_MODE", "table"),
+        lake_dir=os.getenv("LAKE_DIR", "data/lake"),
+        ingest_workers=int(os.getenv("INGEST_WORKERS", "4")),
+        lock_timeout_seconds=float(os.getenv("DUCKDB_LOCK_TIMEOUT", "600")),
+        sample_rate=SAMPLE_RATE,
+        bronze_retention_days=int(os.getenv("BRONZE_RETENTION_DAYS", "30")),
     ),
     "azure_blob": AzureBlobResource(
-        container_sas_url=os.getenv("CONTAINER_SAS_URL", "")
+        container_sas_url=os.getenv("CONTAINER_SAS_URL", ""),
+        blob_pattern=os.getenv("TICKETS_BLOB_PATTERN", "*.jsonl*"),
+        cache_dir=os.getenv("BLOB_CACHE_DIR", "data/blob_cache"),
+        download_workers=int(os.getenv("INGEST_WORKERS", "4")),
     ),
 }
 
 # Create Dagster definitions
 defs = Definitions(
     assets=all_assets,
-    jobs=[full_elt_job, bronze_job, silver_job, gold_job],
-    schedules=[daily_elt_schedule],
+    jobs=[full_elt_job, bronze_job, silver_job, gold_job, maintenance_job],
+    schedules=[daily_elt_schedule, weekly_maintenance_schedule],
     resources=resources,
 )
@@ -1,31 +1,60 @@
 """Azure Blob Storage resource for Dagster."""
 
-import io
-
 import pandas as pd
 from dagster import ConfigurableResource
 from azure.storage.blob import ContainerClient
 
+from src.resources.sources import (
+    TICKET_BLOB_PATTERN,
+    cache_blobs,
+    list_blobs,
+    read_cached_blob,
+    read_jsonl_blob,
+)
+
+# Steps that only download run in this pool, apart from the warehouse writer
+DOWNLOAD_POOL = "blob_download"
+DOWNLOAD_OP_TAGS = {"elt/pool": DOWNLOAD_POOL}
+
 
 class AzureBlobResource(ConfigurableResource):
-    """Azure Blob Storage resource for reading JSONL files."""
+    """Azure Blob Storage resource for reading (optionally compressed) JSONL files.
+
+    Blobs downloaded ahead of their load are cached as Parquet in
+    ``cache_dir`` by ``download_workers`` threads (see ``src.resources.sources``).
+    """
 
     container_sas_url: str
+    blob_pattern: str = TICKET_BLOB_PATTERN
+    cache_dir: str = "data/blob_cache"
+    download_workers: int = 4
 
-    def list_jsonl_blobs(self) -> list[str]:
-        """List all .jsonl files in the container."""
+    def list_blob_etags(self) -> dict:
+        """Map each blob matching ``blob_pattern`` to its etag."""
         cc = ContainerClient.from_container_url(self.container_sas_url)
-        return [b.name for b in cc.list_blobs() if b.name.endswith(".jsonl")]
+        return list_blobs(cc, self.blob_pattern)
+
+    def list_jsonl_blobs(self) -> list[str]:
+        """List all blobs matching ``blob_pattern`` (.jsonl, .jsonl.gz, .jsonl.zst)."""
+        return list(self.list_blob_etags())
 
     def read_jsonl_blob(self, blob_name: str) -> pd.DataFrame:
-        """Read a JSONL blob and return as DataFrame."""
+        """Stream a JSONL blob, decompressing it on the fly, into a DataFrame."""
         cc = ContainerClient.from_container_url(self.container_sas_url)
-        bc = cc.get_blob_client(blob_name)
-        text = bc.download_blob().readall().decode("utf-8")
-        df = pd.read_json(io.StringIO(text), lines=True)
+        df = read_jsonl_blob(cc, blob_name)
         df["source_blob"] = blob_name
         return df
 
+    def cache_new_blobs(self, blobs: dict) -> dict:
+        """Download ``blobs`` (``{name: etag}``) not cached yet; ``{name: row count}``."""
+        cc = ContainerClient.from_container_url(self.container_sas_url)
+        return cache_blobs(cc, blobs, self.cache_dir, self.download_workers)
+
+    def read_cached_jsonl_blob(self, blob_name: str, etag: str) -> pd.DataFrame:
+        """A blob from the cache, or streamed from Azure if this version is not cached."""
+        cc = ContainerClient.from_container_url(self.container_sas_url)
+        return read_cached_blob(cc, blob_name, etag, self.cache_dir)
+
     def read_all_jsonl_blobs(self) -> pd.DataFrame:
         """Read all JSONL blobs and concatenate into single DataFrame."""
         blob_names = self.list_jsonl_blobs()
@@ -0,0 +1,172 @@
+"""Bronze layer storage: DuckDB tables or a local Parquet lake.
+
+In ``lake`` mode every load is written as a zstd-compressed Parquet file
+
+    {lake_dir}/{table}/load_date=YYYY-MM-DD/{table}_{HHMMSSffffff}.parquet
+
+and ``bronze.{table}`` becomes a view over the file just written, while
+``bronze.{table}_history`` is a view over every load (with ``load_date`` as
+a hive partition column). Silver queries read the views, so DuckDB pushes
+projections and filters down into the Parquet scan.
+
+Multi-file sources (see ``src.resources.sources``) instead land one Parquet
+file per source file and point ``bronze.{table}`` at the current file of
+every source file.
+
+Landing statements run through ``execute_sql`` as ``bronze.{table}``, so they
+get a span, DuckDB memory samples and a query profile like silver and gold.
+
+COPY ... TO writes its file outside the warehouse transaction, so loads run
+inside ``discard_on_rollback`` remove the files they wrote if they fail;
+otherwise ``bronze.{table}_history`` would read a rolled-back load again.
+"""
+
+import contextvars
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.profiling import execute_sql
+
+BRONZE_MODES = ("table", "lake")
+
+# Lake files written inside the current discard_on_rollback block
+_written_files = contextvars.ContextVar("lake_written_files", default=None)
+
+
+def _sql_path(path: str) -> str:
+    """Path literal usable inside a DuckDB string on every platform."""
+    return path.replace("\\", "/").replace("'", "''")
+
+
+def _drop(conn, name: str, kind: str):
+    """Drop ``bronze.{name}`` only if it exists as ``kind`` (TABLE or VIEW)."""
+    catalog, column = (
+        ("duckdb_tables()", "table_name") if kind == "TABLE" else ("duckdb_views()", "view_name")
+    )
+    exists = conn.execute(
+        f"""
+        SELECT COUNT(*)
+        FROM {catalog}
+        WHERE database_name = current_database()
+          AND schema_name = 'bronze'
+          AND {column} = ?
+        """,
+        [name],
+    ).fetchone()[0]
+    if exists:
+        conn.execute(f"DROP {kind} bronze.{name}")
+
+
+def check_bronze_mode(mode: str):
+    """Raise ``ValueError`` for an unknown bronze mode."""
+    if mode not in BRONZE_MODES:
+        raise ValueError(f"Unknown bronze mode {mode!r}; expected one of {BRONZE_MODES}")
+
+
+def write_bronze(conn, dataframe, table: str, mode: str = "table", lake_dir: str = "data/lake"):
+    """Land ``dataframe`` as ``bronze.{table}`` using the given bronze mode."""
+    check_bronze_mode(mode)
+    conn.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+    if mode == "table":
+        conn.register("bronze_df", dataframe)
+        try:
+            _drop(conn, f"{table}_history", "VIEW")
+            _drop(conn, table, "VIEW")
+            execute_sql(
+                conn,
+                f"CREATE OR REPLACE TABLE bronze.{table} AS SELECT * FROM bronze_df",
+                f"bronze.{table}",
+            )
+        finally:
+            conn.unregister("bronze_df")
+        return
+
+    path = write_lake_file(conn, dataframe, table, lake_dir)
+    create_lake_views(conn, table, [path], lake_dir)
+
+
+def append_bronze(conn, dataframe, table: str, key_column: str, replace: bool = False):
+    """Append ``dataframe`` to the ``bronze.{table}`` table (table mode).
+
+    Rows already loaded with the same ``key_column`` values (the file they
+    came from) are replaced; ``replace`` recreates the table instead.
+    """
+    conn.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+    conn.register("bronze_df", dataframe)
+    try:
+        if replace:
+            _drop(conn, f"{table}_history", "VIEW")
+            _drop(conn, table, "VIEW")
+            execute_sql(
+                conn,
+                f"CREATE OR REPLACE TABLE bronze.{table} AS SELECT * FROM bronze_df",
+                f"bronze.{table}",
+            )
+            return
+        execute_sql(
+            conn,
+            f"""
+            DELETE FROM bronze.{table}
+            WHERE {key_column} IN (SELECT DISTINCT {key_column} FROM bronze_df);
+            INSERT INTO bronze.{table} BY NAME SELECT * FROM bronze_df;
+            """,
+            f"bronze.{table}",
+        )
+    finally:
+        conn.unregister("bronze_df")
+
+
+def write_lake_file(conn, dataframe, table: str, lake_dir: str = "data/lake") -> str:
+    """Write ``dataframe`` as a new Parquet file of ``table`` and return its path."""
+    now = datetime.now()
+    partition = os.path.join(lake_dir, table, f"load_date={now:%Y-%m-%d}")
+    os.makedirs(partition, exist_ok=True)
+    path = os.path.join(partition, f"{table}_{now:%H%M%S%f}.parquet")
+    conn.register("bronze_df", dataframe)
+    try:
+        execute_sql(
+            conn,
+            f"COPY (SELECT * FROM bronze_df) TO '{_sql_path(path)}' "
+            "(FORMAT PARQUET, COMPRESSION ZSTD)",
+            f"bronze.{table}",
+        )
+    finally:
+        conn.unregister("bronze_df")
+    written = _written_files.get()
+    if written is not None:
+        written.append(path)
+    return path
+
+
+@contextmanager
+def discard_on_rollback():
+    """Remove the lake files written in the block if it raises."""
+    written = []
+    token = _written_files.set(written)
+    try:
+        yield
+    except BaseException:
+        for path in written:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        _written_files.reset(token)
+
+
+def create_lake_views(conn, table: str, paths, lake_dir: str = "data/lake"):
+    """Point ``bronze.{table}`` at ``paths`` and ``{table}_history`` at every load."""
+    conn.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+    files = ", ".join(f"'{_sql_path(path)}'" for path in paths)
+    history_glob = _sql_path(os.path.join(lake_dir, table, "*", "*.parquet"))
+    _drop(conn, table, "TABLE")
+    conn.execute(
+        f"CREATE OR REPLACE VIEW bronze.{table} AS "
+        f"SELECT * FROM read_parquet([{files}], union_by_name = true)"
+    )
+    conn.execute(
+        f"CREATE OR REPLACE VIEW bronze.{table}_history AS "
+        f"SELECT * FROM read_parquet('{history_glob}', "
+        "hive_partitioning = true, union_by_name = true)"
+    )
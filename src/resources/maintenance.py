@@ -0,0 +1,198 @@
+"""Warehouse maintenance: bronze retention and compaction.
+
+Every run rebuilds most models with ``CREATE OR REPLACE TABLE`` and DuckDB
+reuses the freed blocks only in part, so the warehouse file keeps growing
+past its live data, which slows cold opens and backups. ``run_maintenance``
+
+1. measures the file against its live data (``PRAGMA database_size``);
+2. applies retention to the bronze lake: Parquet loads older than
+   ``retention_days`` that no ``bronze.{table}`` view reads any more are
+   removed, so ``bronze.{table}_history`` keeps only recent loads;
+3. compacts the warehouse: ``COPY FROM DATABASE`` writes every schema into a
+   fresh file next to it, which is swapped in with ``os.replace``, so the next
+   connection opens either the old or the new file, never a partial one;
+4. appends the before and after sizes to ``meta.maintenance_runs`` (in the
+   compacted file) and to the current telemetry span.
+
+The copy and, on POSIX, the swap hold the warehouse's write lock, so a writer
+waiting for it opens the compacted file. Windows cannot replace an open file,
+so there the swap follows the release: run maintenance while no pipeline run
+writes the warehouse (the Dagster job shares the writer pool and warehouse
+run tag, so it queues).
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import duckdb
+
+from src.telemetry import current_span
+
+COMPACT_SUFFIX = ".compact"
+
+
+def database_size(conn, database: str = None) -> dict:
+    """``file_bytes`` (allocated blocks) and ``live_bytes`` (used blocks) of a database."""
+    database = database or conn.execute("SELECT current_database()").fetchone()[0]
+    block_size, total, used = conn.execute(
+        """
+        SELECT block_size, total_blocks, used_blocks
+        FROM pragma_database_size()
+        WHERE database_name = ?
+        """,
+        [database],
+    ).fetchone()
+    return {"file_bytes": block_size * total, "live_bytes": block_size * used}
+
+
+def _current_lake_files(conn) -> tuple:
+    """Lake files the load ledger names as current, and the SQL of the bronze views."""
+    views = [
+        sql
+        for (sql,) in conn.execute(
+            """
+            SELECT sql
+            FROM duckdb_views()
+            WHERE database_name = current_database() AND schema_name = 'bronze'
+            """
+        ).fetchall()
+    ]
+    ledger = conn.execute(
+        """
+        SELECT COUNT(*)
+        FROM duckdb_tables()
+        WHERE database_name = current_database()
+          AND schema_name = 'bronze' AND table_name = 'source_files'
+        """
+    ).fetchone()[0]
+    current = set()
+    if ledger:
+        current.update(
+            os.path.normpath(path)
+            for (path,) in conn.execute(
+                "SELECT lake_path FROM bronze.source_files WHERE lake_path IS NOT NULL"
+            ).fetchall()
+        )
+    return current, views
+
+
+def apply_retention(conn, lake_dir: str, retention_days: int) -> dict:
+    """Remove lake loads older than ``retention_days`` that are no longer current.
+
+    Returns ``{"files": removed file count, "bytes": removed bytes}``.
+    """
+    removed = {"files": 0, "bytes": 0}
+    if retention_days <= 0 or not os.path.isdir(lake_dir):
+        return removed
+    cutoff = f"load_date={datetime.now() - timedelta(days=retention_days):%Y-%m-%d}"
+    current, views = _current_lake_files(conn)
+
+    for table in sorted(os.listdir(lake_dir)):
+        table_dir = os.path.join(lake_dir, table)
+        if not os.path.isdir(table_dir):
+            continue
+        for partition in sorted(os.listdir(table_dir)):
+            # Hive partitions sort by date; keep everything from the cutoff on
+            if not partition.startswith("load_date=") or partition >= cutoff:
+                continue
+            partition_dir = os.path.join(table_dir, partition)
+            for name in os.listdir(partition_dir):
+                path = os.path.join(partition_dir, name)
+                literal = path.replace("\\", "/").replace("'", "''")
+                if os.path.normpath(path) in current or any(literal in sql for sql in views):
+                    continue
+                removed["bytes"] += os.path.getsize(path)
+                os.remove(path)
+                removed["files"] += 1
+            if not os.listdir(partition_dir):
+                os.rmdir(partition_dir)
+    return removed
+
+
+def _ensure_runs(conn, database: str):
+    conn.execute(f"CREATE SCHEMA IF NOT EXISTS {database}.meta")
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {database}.meta.maintenance_runs (
+            started_at TIMESTAMP,
+            seconds DOUBLE,
+            file_bytes_before BIGINT,
+            live_bytes_before BIGINT,
+            file_bytes_after BIGINT,
+            live_bytes_after BIGINT,
+            lake_files_removed BIGINT,
+            lake_bytes_removed BIGINT
+        )
+        """
+    )
+
+
+def run_maintenance(
+    database_path: str,
+    lake_dir: str = "data/lake",
+    retention_days: int = 30,
+    connect=duckdb.connect,
+) -> dict:
+    """Apply bronze retention, compact the warehouse file and record the sizes.
+
+    ``connect(database_path)`` opens the warehouse read-write (pass a
+    lock-waiting connector to queue behind another writer). Returns the
+    recorded sizes and counts.
+    """
+    started_at = datetime.now()
+    start = time.perf_counter()
+    compact_path = f"{database_path}{COMPACT_SUFFIX}"
+    for path in (compact_path, f"{compact_path}.wal"):
+        if os.path.exists(path):
+            # Left behind by an interrupted compaction
+            os.remove(path)
+
+    conn = connect(database_path)
+    try:
+        conn.execute("CHECKPOINT")
+        before = database_size(conn)
+        removed = apply_retention(conn, lake_dir, retention_days)
+        database = conn.execute("SELECT current_database()").fetchone()[0]
+        literal = compact_path.replace("\\", "/").replace("'", "''")
+        conn.execute(f"ATTACH '{literal}' AS compacted")
+        try:
+            conn.execute(f"COPY FROM DATABASE {database} TO compacted")
+            conn.execute("CHECKPOINT compacted")
+            after = database_size(conn, "compacted")
+            _ensure_runs(conn, "compacted")
+            result = {
+                "started_at": started_at,
+                "seconds": time.perf_counter() - start,
+                "file_bytes_before": before["file_bytes"],
+                "live_bytes_before": before["live_bytes"],
+                "file_bytes_after": after["file_bytes"],
+                "live_bytes_after": after["live_bytes"],
+                "lake_files_removed": removed["files"],
+                "lake_bytes_removed": removed["bytes"],
+            }
+            conn.execute(
+                "INSERT INTO compacted.meta.maintenance_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                list(result.values()),
+            )
+        finally:
+            conn.execute("DETACH compacted")
+        # Atomic swap: the old file stays whole until the new one replaces it.
+        # POSIX replaces the name under the open file, so swap before the
+        # lock is released and no writer gets to the old file in between.
+        if os.name == "posix":
+            conn.execute("CHECKPOINT")
+            os.replace(compact_path, database_path)
+    except Exception:
+        conn.close()
+        if os.path.exists(compact_path):
+            os.remove(compact_path)
+        raise
+    conn.close()
+    if os.name != "posix":
+        os.replace(compact_path, database_path)
+    maintenance_span = current_span()
+    for key, value in result.items():
+        if key != "started_at":
+            maintenance_span.set(key, value)
+    return result
@@ -0,0 +1,42 @@
+"""Verification of the incrementally maintained gold.metrics.
+
+``sql/gold/metrics.sql`` derives the KPIs from additive state that is only
+updated from the delta. With ``METRICS_VERIFY`` set, the metrics step also
+recomputes them from the full marts and fails if the two disagree; dropping
+the ``gold.metrics_*`` state tables and ``gold.metrics_daily`` forces the
+state to be rebuilt.
+"""
+
+import math
+import os
+
+METRIC_TOLERANCE = 1e-9
+
+
+def metrics_verify_enabled() -> bool:
+    """Whether METRICS_VERIFY asks for a full-recompute check."""
+    return os.getenv("METRICS_VERIFY", "").lower() in ("1", "true", "yes")
+
+
+def verify_metrics(conn) -> list:
+    """Compare state-derived KPIs with a full recompute.
+
+    Returns ``(metric, incremental, full)`` rows and raises ``ValueError``
+    if any metric differs beyond a relative tolerance.
+    """
+    with open("sql/gold/metrics_verify.sql", "r", encoding="utf-8") as f:
+        rows = conn.execute(f.read()).fetchall()
+
+    mismatches = [
+        (metric, incremental, full)
+        for metric, incremental, full in rows
+        if not (
+            incremental is None and full is None
+            or None not in (incremental, full)
+            and math.isclose(incremental, float(full), rel_tol=METRIC_TOLERANCE)
+        )
+    ]
+    if mismatches:
+        details = ", ".join(f"{m}: incremental={i} full={f}" for m, i, f in mismatches)
+        raise ValueError(f"gold.metrics state has drifted from a full recompute ({details})")
+    return rows
@@ -0,0 +1,254 @@
+"""Versioned schema registry for bronze sources whose fields evolve.
+
+Ticket blobs gain fields over time, and a field's values may change type
+(an integer id becoming a string). Instead of reloading every file, each
+file's columns are compared with the table's current schema before it is
+landed:
+
+* a new column is added with ``ALTER TABLE ... ADD COLUMN``; rows loaded
+  before read it as NULL;
+* a column whose values no longer fit is widened in place with
+  ``ALTER TABLE ... ALTER COLUMN ... SET DATA TYPE`` to the type DuckDB
+  would unify both to (``BIGINT`` and ``DOUBLE`` to ``DOUBLE``, ``BIGINT``
+  and ``VARCHAR`` to ``VARCHAR``); narrower values are cast on insert;
+* a column missing from the file is left NULL for its rows, and a new column
+  without any value yet is left out until a file has values for it.
+
+Every change is recorded in ``bronze.schema_registry`` as a new version of
+the table's schema, with the file that caused it. In lake mode the Parquet
+views already unify files by name, so changes are only recorded.
+
+``silver.tickets`` carries the bronze ticket columns listed in
+``TICKET_EXTRA_COLUMNS`` through unchanged: ``prepare_ticket_projection``
+hands the list to ``sql/silver/tickets.sql`` as the ``ticket_extra_columns``
+variable and adds the columns to the incremental silver tables. It also
+widens the silver columns that ``tickets.sql`` copies without a cast when
+their bronze column was widened, so the next append fits.
+"""
+
+import os
+
+import pandas as pd
+
+REGISTRY_TABLE = "bronze.schema_registry"
+# Bronze tables whose schema evolves with their files; CSV sources keep the
+# schema of their first load (pandas reads integer columns with gaps as floats)
+EVOLVING_TABLES = ("raw_tickets",)
+# Silver tables maintained by sql/silver/tickets.sql that carry extra columns
+TICKET_SILVER_TABLES = ("silver.tickets_history", "silver.tickets")
+# Bronze ticket columns sql/silver/tickets.sql copies without a cast, and
+# their silver names
+TICKET_PROJECTED_COLUMNS = {
+    "ticket_id": "ticket_id",
+    "customer_external_id": "customer_id",
+    "order_id": "order_id",
+    "channel": "channel",
+    "priority": "priority",
+    "status": "status",
+    "category": "category",
+    "subject": "subject",
+    "body": "description",
+    "sentiment": "sentiment",
+    "agent_id": "agent_id",
+}
+
+
+def _ensure_registry(conn):
+    conn.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+            table_name VARCHAR,
+            version INTEGER,
+            column_name VARCHAR,
+            data_type VARCHAR,
+            change VARCHAR,
+            source_file VARCHAR,
+            registered_at TIMESTAMP
+        )
+        """
+    )
+
+
+def relation_columns(conn, relation: str) -> dict:
+    """``{column: type}`` of a table or view, empty if it does not exist."""
+    schema, name = relation.split(".")
+    return dict(
+        conn.execute(
+            """
+            SELECT column_name, data_type
+            FROM duckdb_columns()
+            WHERE database_name = current_database() AND schema_name = ? AND table_name = ?
+            ORDER BY column_index
+            """,
+            [schema, name],
+        ).fetchall()
+    )
+
+
+def _is_table(conn, relation: str) -> bool:
+    schema, name = relation.split(".")
+    return bool(
+        conn.execute(
+            """
+            SELECT COUNT(*)
+            FROM duckdb_tables()
+            WHERE database_name = current_database() AND schema_name = ? AND table_name = ?
+            """,
+            [schema, name],
+        ).fetchone()[0]
+    )
+
+
+def supertype(conn, current: str, new: str) -> str:
+    """The type DuckDB unifies ``current`` and ``new`` to."""
+    return conn.execute(
+        f"SELECT typeof(x) FROM (SELECT NULL::{current} AS x UNION ALL SELECT NULL::{new}) "
+        "LIMIT 1"
+    ).fetchone()[0]
+
+
+def schema_changes(conn, current: dict, columns: dict) -> list:
+    """``(column, type, change)`` turning ``current`` into a schema that fits ``columns``."""
+    changes = []
+    for column, data_type in columns.items():
+        if column not in current:
+            changes.append((column, data_type, "added"))
+        elif data_type != current[column]:
+            wider = supertype(conn, current[column], data_type)
+            if wider != current[column]:
+                changes.append((column, wider, "widened"))
+    return changes
+
+
+def evolve_table(conn, relation: str, columns: dict) -> list:
+    """Add or widen the columns of table ``relation`` so rows typed as ``columns`` fit.
+
+    Returns the applied ``(column, type, change)`` list. Raises ``ValueError``
+    if existing values cannot be converted to the wider type.
+    """
+    changes = schema_changes(conn, relation_columns(conn, relation), columns)
+    for column, data_type, change in changes:
+        if change == "added":
+            conn.execute(f'ALTER TABLE {relation} ADD COLUMN "{column}" {data_type}')
+            continue
+        try:
+            conn.execute(
+                f'ALTER TABLE {relation} ALTER COLUMN "{column}" SET DATA TYPE {data_type}'
+            )
+        except Exception as error:
+            raise ValueError(
+                f"Cannot widen {relation}.{column} to {data_type} in place; "
+                f"reload {relation} instead ({error})"
+            ) from error
+    return changes
+
+
+def registered_schema(conn, table: str) -> dict:
+    """``{column: type}`` of the latest registered version of ``bronze.{table}``."""
+    _ensure_registry(conn)
+    return dict(
+        conn.execute(
+            f"""
+            SELECT column_name, data_type
+            FROM {REGISTRY_TABLE}
+            WHERE table_name = ?
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY column_name ORDER BY version DESC) = 1
+            """,
+            [table],
+        ).fetchall()
+    )
+
+
+def schema_versions(conn, table: str) -> list:
+    """``(version, column, type, change, source file)`` of every registered change."""
+    _ensure_registry(conn)
+    return conn.execute(
+        f"""
+        SELECT version, column_name, data_type, change, source_file
+        FROM {REGISTRY_TABLE}
+        WHERE table_name = ?
+        ORDER BY version, column_name
+        """,
+        [table],
+    ).fetchall()
+
+
+def _register(conn, table: str, changes: list, source_file):
+    if not changes:
+        return
+    version = conn.execute(
+        f"SELECT COALESCE(MAX(version), 0) + 1 FROM {REGISTRY_TABLE} WHERE table_name = ?",
+        [table],
+    ).fetchone()[0]
+    conn.executemany(
+        f"INSERT INTO {REGISTRY_TABLE} VALUES (?, ?, ?, ?, ?, ?, now())",
+        [[table, version, *change, source_file] for change in changes],
+    )
+
+
+def _frame_columns(conn, df: pd.DataFrame) -> dict:
+    """``{column: DuckDB type}`` of the columns of ``df`` that hold a value."""
+    conn.register("schema_df", df)
+    try:
+        described = conn.execute("DESCRIBE SELECT * FROM schema_df").fetchall()
+    finally:
+        conn.unregister("schema_df")
+    return {row[0]: row[1] for row in described if df[row[0]].notna().any()}
+
+
+def evolve_bronze(
+    conn, table: str, df: pd.DataFrame, source_file: str, alter: bool = True
+) -> pd.DataFrame:
+    """Evolve ``bronze.{table}`` to fit ``df`` and record the new schema version.
+
+    With ``alter`` the bronze table is changed in place (table mode, when it
+    already exists); otherwise the table is about to be created from ``df``
+    or is a lake view, and the changes are only registered. Returns ``df``
+    without the new columns that hold no value yet.
+    """
+    relation = f"bronze.{table}"
+    current = registered_schema(conn, table)
+    if not current:
+        # Loaded before the registry existed: its columns are version 1
+        current = relation_columns(conn, relation)
+        _register(conn, table, [(c, t, "created") for c, t in current.items()], None)
+
+    columns = _frame_columns(conn, df)
+    unset = [c for c in df.columns if c not in columns and c not in current]
+    if alter and _is_table(conn, relation):
+        changes = evolve_table(conn, relation, columns)
+    else:
+        changes = schema_changes(conn, current, columns)
+    _register(conn, table, changes, source_file)
+    return df.drop(columns=unset)
+
+
+def ticket_extra_columns() -> list:
+    """Bronze ticket columns listed in TICKET_EXTRA_COLUMNS (comma-separated)."""
+    text = os.getenv("TICKET_EXTRA_COLUMNS", "")
+    return [column.strip() for column in text.split(",") if column.strip()]
+
+
+def prepare_ticket_projection(conn, columns=None) -> list:
+    """Make ``sql/silver/tickets.sql`` carry ``columns`` (default: TICKET_EXTRA_COLUMNS).
+
+    Sets the ``ticket_extra_columns`` variable the SQL projects, then adds
+    the columns (as typed in bronze) to the incremental silver ticket tables
+    that exist already and widens their ``TICKET_PROJECTED_COLUMNS`` to the
+    bronze types. Returns the extra columns found in bronze.
+    """
+    columns = ticket_extra_columns() if columns is None else list(columns)
+    conn.execute("SET VARIABLE ticket_extra_columns = CAST(? AS VARCHAR[])", [columns])
+    bronze = relation_columns(conn, "bronze.raw_tickets")
+    extra = {column: bronze[column] for column in columns if column in bronze}
+    wanted = {
+        silver: bronze[column]
+        for column, silver in TICKET_PROJECTED_COLUMNS.items()
+        if column in bronze
+    }
+    wanted.update(extra)
+    for relation in TICKET_SILVER_TABLES:
+        if _is_table(conn, relation):
+            evolve_table(conn, relation, wanted)
+    return list(extra)
@@ -0,0 +1,118 @@
+"""Read-only warehouse snapshots published after a successful gold build.
+
+Each publish writes a new versioned DuckDB file and then swaps a small
+pointer file with ``os.replace``, so readers always open a complete
+snapshot and never contend with the pipeline's write lock. Primary keys
+are recreated as unique indexes, so key lookups stay index scans, and the
+schemas' macros (``gold.customer_rfm`` and the sketch macros) are copied too.
+"""
+
+import os
+from datetime import datetime
+
+SNAPSHOT_POINTER = "CURRENT"
+SNAPSHOT_PREFIX = "warehouse_"
+
+
+def latest_snapshot_path(snapshot_dir: str) -> str:
+    """Return the path of the snapshot the pointer currently names."""
+    pointer = os.path.join(snapshot_dir, SNAPSHOT_POINTER)
+    if not os.path.exists(pointer):
+        raise FileNotFoundError(
+            f"No published snapshot in {snapshot_dir}; run the pipeline first"
+        )
+    with open(pointer, "r", encoding="utf-8") as f:
+        return os.path.join(snapshot_dir, f.read().strip())
+
+
+def copy_macros(conn, source: str, target: str, schema: str) -> int:
+    """Recreate the macros of ``source.schema`` in ``target.schema``; returns their count."""
+    macros = conn.execute(
+        """
+        SELECT function_name, function_type, parameters, macro_definition
+        FROM duckdb_functions()
+        WHERE database_name = ? AND schema_name = ?
+          AND function_type IN ('macro', 'table_macro')
+        """,
+        [source, schema],
+    ).fetchall()
+    for name, kind, parameters, definition in macros:
+        table = "TABLE " if kind == "table_macro" else ""
+        conn.execute(
+            f"CREATE OR REPLACE MACRO {target}.{schema}.{name}"
+            f"({', '.join(parameters)}) AS {table}{definition}"
+        )
+    return len(macros)
+
+
+def publish_snapshot(conn, snapshot_dir: str, schemas=("gold",), keep: int = 3) -> str:
+    """Copy the given schemas into a new snapshot file and make it current.
+
+    ``conn`` is an open read-write connection to the warehouse. Older
+    snapshots beyond ``keep`` are removed once the pointer has moved.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    name = f"{SNAPSHOT_PREFIX}{datetime.now():%Y%m%dT%H%M%S%f}.duckdb"
+    path = os.path.join(snapshot_dir, name)
+
+    conn.execute(f"ATTACH '{path}' AS snapshot")
+    try:
+        for schema in schemas:
+            conn.execute(f"CREATE SCHEMA IF NOT EXISTS snapshot.{schema}")
+            tables = conn.execute(
+                """
+                SELECT table_name
+                FROM duckdb_tables()
+                WHERE database_name = current_database()
+                  AND schema_name = ?
+                """,
+                [schema],
+            ).fetchall()
+            for (table,) in tables:
+                conn.execute(
+                    f"CREATE TABLE snapshot.{schema}.{table} AS "
+                    f"SELECT * FROM {schema}.{table}"
+                )
+            keys = conn.execute(
+                """
+                SELECT table_name, constraint_column_names
+                FROM duckdb_constraints()
+                WHERE database_name = current_database()
+                  AND schema_name = ?
+                  AND constraint_type = 'PRIMARY KEY'
+                """,
+                [schema],
+            ).fetchall()
+            for table, columns in keys:
+                conn.execute(
+                    f"CREATE UNIQUE INDEX {table}_pkey "
+                    f"ON snapshot.{schema}.{table} ({', '.join(columns)})"
+                )
+            database = conn.execute("SELECT current_database()").fetchone()[0]
+            copy_macros(conn, database, "snapshot", schema)
+    finally:
+        conn.execute("DETACH snapshot")
+
+    # Atomic pointer swap: readers see either the old or the new snapshot
+    pointer = os.path.join(snapshot_dir, SNAPSHOT_POINTER)
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    _prune_snapshots(snapshot_dir, keep)
+    return path
+
+
+def _prune_snapshots(snapshot_dir: str, keep: int):
+    """Remove all but the newest ``keep`` snapshot files."""
+    snapshots = sorted(
+        f
+        for f in os.listdir(snapshot_dir)
+        if f.startswith(SNAPSHOT_PREFIX) and f.endswith(".duckdb")
+    )
+    for name in snapshots[:-keep] if keep > 0 else []:
+        try:
+            os.remove(os.path.join(snapshot_dir, name))
+        except OSError:
+            # Still held open by a reader (Windows); retry on the next publish
+            pass
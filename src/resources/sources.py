@@ -0,0 +1,321 @@
+"""Multi-file bronze sources with compression, provenance and a load ledger.
+
+A bronze table is fed by every source file matching a glob pattern, e.g.
+``raw_orders*.csv*`` matches ``raw_orders.csv`` as well as daily drops such
+as ``raw_orders_2025-10-16.csv.gz``. ``.gz`` and ``.zst`` files are
+decompressed while they are parsed (zstd needs the ``zstandard`` package).
+
+``bronze.source_files`` records the fingerprint (size and mtime, or blob
+etag) of every file loaded into each table. Only new or changed files are
+read, in parallel, and each row keeps the file it came from in its
+provenance column. A changed file replaces the rows it loaded before.
+
+Ticket blobs may add fields or change their types: ``bronze.raw_tickets``
+is evolved in place before each blob is landed and every schema change is
+versioned in ``bronze.schema_registry`` (``src.resources.schema_registry``).
+
+List fields of ticket blobs (``tags``) are normalized to Arrow
+``list<string>`` columns, so they land as ``VARCHAR[]`` whatever the first
+rows of a blob look like (missing, empty, or a comma-separated string).
+
+Ticket blobs may be downloaded ahead of their load into a local cache of
+parsed Parquet files (``cache_blobs``), so downloads need no warehouse lock.
+
+With a sample rate below 1 only a deterministic sample of rows is landed,
+for fast development runs (``src.resources.sampling``).
+"""
+
+import contextvars
+import fnmatch
+import glob
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.resources.lake import (
+    append_bronze,
+    check_bronze_mode,
+    create_lake_views,
+    write_lake_file,
+)
+from src.resources.sampling import sample_rows
+from src.resources.schema_registry import EVOLVING_TABLES, evolve_bronze
+from src.telemetry import current_span, span
+
+CSV_SOURCES = {
+    "raw_customers": "raw_customers*.csv*",
+    "raw_orders": "raw_orders*.csv*",
+    "raw_items": "raw_items*.csv*",
+    "raw_products": "raw_products*.csv*",
+    "raw_stores": "raw_stores*.csv*",
+    "raw_supplies": "raw_supplies*.csv*",
+}
+TICKET_BLOB_PATTERN = "*.jsonl*"
+TICKET_LIST_COLUMNS = ("tags",)
+JSONL_CHUNK_LINES = 50_000
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def compression_for(name: str):
+    """pandas compression for a file name (None if uncompressed)."""
+    return COMPRESSIONS.get(os.path.splitext(name)[1])
+
+
+def list_csv_files(csv_dir: str, pattern: str) -> dict:
+    """``{file name: size:mtime fingerprint}`` of CSVs in ``csv_dir`` matching ``pattern``."""
+    files = {}
+    for path in sorted(glob.glob(os.path.join(csv_dir, pattern))):
+        stat = os.stat(path)
+        files[os.path.relpath(path, csv_dir)] = f"{stat.st_size}:{stat.st_mtime_ns}"
+    return files
+
+
+def read_csv_file(csv_dir: str, name: str) -> pd.DataFrame:
+    """Read one (optionally compressed) CSV source file."""
+    path = os.path.join(csv_dir, name)
+    return pd.read_csv(path, compression=compression_for(name))
+
+
+def list_blobs(container_client, pattern: str = TICKET_BLOB_PATTERN) -> dict:
+    """``{blob name: etag}`` of blobs matching ``pattern``."""
+    prefix = pattern.split("*", 1)[0].split("?", 1)[0].split("[", 1)[0]
+    return {
+        b.name: b.etag
+        for b in container_client.list_blobs(name_starts_with=prefix or None)
+        if fnmatch.fnmatch(b.name, pattern)
+    }
+
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only binary stream over an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+            current_span().add("bytes_downloaded", len(self._buffer))
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _string_list(value):
+    """A list field value as a list of strings (None stays None)."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith("["):
+            value = json.loads(value)
+        else:
+            return [tag.strip() for tag in value.split(",") if tag.strip()]
+    if value is None or (not hasattr(value, "__iter__") and pd.isna(value)):
+        return None
+    return [str(item) for item in value if item is not None]
+
+
+def _as_list_columns(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Cast ``columns`` of ``df`` (added if missing) to Arrow ``list<string>``."""
+    for column in columns:
+        values = df[column] if column in df else [None] * len(df)
+        df[column] = pd.Series(
+            [_string_list(value) for value in values],
+            index=df.index,
+            dtype=pd.ArrowDtype(pa.list_(pa.string())),
+        )
+    return df
+
+
+def read_jsonl_blob(container_client, name: str) -> pd.DataFrame:
+    """Stream, decompress and parse one JSONL blob without buffering its text whole.
+
+    Lines are parsed ``JSONL_CHUNK_LINES`` at a time, so only the parsed rows
+    and one chunk of text are held at once.
+    """
+    downloader = container_client.get_blob_client(name).download_blob()
+    stream = io.BufferedReader(_ChunkStream(downloader.chunks()))
+    with pd.read_json(
+        stream, lines=True, chunksize=JSONL_CHUNK_LINES, compression=compression_for(name)
+    ) as reader:
+        df = pd.concat(reader, ignore_index=True)
+    return _as_list_columns(df, TICKET_LIST_COLUMNS)
+
+
+
+def cached_blob_path(cache_dir: str, name: str, etag: str) -> str:
+    """Cache file holding the parsed rows of blob ``name`` at ``etag``."""
+    name_key, etag_key = (
+        hashlib.md5(text.encode("utf-8")).hexdigest()[:16] for text in (name, etag)
+    )
+    return os.path.join(cache_dir, name_key, f"{etag_key}.parquet")
+
+
+def cache_blobs(container_client, blobs: dict, cache_dir: str, workers: int = 4) -> dict:
+    """Download the ``blobs`` (``{name: etag}``) not in ``cache_dir`` yet.
+
+    Each blob is cached as Parquet under its etag, replacing its older
+    versions. Returns ``{blob name: row count}`` of the blobs downloaded.
+    """
+    missing = [
+        name
+        for name, etag in blobs.items()
+        if not os.path.exists(cached_blob_path(cache_dir, name, etag))
+    ]
+
+    def download(name):
+        path = cached_blob_path(cache_dir, name, blobs[name])
+        with span(f"download/{name}", "file", file=name):
+            df = read_jsonl_blob(container_client, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers see the previous version or the whole new file
+        df.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        for old in os.listdir(os.path.dirname(path)):
+            if old != os.path.basename(path):
+                os.remove(os.path.join(os.path.dirname(path), old))
+        return name, len(df)
+
+    contexts = [contextvars.copy_context() for _ in missing]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(pool.map(lambda ctx, name: ctx.run(download, name), contexts, missing))
+
+
+def read_cached_blob(container_client, name: str, etag: str, cache_dir: str) -> pd.DataFrame:
+    """Blob ``name`` from the cache, or streamed from storage if ``etag`` is not cached."""
+    path = cached_blob_path(cache_dir, name, etag)
+    if not os.path.exists(path):
+        return read_jsonl_blob(container_client, name)
+    # pandas metadata cannot restore Arrow list dtypes, so cast them again
+    df = pq.read_table(path).to_pandas(ignore_metadata=True)
+    return _as_list_columns(df, TICKET_LIST_COLUMNS)
+
+def _ensure_ledger(conn):
+    conn.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bronze.source_files (
+            table_name VARCHAR,
+            source_file VARCHAR,
+            fingerprint VARCHAR,
+            row_count BIGINT,
+            lake_path VARCHAR,
+            loaded_at TIMESTAMP
+        )
+        """
+    )
+
+
+def pending_files(conn, table: str, files: dict) -> list:
+    """Files of ``files`` not loaded into ``table`` yet, or changed since."""
+    _ensure_ledger(conn)
+    loaded = dict(
+        conn.execute(
+            "SELECT source_file, fingerprint FROM bronze.source_files WHERE table_name = ?",
+            [table],
+        ).fetchall()
+    )
+    return [name for name, fingerprint in files.items() if loaded.get(name) != fingerprint]
+
+
+@dataclass
+class IngestOptions:
+    """How ``ingest_files`` lands source files."""
+
+    mode: str = "table"  # bronze mode, see src.resources.lake
+    lake_dir: str = "data/lake"
+    workers: int = 4
+    sample: float = 1.0
+
+
+def ingest_files(
+    conn,
+    table: str,
+    files: dict,
+    reader,
+    provenance_column: str = "source_file",
+    options: IngestOptions = None,
+) -> dict:
+    """Load new or changed ``files`` into ``bronze.{table}``.
+
+    ``files`` maps file names to fingerprints and ``reader(name)`` returns a
+    file's rows as a DataFrame. Files are read by ``options.workers`` threads
+    and landed one by one as they arrive. Returns ``{file name: row count}``.
+    An ``options.sample`` rate below 1 keeps only that share of rows; see
+    ``src.resources.sampling``.
+    """
+    options = options or IngestOptions()
+    mode, lake_dir, sample = options.mode, options.lake_dir, options.sample
+    check_bronze_mode(mode)
+    pending = pending_files(conn, table, files)
+    if not pending:
+        return {}
+
+    first_load = not conn.execute(
+        "SELECT COUNT(*) FROM bronze.source_files WHERE table_name = ?", [table]
+    ).fetchone()[0]
+
+    def read(name):
+        with span(f"bronze.{table}/{name}", "file", file=name) as file_span:
+            df = reader(name)
+            file_span.add("rows_read", len(df))
+            if sample < 1:
+                df = sample_rows(df, table, sample)
+        df[provenance_column] = name
+        df["loaded_at"] = datetime.now()
+        return name, df
+
+    # Each read runs in a copy of this context, so its span nests in ours
+    contexts = [contextvars.copy_context() for _ in pending]
+    loaded = {}
+    with ThreadPoolExecutor(max_workers=max(1, options.workers)) as pool:
+        for name, df in pool.map(lambda ctx, name: ctx.run(read, name), contexts, pending):
+            if table in EVOLVING_TABLES:
+                # A first table-mode load creates the table from this file
+                df = evolve_bronze(conn, table, df, name, alter=mode == "table" and not first_load)
+            lake_path = None
+            if mode == "table":
+                append_bronze(conn, df, table, provenance_column, replace=first_load)
+                first_load = False
+            else:
+                lake_path = write_lake_file(conn, df, table, lake_dir)
+            conn.execute(
+                "DELETE FROM bronze.source_files WHERE table_name = ? AND source_file = ?",
+                [table, name],
+            )
+            conn.execute(
+                "INSERT INTO bronze.source_files VALUES (?, ?, ?, ?, ?, ?)",
+                [table, name, files[name], len(df), lake_path, datetime.now()],
+            )
+            loaded[name] = len(df)
+
+    if mode == "lake":
+        paths = [
+            path
+            for (path,) in conn.execute(
+                """
+                SELECT lake_path
+                FROM bronze.source_files
+                WHERE table_name = ? AND lake_path IS NOT NULL
+                ORDER BY source_file
+                """,
+                [table],
+            ).fetchall()
+        ]
+        create_lake_views(conn, table, paths, lake_dir)
+    return loaded
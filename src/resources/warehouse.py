@@ -1,18 +1,74 @@
 """DuckDB warehouse resource and IO manager for Dagster."""
 
+import time
+
 import duckdb
 import pandas as pd
 from dagster import ConfigurableResource
 
+from src.resources.lake import write_bronze
+from src.resources.sources import IngestOptions, ingest_files
+from src.resources.snapshots import latest_snapshot_path
+
+# DuckDB allows one read-write process per database file, so every asset
+# that opens the warehouse is a writer. "elt/pool" is limited to one step at
+# a time within a run by the jobs' executor; "dagster/concurrency_key" does
+# the same across runs on instance storage with global op concurrency
+# (Postgres, after `dagster instance concurrency set duckdb_writer 1`).
+WRITER_POOL = "duckdb_writer"
+WRITER_OP_TAGS = {"elt/pool": WRITER_POOL, "dagster/concurrency_key": WRITER_POOL}
+
+
+def _is_lock_conflict(error: duckdb.IOException) -> bool:
+    return "lock" in str(error).lower()
+
+
+def connect_waiting_for_lock(database_path: str, timeout_seconds: float):
+    """Connect read-write, waiting up to ``timeout_seconds`` for another writer."""
+    deadline = time.monotonic() + timeout_seconds
+    delay = 0.5
+    while True:
+        try:
+            return duckdb.connect(database_path)
+        except duckdb.IOException as error:
+            if not _is_lock_conflict(error) or time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
 
 class DuckDBResource(ConfigurableResource):
-    """DuckDB connection resource."""
+    """DuckDB connection resource.
+
+    With ``read_only`` set, connections open the latest published snapshot
+    in ``snapshot_dir`` instead of the live warehouse file. ``bronze_mode``
+    selects how bronze data is landed (see ``src.resources.lake``) and
+    ``ingest_workers`` how many source files are read in parallel. A step
+    finding the warehouse locked by another run's writer waits up to
+    ``lock_timeout_seconds`` for it instead of failing. A ``sample_rate``
+    below 1 lands only a deterministic sample of the sources (see
+    ``src.resources.sampling``); point ``database_path`` at a sample warehouse.
+    Maintenance removes bronze lake loads older than ``bronze_retention_days``
+    (see ``src.resources.maintenance``).
+    """
 
     database_path: str
+    read_only: bool = False
+    snapshot_dir: str = "data/snapshots"
+    bronze_mode: str = "table"
+    lake_dir: str = "data/lake"
+    ingest_workers: int = 4
+    lock_timeout_seconds: float = 600.0
+    sample_rate: float = 1.0
+    bronze_retention_days: int = 30
 
     def get_connection(self):
         """Get a DuckDB connection."""
-        return duckdb.connect(self.database_path)
+        if self.read_only:
+            return duckdb.connect(
+                latest_snapshot_path(self.snapshot_dir), read_only=True
+            )
+        return connect_waiting_for_lock(self.database_path, self.lock_timeout_seconds)
 
     def execute_query(self, query: str):
         """Execute a SQL query."""
@@ -46,3 +102,30 @@ class DuckDBResource(ConfigurableResource):
             )
         finally:
             conn.close()
+
+    def write_bronze(self, dataframe: pd.DataFrame, table: str):
+        """Land a DataFrame as bronze.{table} as a table or Parquet lake view."""
+        conn = self.get_connection()
+        try:
+            write_bronze(conn, dataframe, table, self.bronze_mode, self.lake_dir)
+        finally:
+            conn.close()
+
+    def ingest_files(
+        self, table: str, files: dict, reader, provenance_column: str = "source_file"
+    ) -> dict:
+        """Load new or changed source files into bronze.{table} (see ``src.resources.sources``)."""
+        conn = self.get_connection()
+        try:
+            return ingest_files(
+                conn,
+                table,
+                files,
+                reader,
+                provenance_column,
+                IngestOptions(
+                    self.bronze_mode, self.lake_dir, self.ingest_workers, self.sample_rate
+                ),
+            )
+        finally:
+            conn.close()
@@ -1,7 +1,7 @@
 """Dagster schedules for ELT pipeline."""
 
 from dagster import ScheduleDefinition
-from src.jobs.elt_jobs import full_elt_job
+from src.jobs.elt_jobs import full_elt_job, maintenance_job
 
 
 # Daily schedule at 06:00 Europe/Berlin
@@ -12,3 +12,12 @@ daily_elt_schedule = ScheduleDefinition(
     execution_timezone="Europe/Berlin",
     description="Run full ELT pipeline daily at 06:00 Europe/Berlin",
 )
+
+# Weekly maintenance on Sundays at 04:00 Europe/Berlin, clear of the daily run
+weekly_maintenance_schedule = ScheduleDefinition(
+    name="weekly_maintenance_schedule",
+    job=maintenance_job,
+    cron_schedule="0 4 * * 0",
+    execution_timezone="Europe/Berlin",
+    description="Apply bronze retention and compact the warehouse weekly",
+)
@@ -0,0 +1,233 @@
+"""Graph selection and run state for the standalone pipeline runner.
+
+Selectors follow the familiar dbt syntax over the bronze/silver/gold DAG:
+
+* ``model``        just the model
+* ``model+``       the model and everything downstream of it
+* ``+model``       the model and everything upstream of it
+* ``+model+``      both
+* ``layer:silver`` every model in a layer
+
+The run manifest records a fingerprint (SQL file hash or input file / blob
+fingerprint) for every model that completed, so ``--state modified`` can run
+only models whose fingerprint changed, plus their descendants. It also
+records the last run: the models it planned, those it completed so far and
+whether it succeeded, so ``--resume`` can pick up a failed run where it
+stopped.
+"""
+
+import json
+import os
+from datetime import datetime
+
+# Execution order within each layer is the list order
+LAYERS = {
+    "bronze": [
+        "raw_customers",
+        "raw_orders",
+        "raw_items",
+        "raw_products",
+        "raw_stores",
+        "raw_supplies",
+        "raw_tickets",
+    ],
+    "silver": [
+        "customers",
+        "orders",
+        "items",
+        "products",
+        "stores",
+        "supplies",
+        "tickets",
+    ],
+    "gold": [
+        "fact_orders",
+        "order_sketches",
+        "ticket_attribution",
+        "tickets_per_order",
+        "metrics",
+        "distribution_metrics",
+        "ticket_search",
+        "customer_summary",
+        "warehouse_snapshot",
+    ],
+}
+
+DEPENDENCIES = {
+    "customers": ["raw_customers"],
+    "orders": ["raw_orders"],
+    "items": ["raw_items"],
+    "products": ["raw_products"],
+    "stores": ["raw_stores"],
+    "supplies": ["raw_supplies"],
+    "tickets": ["raw_tickets"],
+    "fact_orders": ["orders", "items", "products"],
+    "order_sketches": ["fact_orders"],
+    "ticket_attribution": ["tickets", "orders"],
+    "tickets_per_order": ["ticket_attribution"],
+    "metrics": ["fact_orders", "tickets_per_order", "ticket_attribution"],
+    "distribution_metrics": ["order_sketches"],
+    "ticket_search": ["tickets", "customers"],
+    "customer_summary": ["orders", "tickets", "customers"],
+    "warehouse_snapshot": [
+        "fact_orders",
+        "tickets_per_order",
+        "metrics",
+        "distribution_metrics",
+        "ticket_search",
+        "customer_summary",
+    ],
+}
+
+ALL_MODELS = [model for models in LAYERS.values() for model in models]
+
+
+def _walk(model: str, edges: dict) -> set:
+    """All models reachable from ``model`` along ``edges``."""
+    seen, stack = set(), [model]
+    while stack:
+        for nxt in edges.get(stack.pop(), []):
+            if nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    return seen
+
+
+def ancestors(model: str) -> set:
+    """Models upstream of ``model``."""
+    return _walk(model, DEPENDENCIES)
+
+
+def descendants(model: str) -> set:
+    """Models downstream of ``model``."""
+    children = {}
+    for child, parents in DEPENDENCIES.items():
+        for parent in parents:
+            children.setdefault(parent, []).append(child)
+    return _walk(model, children)
+
+
+def resolve(selector: str) -> set:
+    """Models matched by a single selector."""
+    if selector.startswith("layer:"):
+        layer = selector[len("layer:"):]
+        if layer not in LAYERS:
+            raise ValueError(f"Unknown layer {layer!r}; expected one of {list(LAYERS)}")
+        return set(LAYERS[layer])
+
+    upstream = selector.startswith("+")
+    downstream = selector.endswith("+")
+    model = selector.strip("+")
+    if model not in ALL_MODELS:
+        raise ValueError(f"Unknown model {model!r} in selector {selector!r}")
+
+    models = {model}
+    if upstream:
+        models |= ancestors(model)
+    if downstream:
+        models |= descendants(model)
+    return models
+
+
+def select(selectors=None, excludes=None) -> set:
+    """Models matched by any selector (all if none) minus any exclude."""
+    models = set(ALL_MODELS)
+    if selectors:
+        models = set().union(*(resolve(s) for s in selectors))
+    for selector in excludes or []:
+        models -= resolve(selector)
+    return models
+
+
+def modified(fingerprints: dict, manifest: dict) -> set:
+    """Models whose fingerprint differs from the manifest, plus descendants."""
+    recorded = manifest.get("models", {})
+    changed = {
+        model
+        for model, fingerprint in fingerprints.items()
+        if recorded.get(model, {}).get("fingerprint") != fingerprint
+    }
+    return changed.union(*(descendants(model) for model in changed))
+
+
+def ordered(models: set, layer: str) -> list:
+    """The selected models of ``layer`` in execution order."""
+    return [model for model in LAYERS[layer] if model in models]
+
+
+def load_manifest(path: str) -> dict:
+    """Read the run manifest, or an empty one if there is none yet."""
+    if not os.path.exists(path):
+        return {"models": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(path: str, manifest: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def record_completed(path: str, manifest: dict, models, fingerprints: dict):
+    """Record ``models`` as completed with their fingerprints and save."""
+    now = _now()
+    for model in models:
+        manifest["models"][model] = {
+            "fingerprint": fingerprints[model],
+            "completed_at": now,
+        }
+        if "run" in manifest and model not in manifest["run"]["completed"]:
+            manifest["run"]["completed"].append(model)
+    _save_manifest(path, manifest)
+
+
+def start_run(path: str, manifest: dict, models, completed=()):
+    """Record a run of ``models`` (``completed`` already done) as running and save."""
+    manifest["run"] = {
+        "status": "running",
+        "started_at": _now(),
+        "models": [model for model in ALL_MODELS if model in set(models)],
+        "completed": [model for model in ALL_MODELS if model in set(completed)],
+    }
+    _save_manifest(path, manifest)
+
+
+def finish_run(path: str, manifest: dict, status: str):
+    """Record the current run as ``succeeded`` or ``failed`` and save."""
+    manifest["run"]["status"] = status
+    manifest["run"]["finished_at"] = _now()
+    _save_manifest(path, manifest)
+
+
+def interrupted_run(manifest: dict):
+    """The last run if it failed or never finished, else None."""
+    run = manifest.get("run")
+    if run and run["status"] != "succeeded":
+        return run
+    return None
+
+
+def resumable(manifest: dict, fingerprints: dict) -> set:
+    """Models of the interrupted run that need not run again.
+
+    A model is skipped if it completed in that run, its fingerprint is
+    unchanged, and none of its upstream models in the run will run again.
+    """
+    run = interrupted_run(manifest) or {"models": [], "completed": []}
+    recorded = manifest.get("models", {})
+    planned, completed = set(run["models"]), set(run["completed"])
+    done = set()
+    for model in ALL_MODELS:
+        if (
+            model in completed
+            and recorded.get(model, {}).get("fingerprint") == fingerprints.get(model)
+            and all(p in done or p not in planned for p in DEPENDENCIES.get(model, []))
+        ):
+            done.add(model)
+    return done
@@ -0,0 +1 @@
+"""Local query service for gold marts."""
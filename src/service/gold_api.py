@@ -0,0 +1,481 @@
+"""HTTP query service for gold marts over pooled read-only connections.
+
+Run with ``python -m src.service.gold_api``. Queries are served from the
+latest published snapshot (see ``src.resources.snapshots``), so the service
+never contends with a running pipeline. Endpoints:
+
+    GET /query/<name>?param=value&format=json|arrow
+    GET /queries     available queries and their parameters
+    GET /stats       per-query latency statistics
+    GET /health
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import duckdb
+from dotenv import load_dotenv
+
+from src.resources.snapshots import latest_snapshot_path
+
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+
+# Named, parameterized gold queries. Every parameter is optional; a missing
+# value is bound as NULL and disables its filter.
+QUERIES = {
+    "metrics": {
+        "sql": "SELECT * FROM gold.metrics",
+        "params": {},
+    },
+    "fact_orders": {
+        "sql": """
+            SELECT *
+            FROM gold.fact_orders
+            WHERE ($store_id IS NULL OR store_id = $store_id)
+              AND ($customer_id IS NULL OR customer_id = $customer_id)
+              AND ($date_from IS NULL OR order_date >= CAST($date_from AS DATE))
+              AND ($date_to IS NULL OR order_date <= CAST($date_to AS DATE))
+            ORDER BY order_ts
+            LIMIT $limit
+        """,
+        "params": {
+            "store_id": None,
+            "customer_id": None,
+            "date_from": None,
+            "date_to": None,
+            "limit": 100000,
+        },
+    },
+    # Unordered, so a customer_id lookup stays a primary key index scan
+    "customer_summary": {
+        "sql": """
+            SELECT *
+            FROM gold.customer_summary
+            WHERE ($customer_id IS NULL OR customer_id = $customer_id)
+            LIMIT $limit
+        """,
+        "params": {"customer_id": None, "limit": 100000},
+    },
+    "tickets_per_order": {
+        "sql": """
+            SELECT *
+            FROM gold.tickets_per_order
+            WHERE ($order_id IS NULL OR order_id = $order_id)
+            ORDER BY order_id
+            LIMIT $limit
+        """,
+        "params": {"order_id": None, "limit": 100000},
+    },
+    "daily_revenue": {
+        "sql": """
+            SELECT
+                order_date,
+                store_id,
+                COUNT(*) AS order_count,
+                SUM(order_total) AS revenue
+            FROM gold.fact_orders
+            WHERE ($store_id IS NULL OR store_id = $store_id)
+              AND ($date_from IS NULL OR order_date >= CAST($date_from AS DATE))
+              AND ($date_to IS NULL OR order_date <= CAST($date_to AS DATE))
+            GROUP BY order_date, store_id
+            ORDER BY order_date, store_id
+        """,
+        "params": {"store_id": None, "date_from": None, "date_to": None},
+    },
+    # KPI trend from the daily series; without store_id, stores are summed
+    "metrics_daily": {
+        "sql": """
+            SELECT
+                order_date,
+                CAST($store_id AS VARCHAR) AS store_id,
+                SUM(order_count) AS order_count,
+                SUM(order_total_sum) AS order_total_sum,
+                CAST(SUM(order_total_sum) AS DOUBLE) / NULLIF(SUM(order_count), 0)
+                    AS average_order_value,
+                SUM(ticketed_orders) AS ticketed_orders,
+                SUM(ticket_count) AS ticket_count,
+                CAST(SUM(ticket_count) AS DOUBLE) / NULLIF(SUM(ticketed_orders), 0)
+                    AS avg_tickets_per_order
+            FROM gold.metrics_daily
+            WHERE order_date IS NOT NULL
+              AND ($store_id IS NULL OR store_id = $store_id)
+              AND ($date_from IS NULL OR order_date >= CAST($date_from AS DATE))
+              AND ($date_to IS NULL OR order_date <= CAST($date_to AS DATE))
+            GROUP BY order_date
+            ORDER BY order_date
+        """,
+        "params": {"store_id": None, "date_from": None, "date_to": None},
+    },
+    # BM25 (k1 = 1.2, b = 0.75) over gold.ticket_search_terms; the query is
+    # tokenized like sql/gold/ticket_search.sql tokenizes tickets.
+    "search_tickets": {
+        "sql": """
+            WITH query_terms AS (
+                SELECT DISTINCT term
+                FROM (
+                    SELECT UNNEST(regexp_split_to_array(
+                        lower(strip_accents($q)), '[^a-z0-9]+'
+                    )) AS term
+                )
+                WHERE term <> ''
+            ),
+            matches AS (
+                SELECT t.term, t.ticket_id, t.tf, t.doc_len
+                FROM gold.ticket_search_terms t
+                WHERE t.term IN (SELECT term FROM query_terms)
+            ),
+            corpus AS (
+                SELECT COUNT(*) AS n_docs, AVG(doc_len) AS avg_len
+                FROM gold.ticket_search_docs
+            ),
+            term_docs AS (
+                SELECT term, COUNT(*) AS df
+                FROM matches
+                GROUP BY term
+            ),
+            scores AS (
+                SELECT
+                    m.ticket_id,
+                    SUM(
+                        ln(1 + (c.n_docs - td.df + 0.5) / (td.df + 0.5))
+                        * m.tf * 2.2
+                        / (m.tf + 1.2 * (0.25 + 0.75 * m.doc_len / c.avg_len))
+                    ) AS score
+                FROM matches m
+                JOIN term_docs td ON td.term = m.term
+                CROSS JOIN corpus c
+                GROUP BY m.ticket_id
+                ORDER BY score DESC
+                LIMIT $limit
+            )
+            SELECT
+                s.ticket_id,
+                s.score,
+                d.subject,
+                d.status,
+                d.ticket_ts,
+                d.customer_id,
+                d.customer_name,
+                d.order_id,
+                f.store_id,
+                f.order_ts,
+                f.order_total
+            FROM scores s
+            JOIN gold.ticket_search_docs d ON d.ticket_id = s.ticket_id
+            LEFT JOIN gold.fact_orders f ON f.order_id = d.order_id
+            ORDER BY s.score DESC, s.ticket_id
+        """,
+        "params": {"q": "", "limit": 20},
+    },
+}
+
+# Tables scanned once per new snapshot so the first requests hit warm buffers
+WARM_TABLES = [
+    "gold.metrics",
+    "gold.metrics_daily",
+    "gold.fact_orders",
+    "gold.tickets_per_order",
+    "gold.ticket_attribution",
+    "gold.customer_summary",
+    "gold.ticket_search_terms",
+    "gold.ticket_search_docs",
+]
+
+
+class ConnectionPool:
+    """Pool of read-only cursors on the current snapshot.
+
+    Cursors share one database instance (and its buffer cache). When the
+    snapshot pointer moves, the pool reopens on the new file; cursors from
+    the old snapshot are closed as they are returned, and requests waiting
+    for a cursor are served from the new pool.
+    """
+
+    def __init__(self, snapshot_dir: str, size: int = 4):
+        self.snapshot_dir = snapshot_dir
+        self.size = size
+        self._available = threading.Condition()
+        self._path = None
+        self._database = None
+        self._idle = []
+
+    def _open(self, path: str):
+        """Open ``path`` read-only, warm its cache and fill the pool."""
+        database = duckdb.connect(path, read_only=True)
+        for table in WARM_TABLES:
+            try:
+                # Reads every column's blocks, but returns a single row
+                database.execute(f"SELECT COUNT(COLUMNS(*)) FROM {table}").fetchall()
+            except duckdb.CatalogException:
+                pass
+        idle = [database.cursor() for _ in range(self.size)]
+        # Idle cursors of the old snapshot can go now; borrowed ones are
+        # closed on release, which lets the old file be pruned.
+        for cursor in self._idle:
+            cursor.close()
+        self._path, self._database, self._idle = path, database, idle
+        self._available.notify_all()
+
+    def acquire(self):
+        """Borrow a cursor, reopening the pool if a newer snapshot exists."""
+        path = latest_snapshot_path(self.snapshot_dir)
+        with self._available:
+            if path != self._path:
+                self._open(path)
+            # Waiting releases the lock; the pool may reopen meanwhile
+            while not self._idle:
+                self._available.wait()
+            return self._path, self._idle.pop()
+
+    def release(self, path: str, cursor):
+        """Return a cursor to the pool it came from."""
+        with self._available:
+            if path == self._path:
+                self._idle.append(cursor)
+                self._available.notify()
+                return
+        cursor.close()
+
+
+class LatencyStats:
+    """Rolling per-query latency statistics."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._window = window
+
+    def record(self, name: str, seconds: float):
+        """Record one request's latency."""
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self._window)).append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self) -> dict:
+        """Return count, mean and percentiles (ms) for each query."""
+        with self._lock:
+            samples = {name: sorted(s) for name, s in self._samples.items()}
+            counts = dict(self._counts)
+        result = {}
+        for name, values in samples.items():
+            result[name] = {
+                "count": counts[name],
+                "mean_ms": round(1000 * sum(values) / len(values), 3),
+                "p50_ms": round(1000 * values[len(values) // 2], 3),
+                "p95_ms": round(
+                    1000 * values[min(len(values) - 1, int(len(values) * 0.95))], 3
+                ),
+                "max_ms": round(1000 * values[-1], 3),
+            }
+        return result
+
+
+def _json_default(value):
+    """Serialize DuckDB values the json module does not know."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class _ChunkedWriter:
+    """File-like wrapper writing HTTP/1.1 chunked transfer encoding."""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self.closed = False
+
+    def write(self, data) -> int:
+        """Write one chunk."""
+        data = bytes(data)
+        if data:
+            self._wfile.write(f"{len(data):X}\r\n".encode("ascii"))
+            self._wfile.write(data)
+            self._wfile.write(b"\r\n")
+        return len(data)
+
+    def flush(self):
+        """Flush the underlying stream."""
+        self._wfile.flush()
+
+    def close(self):
+        """Write the terminating chunk."""
+        if not self.closed:
+            self._wfile.write(b"0\r\n\r\n")
+            self.closed = True
+
+
+class GoldQueryHandler(BaseHTTPRequestHandler):
+    """Request handler; the server carries the pool, stats and batch size."""
+
+    protocol_version = "HTTP/1.1"
+    # Whether the current response's 200 headers went out
+    _streaming = False
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Route GET requests."""
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif url.path == "/queries":
+            self._send_json(
+                200, {name: q["params"] for name, q in QUERIES.items()}
+            )
+        elif url.path == "/stats":
+            self._send_json(200, self.server.stats.summary())
+        elif url.path.startswith("/query/"):
+            self._run_query(url.path[len("/query/"):], parse_qs(url.query))
+        else:
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+
+    def _run_query(self, name: str, query_args: dict):
+        """Execute a named query and stream the result."""
+        self._streaming = False
+        if name not in QUERIES:
+            self._send_json(404, {"error": f"Unknown query {name}"})
+            return
+
+        spec = QUERIES[name]
+        params = dict(spec["params"])
+        for key, values in query_args.items():
+            if key == "format":
+                continue
+            if key not in params:
+                self._send_json(400, {"error": f"Unknown parameter {key}"})
+                return
+            try:
+                params[key] = int(values[-1]) if key == "limit" else values[-1]
+            except ValueError:
+                self._send_json(400, {"error": f"Invalid value for {key}"})
+                return
+
+        wants_arrow = (
+            query_args.get("format", [""])[-1] == "arrow"
+            or ARROW_STREAM_TYPE in self.headers.get("Accept", "")
+        )
+
+        start = time.perf_counter()
+        try:
+            path, cursor = self.server.pool.acquire()
+        except FileNotFoundError as error:
+            self._send_json(503, {"error": str(error)})
+            return
+        try:
+            result = cursor.execute(spec["sql"], params)
+            if wants_arrow:
+                self._stream_arrow(result)
+            else:
+                self._stream_json(result)
+        except (duckdb.Error, OSError) as error:
+            # The Arrow reader raises DuckDB errors as OSError
+            if self._streaming:
+                # Part of the body is out: abort the chunked stream without
+                # its terminating chunk, so the client sees a failed response
+                self.close_connection = True
+            else:
+                self._send_json(400, {"error": str(error)})
+        finally:
+            self.server.pool.release(path, cursor)
+            self.server.stats.record(name, time.perf_counter() - start)
+
+    def _start_chunked(self, content_type: str) -> _ChunkedWriter:
+        """Send headers for a chunked response."""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._streaming = True
+        return _ChunkedWriter(self.wfile)
+
+    def _stream_json(self, result):
+        """Stream rows as a JSON document, one batch per chunk."""
+        columns = [col[0] for col in result.description]
+        out = self._start_chunked("application/json")
+        out.write(json.dumps({"columns": columns})[:-1].encode() + b', "rows": [')
+        first = True
+        while True:
+            rows = result.fetchmany(self.server.batch_size)
+            if not rows:
+                break
+            body = ",".join(json.dumps(list(r), default=_json_default) for r in rows)
+            out.write(body.encode() if first else b"," + body.encode())
+            first = False
+        out.write(b"]}")
+        out.close()
+
+    def _stream_arrow(self, result):
+        """Stream record batches in Arrow IPC stream format."""
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+        # to_arrow_reader supersedes fetch_record_batch in newer DuckDB releases
+        to_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+        reader = to_reader(self.server.batch_size)
+        out = self._start_chunked(ARROW_STREAM_TYPE)
+        writer = pa.ipc.new_stream(out, reader.schema)
+        for batch in reader:
+            writer.write_batch(batch)
+        # Only a complete stream gets its end-of-stream marker
+        writer.close()
+        out.close()
+
+    def _send_json(self, status: int, payload):
+        """Send a small, non-streamed JSON response."""
+        body = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep request logging quiet; latency is exposed on /stats."""
+
+
+def create_server(
+    host: str, port: int, snapshot_dir: str, pool_size: int = 4, batch_size: int = 10000
+) -> ThreadingHTTPServer:
+    """Build a server bound to ``host:port`` serving the given snapshots."""
+    server = ThreadingHTTPServer((host, port), GoldQueryHandler)
+    server.pool = ConnectionPool(snapshot_dir, pool_size)
+    server.stats = LatencyStats()
+    server.batch_size = batch_size
+    return server
+
+
+def main():
+    """Run the gold query service."""
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument(
+        "--snapshot-dir", default=os.getenv("SNAPSHOT_DIR", "data/snapshots")
+    )
+    args = parser.parse_args()
+
+    server = create_server(
+        args.host, args.port, args.snapshot_dir, args.pool_size, args.batch_size
+    )
+    print(f"🚀 Serving gold marts on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Load test for the gold query service.
+
+Start the service (``python -m src.service.gold_api``) and run, e.g.:
+
+    python -m src.service.load_test --requests 2000 --concurrency 16
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+DEFAULT_PATHS = [
+    "/query/metrics",
+    "/query/daily_revenue",
+    "/query/fact_orders?limit=1000",
+    "/query/fact_orders?limit=1000&format=arrow",
+    "/query/tickets_per_order?limit=1000",
+]
+
+
+def _fetch(url: str) -> tuple[float, int]:
+    """Fetch ``url`` fully and return (seconds, bytes)."""
+    start = time.perf_counter()
+    with urlopen(Request(url), timeout=60) as response:
+        size = len(response.read())
+    return time.perf_counter() - start, size
+
+
+def run(base_url: str, paths: list[str], requests: int, concurrency: int) -> dict:
+    """Issue ``requests`` requests round-robin over ``paths``."""
+    urls = [base_url + paths[i % len(paths)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(_fetch, urls))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds for seconds, _ in results)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 1),
+        "mb_received": round(sum(size for _, size in results) / 1e6, 2),
+        "p50_ms": round(1000 * latencies[len(latencies) // 2], 3),
+        "p95_ms": round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }
+
+
+def main():
+    """Run the load test and print client and server statistics."""
+    parser = argparse.ArgumentParser(description="Load test the gold query service")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--path", action="append", help="Request path (repeatable)")
+    args = parser.parse_args()
+
+    summary = run(args.url, args.path or DEFAULT_PATHS, args.requests, args.concurrency)
+    print("📈 Client")
+    print(json.dumps(summary, indent=2))
+    with urlopen(f"{args.url}/stats", timeout=10) as response:
+        print("📊 Server /stats")
+        print(json.dumps(json.loads(response.read()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Run telemetry: OpenTelemetry-style spans and Prometheus textfile metrics.
+
+Spans nest as run (``run_pipeline.py``) or asset (Dagster) > layer > model >
+SQL statement, with bronze source files read in worker threads under their
+model. Every span records its duration and may carry counters, which are
+summed into its parents (``rows_affected``, ``rows_read``,
+``bytes_downloaded``), and peaks, which are maxed into them
+(``duckdb_memory_bytes`` sampled after each statement, ``max_rss_bytes``).
+
+When the root span ends, its trace goes to every configured exporter:
+
+* ``TELEMETRY_OTLP_FILE`` - appends one OTLP/JSON ``ExportTraceServiceRequest``
+  per line, the format of the OpenTelemetry collector's file exporter;
+* ``TELEMETRY_PROMETHEUS_DIR`` - rewrites ``elt_<kind>_<name>.prom`` gauges
+  for the node exporter's textfile collector;
+* anything passed to ``register_exporter`` (e.g. ``InMemoryExporter``).
+
+With no exporter configured, ``span`` returns a shared no-op span and
+``traced`` returns the function unchanged.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SERVICE_NAME = "restaurant-elt"
+# Span kinds written to Prometheus; statements and source files are left to
+# the traces, their names are too many (or unbounded) for metric labels
+PROMETHEUS_SPAN_KINDS = ("run", "asset", "layer", "model")
+
+_current = contextvars.ContextVar("telemetry_span", default=None)
+_registered = []
+
+
+class Span:
+    """One timed unit of work in a trace."""
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent, attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.attributes = dict(attributes)
+        self.counters = Counter()
+        self.peaks = {}
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.finished = []
+        self._lock = threading.Lock()
+
+    @property
+    def seconds(self) -> float:
+        """Duration of the span so far, or in total once it has ended."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, key: str, value):
+        """Set an attribute of this span only."""
+        self.attributes[key] = value
+
+    def add(self, key: str, amount):
+        """Add to a counter summed into every parent span."""
+        with self._lock:
+            self.counters[key] += amount
+
+    def peak(self, key: str, value):
+        """Record a value whose maximum is kept here and in every parent span."""
+        with self._lock:
+            self.peaks[key] = max(self.peaks.get(key, value), value)
+
+    def _finish(self):
+        self.end_ns = time.time_ns()
+        if resource is not None:
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak("max_rss_bytes", max_rss if sys.platform == "darwin" else max_rss * 1024)
+        if self.parent is not None:
+            self.parent._absorb(self)  # pylint: disable=protected-access
+
+    def _absorb(self, child):
+        with self._lock:
+            self.counters.update(child.counters)
+            for key, value in child.peaks.items():
+                self.peaks[key] = max(self.peaks.get(key, value), value)
+            self.finished.extend(child.finished)
+            self.finished.append(child)
+            child.finished = []
+
+    def trace(self) -> list:
+        """This span followed by every finished span under it."""
+        return [self, *self.finished]
+
+
+class _NoopSpan:
+    """Stands in for a span while telemetry is disabled."""
+
+    def set(self, key, value):
+        """Ignore the attribute."""
+
+    def add(self, key, amount):
+        """Ignore the counter."""
+
+    def peak(self, key, value):
+        """Ignore the peak."""
+
+
+_NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = contextlib.nullcontext(_NOOP_SPAN)
+
+
+class InMemoryExporter:
+    """Keeps exported spans in ``spans``; for tests and notebooks."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans: list):
+        """Keep the trace's spans."""
+        self.spans.extend(spans)
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _otlp_span(span_: Span) -> dict:
+    values = {
+        "elt.kind": span_.kind,
+        **span_.attributes,
+        **span_.counters,
+        **{f"{key}.peak": value for key, value in span_.peaks.items()},
+    }
+    otlp = {
+        "traceId": span_.trace_id,
+        "spanId": span_.span_id,
+        "name": span_.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span_.start_ns),
+        "endTimeUnixNano": str(span_.end_ns),
+        "attributes": [_attribute(key, value) for key, value in values.items()],
+        # STATUS_CODE_OK / STATUS_CODE_ERROR
+        "status": {"code": 2, "message": span_.error} if span_.error else {"code": 1},
+    }
+    if span_.parent is not None:
+        otlp["parentSpanId"] = span_.parent.span_id
+    return otlp
+
+
+class OTLPFileExporter:
+    """Appends each trace to ``path`` as one line of OTLP/JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list):
+        """Append the trace as one OTLP/JSON line."""
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [_otlp_span(span_) for span_ in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request, separators=(",", ":")) + "\n")
+
+
+def _metric_name(key: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", key)
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusTextfileExporter:
+    """Writes the last trace of each root span as gauges for node_exporter."""
+
+    def __init__(self, directory: str, kinds=PROMETHEUS_SPAN_KINDS):
+        self.directory = directory
+        self.kinds = kinds
+
+    def export(self, spans: list):
+        """Rewrite the root span's textfile with the trace's gauges."""
+        root = spans[0]
+        samples = {}
+        for span_ in spans:
+            if span_.kind not in self.kinds:
+                continue
+            labels = (
+                f'root="{_label_value(root.name)}",kind="{span_.kind}",'
+                f'name="{_label_value(span_.name)}"'
+            )
+            values = {
+                "duration_seconds": span_.seconds,
+                "success": 0 if span_.error else 1,
+                "end_timestamp_seconds": span_.end_ns / 1e9,
+                **{
+                    key: value
+                    for key, value in span_.attributes.items()
+                    if isinstance(value, (int, float)) and not isinstance(value, bool)
+                },
+                **span_.counters,
+                **span_.peaks,
+            }
+            for key, value in values.items():
+                samples.setdefault(f"elt_span_{_metric_name(key)}", []).append(
+                    f"{{{labels}}} {value}"
+                )
+
+        lines = []
+        for metric, values in sorted(samples.items()):
+            lines.append(f"# HELP {metric} Pipeline span {metric[9:]} in the last run.")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(f"{metric}{value}" for value in values)
+
+        # node_exporter may read at any time: write aside, then rename
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory, f"elt_{root.kind}_{_metric_name(root.name)}.prom"
+        )
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(f"{path}.tmp", path)
+
+
+def register_exporter(exporter):
+    """Send every finished trace to ``exporter`` (anything with ``export(spans)``)."""
+    _registered.append(exporter)
+
+
+def clear_exporters():
+    """Forget exporters added with ``register_exporter``."""
+    _registered.clear()
+
+
+def _exporters() -> list:
+    exporters = list(_registered)
+    if os.getenv("TELEMETRY_OTLP_FILE"):
+        exporters.append(OTLPFileExporter(os.getenv("TELEMETRY_OTLP_FILE")))
+    if os.getenv("TELEMETRY_PROMETHEUS_DIR"):
+        exporters.append(PrometheusTextfileExporter(os.getenv("TELEMETRY_PROMETHEUS_DIR")))
+    return exporters
+
+
+def telemetry_enabled() -> bool:
+    """Whether spans are being recorded."""
+    return bool(
+        _registered
+        or os.getenv("TELEMETRY_OTLP_FILE")
+        or os.getenv("TELEMETRY_PROMETHEUS_DIR")
+    )
+
+
+@contextlib.contextmanager
+def _span(name: str, kind: str, trace_id: str, attributes: dict):
+    parent = _current.get()
+    if parent is not None:
+        trace_id = parent.trace_id
+    span_ = Span(name, kind, trace_id or os.urandom(16).hex(), parent, attributes)
+    token = _current.set(span_)
+    try:
+        yield span_
+    except BaseException as error:
+        span_.error = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        _current.reset(token)
+        span_._finish()  # pylint: disable=protected-access
+        if parent is None:
+            for exporter in _exporters():
+                exporter.export(span_.trace())
+
+
+def span(name: str, kind: str = "internal", trace_id: str = None, **attributes):
+    """Context manager timing the enclosed block as a span named ``name``.
+
+    The span is a child of the current span; a root span starts a new trace
+    (``trace_id``, 32 hex digits, defaults to a random one) and exports it
+    when it ends.
+    """
+    if not telemetry_enabled():
+        return _NOOP_CONTEXT
+    return _span(name, kind, trace_id, attributes)
+
+
+def current_span():
+    """The innermost open span (a no-op span if there is none)."""
+    return _current.get() or _NOOP_SPAN
+
+
+def sample_duckdb_memory(conn):
+    """Record DuckDB's current memory use as a peak of the current span."""
+    span_ = _current.get()
+    if span_ is not None:
+        used = conn.execute(
+            "SELECT COALESCE(SUM(memory_usage_bytes), 0) FROM duckdb_memory()"
+        ).fetchone()[0]
+        span_.peak("duckdb_memory_bytes", int(used))
+
+
+def traced(fn):
+    """Trace a Dagster asset function as a root span in its run's trace."""
+    if not telemetry_enabled():
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(context, *args, **kwargs):
+        trace_id = context.run_id.replace("-", "")
+        with span(fn.__name__, "asset", trace_id=trace_id, run_id=context.run_id):
+            return fn(context, *args, **kwargs)
+
+    return wrapper
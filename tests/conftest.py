@@ -0,0 +1,25 @@
+"""Shared fixtures for the pipeline tests."""
+
+import os
+import sys
+
+import duckdb
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture
+def conn():
+    """An in-memory DuckDB connection, closed after the test."""
+    connection = duckdb.connect(":memory:")
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def repo_root(monkeypatch):
+    """Run the test from the repository root, where ``sql/`` resolves."""
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
@@ -0,0 +1,49 @@
+"""Tests for usage stats and materialization recommendations."""
+
+# pylint: disable=protected-access
+
+from src import materialization
+
+
+def _reads(conn, model):
+    row = conn.execute("SELECT reads FROM meta.model_stats WHERE model = ?", [model]).fetchone()
+    return row[0] if row else 0
+
+
+def test_record_counts_reads_outside_comments_and_strings(conn):
+    """Relations named in comments or string literals are not reads."""
+    materialization.ensure_stats(conn)
+    sql = """
+        -- rebuilt from silver.orders
+        /* silver.customers is not read here */
+        SELECT * FROM silver.orders o
+        JOIN silver.orders p USING (order_id)
+        WHERE o.note <> 'silver.customers'
+    """
+    decision = materialization.Decision("gold.fact_orders", "table", "table", "only option")
+    materialization._record(conn, sql, decision, 1.0, 0.5)
+
+    assert _reads(conn, "silver.orders") == 2
+    assert _reads(conn, "silver.customers") == 0
+
+
+def test_report_lists_models_with_stats(conn, repo_root):  # pylint: disable=unused-argument
+    """Every built model is reported with its current and recommended kind."""
+    materialization.ensure_stats(conn)
+    built = [
+        ("silver.customers", "table", "SELECT * FROM silver.orders", 0.5),
+        ("gold.customer_summary", "incremental", "SELECT * FROM silver.customers", None),
+    ]
+    for model, kind, sql, relation_seconds in built:
+        decision = materialization.Decision(model, kind, kind, "")
+        materialization._record(conn, sql, decision, 1.0, relation_seconds)
+
+    rows = {
+        model: (current, recommended)
+        for model, current, recommended, _ in materialization.report(conn)
+    }
+
+    assert rows["silver.customers"][0] == "table"
+    assert rows["gold.customer_summary"] == ("incremental", "incremental")
+    # Read-only stats (no build recorded) are not reported
+    assert "silver.orders" not in rows
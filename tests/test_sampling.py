@@ -0,0 +1,73 @@
+"""Tests for deterministic sampled runs."""
+
+import pandas as pd
+import pytest
+
+from src.resources import sampling
+
+
+def _orders(n):
+    return pd.DataFrame({"id": [f"order-{i}" for i in range(n)], "order_total": range(n)})
+
+
+@pytest.mark.parametrize(
+    ("text", "rate"), [("1%", 0.01), ("0.25", 0.25), (" 100% ", 1.0)]
+)
+def test_parse_sample_reads_percentages_and_fractions(text, rate):
+    """Rates are given as a percentage or a fraction."""
+    assert sampling.parse_sample(text) == pytest.approx(rate)
+
+
+@pytest.mark.parametrize("text", ["0%", "150%", "-0.1", "abc"])
+def test_parse_sample_rejects_out_of_range(text):
+    """Empty and over-full samples are errors."""
+    with pytest.raises(ValueError):
+        sampling.parse_sample(text)
+
+
+def test_sample_rows_is_deterministic_and_order_independent():
+    """The same keys are kept on every run, however the input is ordered."""
+    orders = _orders(5_000)
+    sample = sampling.sample_rows(orders, "raw_orders", 0.1)
+
+    assert 400 < len(sample) < 600
+    shuffled = orders.sample(frac=1, random_state=7)
+    assert set(sampling.sample_rows(shuffled, "raw_orders", 0.1)["id"]) == set(sample["id"])
+    # A larger sample contains the smaller one
+    assert set(sample["id"]) <= set(sampling.sample_rows(orders, "raw_orders", 0.2)["id"])
+
+
+def test_sample_rows_keeps_children_of_sampled_orders():
+    """Items and tickets follow their order; tickets without one follow their customer."""
+    orders = sampling.sample_rows(_orders(2_000), "raw_orders", 0.1)
+    kept = set(orders["id"])
+    items = pd.DataFrame({"order_id": [f"order-{i}" for i in range(2_000)]})
+    assert set(sampling.sample_rows(items, "raw_items", 0.1)["order_id"]) == kept
+
+    tickets = pd.DataFrame(
+        {
+            "order_id": [f"order-{i}" for i in range(2_000)] + [None] * 2_000,
+            "customer_external_id": [None] * 2_000 + [f"order-{i}" for i in range(2_000)],
+        }
+    )
+    sampled = sampling.sample_rows(tickets, "raw_tickets", 0.1)
+    assert set(sampled["order_id"].dropna()) == kept
+    assert set(sampled["customer_external_id"].dropna()) == kept
+
+
+def test_sample_rows_keeps_dimensions_whole():
+    """Tables without a sample key are not sampled."""
+    customers = pd.DataFrame({"id": ["a", "b", "c"], "name": ["x", "y", "z"]})
+    assert sampling.sample_rows(customers, "raw_customers", 0.01).equals(customers)
+
+
+def test_sampled_environment_redirects_every_location(monkeypatch):
+    """A sampled run never writes to the full run's warehouse, manifest, lake or snapshots."""
+    monkeypatch.setenv("DUCKDB_PATH", "data/w.duckdb")
+    monkeypatch.delenv("LAKE_DIR", raising=False)
+    env = sampling.sampled_environment(0.01)
+
+    assert env["DUCKDB_PATH"] == "data/w.sample-1pct.duckdb"
+    assert env["LAKE_DIR"] == "data/lake.sample-1pct"
+    assert set(env) == set(sampling.SAMPLED_PATHS)
+    assert sampling.sampled_path(env["DUCKDB_PATH"], 0.01) == env["DUCKDB_PATH"]
@@ -0,0 +1,113 @@
+"""Tests for graph selectors, run state and the runner's selection checks."""
+
+import pytest
+
+import run_pipeline
+from src import selection
+
+
+def test_resolve_expands_selectors():
+    """Layers, upstream and downstream selectors expand along the DAG."""
+    assert selection.resolve("layer:silver") == set(selection.LAYERS["silver"])
+    assert selection.resolve("fact_orders") == {"fact_orders"}
+    assert selection.resolve("+order_sketches") == {
+        "order_sketches",
+        "fact_orders",
+        "orders",
+        "items",
+        "products",
+        "raw_orders",
+        "raw_items",
+        "raw_products",
+    }
+    assert selection.resolve("order_sketches+") == {
+        "order_sketches",
+        "distribution_metrics",
+        "warehouse_snapshot",
+    }
+    assert selection.resolve("+tickets_per_order+") >= {"raw_tickets", "metrics"}
+
+
+@pytest.mark.parametrize("selector", ["layer:platinum", "fact_order", "+nope+"])
+def test_resolve_rejects_unknown_names(selector):
+    """Typos fail loudly instead of selecting nothing."""
+    with pytest.raises(ValueError):
+        selection.resolve(selector)
+
+
+def test_select_unions_selectors_and_applies_excludes():
+    """Every model by default; excludes win over selectors."""
+    assert selection.select() == set(selection.ALL_MODELS)
+    assert selection.select(["fact_orders", "layer:bronze"], ["raw_tickets"]) == {
+        "fact_orders",
+        *selection.LAYERS["bronze"],
+    } - {"raw_tickets"}
+    assert selection.ordered({"metrics", "fact_orders"}, "gold") == ["fact_orders", "metrics"]
+
+
+def test_modified_includes_descendants_of_changed_models():
+    """A changed fingerprint reruns the model and everything downstream."""
+    manifest = {
+        "models": {
+            "customers": {"fingerprint": "a"},
+            "raw_customers": {"fingerprint": "b"},
+        }
+    }
+    fingerprints = {"customers": "a", "raw_customers": "b", "raw_stores": "c"}
+    assert selection.modified(fingerprints, manifest) == {"raw_stores", "stores"}
+
+    fingerprints["customers"] = "changed"
+    assert selection.modified(fingerprints, manifest) == {
+        "raw_stores",
+        "stores",
+        "customers",
+        "ticket_search",
+        "customer_summary",
+        "warehouse_snapshot",
+    }
+
+
+def test_failed_run_resumes_after_completed_models(tmp_path):
+    """A failed run is resumable from its completed models, and only once."""
+    path = str(tmp_path / "manifest.json")
+    fingerprints = {model: "v1" for model in selection.ALL_MODELS}
+    planned = selection.resolve("+fact_orders")
+
+    manifest = selection.load_manifest(path)
+    selection.start_run(path, manifest, planned)
+    selection.record_completed(path, manifest, ["raw_orders", "raw_items", "orders"], fingerprints)
+    selection.finish_run(path, manifest, "failed")
+
+    manifest = selection.load_manifest(path)
+    run = selection.interrupted_run(manifest)
+    assert set(run["models"]) == planned
+    assert selection.resumable(manifest, fingerprints) == {"raw_orders", "raw_items", "orders"}
+
+    # A changed input reruns the model and, through it, its completed descendants
+    assert selection.resumable(manifest, {**fingerprints, "raw_orders": "v2"}) == {"raw_items"}
+
+    selection.finish_run(path, manifest, "succeeded")
+    manifest = selection.load_manifest(path)
+    assert selection.interrupted_run(manifest) is None
+    assert not selection.resumable(manifest, fingerprints)
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--in-memory", "--exclude", "layer:bronze"],
+        ["--in-memory", "--select", "layer:gold"],
+        ["--in-memory", "--resume"],
+        ["--resume", "--select", "fact_orders"],
+    ],
+)
+def test_parse_args_rejects_runs_that_cannot_succeed(argv):
+    """In-memory runs must build every transient parent; resume keeps its own selection."""
+    with pytest.raises(SystemExit):
+        run_pipeline.parse_args(argv)
+
+
+def test_parse_args_accepts_in_memory_run_of_persisted_silver():
+    """With silver persisted, gold may run in memory on its own."""
+    args = run_pipeline.parse_args(["--in-memory", "--persist-silver", "--select", "layer:gold"])
+    assert args.in_memory and args.select == ["layer:gold"]